@@ -0,0 +1 @@
+"""Benchmarks of film_api query paths and endpoints"""
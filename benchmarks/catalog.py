@@ -0,0 +1,134 @@
+"""
+Module with generator of synthetic film catalog. film_api is imported
+lazily, so the database can be configured after importing this module
+"""
+import datetime
+import os
+import random
+from typing import Dict, Iterator, List
+
+from sqlalchemy.engine import Engine
+
+
+WORDS = ['love', 'war', 'night', 'city', 'dream', 'shadow', 'river', 'king',
+         'star', 'ghost', 'summer', 'winter', 'blood', 'road', 'house',
+         'green', 'last', 'first', 'secret', 'island', 'storm', 'heart',
+         'dark', 'silver', 'golden', 'lost', 'wild', 'broken', 'silent',
+         'iron', 'black', 'white', 'red', 'blue', 'empire', 'garden']
+
+GENRES = ['drama', 'comedy', 'thriller', 'horror', 'action', 'romance',
+          'documentary', 'animation', 'western', 'fantasy', 'crime',
+          'adventure']
+
+NAMES = ['Anna', 'John', 'Maria', 'Peter', 'Olga', 'James', 'Sofia', 'Ivan',
+         'Emma', 'Lucas', 'Mia', 'Noah']
+
+SURNAMES = ['Smith', 'Kowalski', 'Ivanenko', 'Garcia', 'Muller', 'Rossi',
+            'Dubois', 'Tanaka', 'Nowak', 'Silva', 'Jensen', 'Novak']
+
+BENCH_API_KEY = 'benchmark-api-key'
+
+DEFAULT_OUTPUT_DIR = 'benchmark_output'
+
+
+def output_environ(output_dir: str) -> Dict[str, str]:
+    """
+    Retrieve environment of film_api with paths of the files it writes
+    within the output directory of the benchmark
+
+    :param output_dir: Directory of the benchmark files
+    :return: Dict of environment variables
+    :rtype: Dict[str, str]
+    """
+    return {'POSTER_DIR': os.path.join(output_dir, 'posters'),
+            'LOG_FILE': os.path.join(output_dir, 'api.log'),
+            'RATE_LIMIT_PATH': os.path.join(output_dir, 'rate_limit.sqlite'),
+            'RESPONSE_CACHE_PATH': os.path.join(output_dir,
+                                                'response_cache.sqlite'),
+            'DB_RECENT_WRITERS_PATH': os.path.join(
+                    output_dir, 'recent_writers.sqlite')}
+
+
+def _chunks(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+
+    for row in rows:
+        chunk.append(row)
+
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def _insert(engine: Engine, table, rows: Iterator[Dict],
+            chunk_size: int) -> None:
+    with engine.begin() as connection:
+        for chunk in _chunks(rows, chunk_size):
+            connection.execute(table.insert(), chunk)
+
+
+def _title(rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))) \
+        .capitalize()
+
+
+def seed_catalog(engine: Engine, films: int, directors: int,
+                 seed: int = 0, chunk_size: int = 10_000) -> None:
+    """
+    Create tables and fill them with synthetic catalog, the same seed
+    always produces the same catalog
+
+    :param engine: Engine of the database to be seeded
+    :param films: Amount of films
+    :param directors: Amount of directors
+    :param seed: Seed of the random generator
+    :param chunk_size: Amount of rows per insert statement
+    :return: None
+    """
+    from film_api.database import models
+    from film_api.database.poster_store import poster_store
+    from film_api.database.search import install_search
+
+    rng = random.Random(seed)
+    poster = poster_store.put(b'poster')
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    install_search(engine)
+
+    _insert(engine, models.Role.__table__,
+            iter([{'role_id': 1, 'role_name': 'user'}]), chunk_size)
+    _insert(engine, models.User.__table__, iter([{
+        'user_id': 1, 'username': 'benchmark', 'role_id': 1,
+        'password': 'benchmark', 'is_authenticated': False,
+        'is_active': True, 'is_anonymous': False, 'is_admin': False,
+        'api_key': BENCH_API_KEY}]), chunk_size)
+    _insert(engine, models.Genres.__table__,
+            ({'genre_id': genre_id, 'genre_name': genre_name}
+             for genre_id, genre_name in enumerate(GENRES, 1)), chunk_size)
+    _insert(engine, models.Director.__table__,
+            ({'director_id': director_id, 'name': rng.choice(NAMES),
+              'surname': rng.choice(SURNAMES)}
+             for director_id in range(1, directors + 1)), chunk_size)
+
+    first_day = datetime.datetime(1900, 1, 1)
+
+    _insert(engine, models.Film.__table__,
+            ({'film_id': film_id, 'film_title': _title(rng),
+              'release_date': first_day + datetime.timedelta(
+                      days=rng.randint(0, 45_000)),
+              'director_id': rng.randint(1, directors),
+              'description': ' '.join(rng.choice(WORDS)
+                                      for _ in range(rng.randint(10, 40))),
+              'rating': round(rng.uniform(0.1, 9.99), 2),
+              'poster': poster, 'created_by': 1}
+             for film_id in range(1, films + 1)), chunk_size)
+
+    _insert(engine, models.FilmGenre.__table__,
+            ({'film_id': film_id, 'genre_id': genre_id}
+             for film_id in range(1, films + 1)
+             for genre_id in rng.sample(range(1, len(GENRES) + 1),
+                                        rng.randint(1, 3))), chunk_size)
@@ -0,0 +1,412 @@
+"""
+Load test that replays weighted mix of authenticated requests against
+locally started gunicorn instance.
+
+Usage::
+
+    python -m benchmarks.load_test --films 100000 --workers 4 \\
+        --concurrency 32 --duration 60
+    python -m benchmarks.load_test --reuse --mix search=80,by_id=20
+
+Latency percentiles and throughput are reported per endpoint and saved
+as JSON.
+"""
+import argparse
+import collections
+import http.client
+import json
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.catalog import (BENCH_API_KEY, DEFAULT_OUTPUT_DIR, GENRES,
+                                WORDS, output_environ)
+
+DEFAULT_MIX = 'search=60,by_id=15,post=10,patch=10,delete=5'
+
+FILM_ID_RE = re.compile(r'with id (\d+)')
+
+Sample = Tuple[str, int, float]
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help='Directory of the database, posters and results')
+    parser.add_argument('--db', default=None,
+                        help='Connection string of the benchmark database, '
+                             'SQLite file in the output directory by default')
+    parser.add_argument('--films', type=int, default=100_000,
+                        help='Amount of films in the catalog')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the catalog generator')
+    parser.add_argument('--reuse', action='store_true',
+                        help='Use already seeded database')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Host gunicorn is bound to')
+    parser.add_argument('--port', type=int, default=8089,
+                        help='Port gunicorn is bound to')
+    parser.add_argument('--external', action='store_true',
+                        help='Use already running server on host and port')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='Amount of gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='Amount of threads of every gunicorn worker')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Amount of concurrent clients')
+    parser.add_argument('--duration', type=float, default=30,
+                        help='Measured duration of the test in seconds')
+    parser.add_argument('--warmup', type=float, default=3,
+                        help='Duration of not measured warmup in seconds')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help='Weights of operations as name=weight pairs')
+    parser.add_argument('--output', default=None,
+                        help='Path of the JSON results, '
+                             'load_test_results.json in the output directory '
+                             'by default')
+    args = parser.parse_args(argv)
+
+    args.db = args.db or 'sqlite:///' + os.path.join(args.output_dir,
+                                                      'benchmark.sqlite')
+    args.output = args.output or os.path.join(args.output_dir,
+                                              'load_test_results.json')
+
+    return args
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """
+    Parse weights of operations
+
+    :param mix: Comma separated name=weight pairs
+    :return: Dict of operation weights
+    :rtype: Dict[str, float]
+    :raises ValueError: If operation is unknown or weight is not a number
+    """
+    weights = {}
+
+    for pair in mix.split(','):
+        name, weight = pair.split('=')
+        name = name.strip()
+
+        if name not in LoadClient.operations:
+            raise ValueError(f'Unknown operation {name}')
+
+        weights[name] = float(weight)
+
+    return weights
+
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    """
+    Retrieve nearest-rank percentile of sorted values
+
+    :param sorted_values: Values sorted ascending
+    :param share: Percentile from 0 to 1
+    :return: Value of the percentile, 0 if there are no values
+    :rtype: float
+    """
+    if not sorted_values:
+        return 0.0
+
+    index = max(math.ceil(share * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+class LoadClient:
+    """
+    Client with its own keep-alive connection that performs random
+    operations of the mix
+    """
+    operations = ('search', 'by_id', 'post', 'patch', 'delete')
+
+    def __init__(self, host: str, port: int, films: int,
+                 weights: Dict[str, float], created: collections.deque,
+                 seed: int):
+        self.host = host
+        self.port = port
+        self.films = films
+        self.names = list(weights)
+        self.weights = list(weights.values())
+        self.created = created
+        self.rng = random.Random(seed)
+        self.connection = None
+        self.headers = {'Authorization': f'X-Token {BENCH_API_KEY}',
+                        'Content-Type': 'application/json'}
+
+    def _request(self, method: str, url: str, body: Dict = None) \
+            -> Tuple[int, bytes]:
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host,
+                                                         self.port,
+                                                         timeout=30)
+
+        try:
+            self.connection.request(
+                    method, url, json.dumps(body) if body is not None
+                    else None, self.headers)
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            return 0, b''
+
+    def search(self) -> Tuple[str, int]:
+        params = f'title={self.rng.choice(WORDS)}' \
+                 f'&page={self.rng.randint(1, 3)}'
+
+        if self.rng.random() < 0.3:
+            params += f'&genre={self.rng.choice(GENRES)}'
+
+        return 'GET /film', self._request('GET', f'/film?{params}')[0]
+
+    def by_id(self) -> Tuple[str, int]:
+        film_id = self.rng.randint(1, self.films)
+        return 'GET /film/<id>', self._request('GET', f'/film/{film_id}')[0]
+
+    def post(self) -> Tuple[str, int]:
+        status, body = self._request('POST', '/film', {
+            'film_title': ' '.join(self.rng.sample(WORDS, 2)),
+            'release_date': '2001-02-03', 'poster': 'poster',
+            'created_by': 1, 'director_id': None,
+            'description': 'load test', 'rating': 5.5})
+        match = FILM_ID_RE.search(body.decode(errors='replace'))
+
+        if match:
+            self.created.append(int(match.group(1)))
+
+        return 'POST /film', status
+
+    def patch(self) -> Tuple[str, int]:
+        film_id = self.rng.randint(1, self.films)
+        status = self._request('PATCH', f'/film/{film_id}',
+                               {'rating': round(self.rng.uniform(1, 9), 2)})[0]
+        return 'PATCH /film/<id>', status
+
+    def delete(self) -> Tuple[str, int]:
+        # Only films posted during the test are deleted to keep the catalog
+        try:
+            film_id = self.created.popleft()
+        except IndexError:
+            return self.post()
+
+        return 'DELETE /film/<id>', \
+               self._request('DELETE', f'/film/{film_id}')[0]
+
+    def run(self, started_at: float, measured_from: float, deadline: float,
+            samples: List[Sample]) -> None:
+        """
+        Perform operations until the deadline
+
+        :param started_at: perf_counter value the test was started at
+        :param measured_from: perf_counter value samples are recorded from
+        :param deadline: perf_counter value the test is finished at
+        :param samples: List to be filled with endpoint, status and latency
+        :return: None
+        """
+        now = started_at
+
+        while now < deadline:
+            operation = self.rng.choices(self.names, self.weights)[0]
+            endpoint, status = getattr(self, operation)()
+            finished_at = time.perf_counter()
+
+            if now >= measured_from:
+                samples.append((endpoint, status, finished_at - now))
+
+            now = finished_at
+
+        if self.connection is not None:
+            self.connection.close()
+
+
+def run_load(host: str, port: int, films: int, weights: Dict[str, float],
+             concurrency: int, duration: float, warmup: float) \
+        -> List[Sample]:
+    """
+    Run concurrent clients against the server
+
+    :param host: Host of the server
+    :param port: Port of the server
+    :param films: Amount of films in the catalog
+    :param weights: Weights of operations
+    :param concurrency: Amount of concurrent clients
+    :param duration: Measured duration in seconds
+    :param warmup: Not measured duration in seconds
+    :return: Endpoint, status and latency of every measured request
+    :rtype: List[Sample]
+    """
+    created = collections.deque()
+    samples: List[List[Sample]] = [[] for _ in range(concurrency)]
+    started_at = time.perf_counter()
+    measured_from = started_at + warmup
+    deadline = measured_from + duration
+
+    threads = [threading.Thread(
+            target=LoadClient(host, port, films, weights, created,
+                              seed).run,
+            args=(started_at, measured_from, deadline, samples[seed]),
+            daemon=True) for seed in range(concurrency)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return [sample for client_samples in samples for sample in client_samples]
+
+
+def summarize(samples: List[Sample], duration: float) -> Dict:
+    """
+    Aggregate samples to throughput and latency percentiles per endpoint
+
+    :param samples: Endpoint, status and latency of every request
+    :param duration: Measured duration in seconds
+    :return: Dict of total and per endpoint statistics
+    :rtype: Dict
+    """
+    by_endpoint = collections.defaultdict(list)
+
+    for sample in samples:
+        by_endpoint[sample[0]].append(sample)
+    by_endpoint['total'] = samples
+
+    summary = {}
+
+    for endpoint, endpoint_samples in sorted(by_endpoint.items()):
+        latencies = sorted(sample[2] * 1000 for sample in endpoint_samples)
+        statuses = collections.Counter(str(sample[1])
+                                       for sample in endpoint_samples)
+
+        summary[endpoint] = {
+            'requests': len(endpoint_samples),
+            'throughput_rps': len(endpoint_samples) / duration,
+            'errors': sum(count for status, count in statuses.items()
+                          if status == '0' or status.startswith('5')),
+            'statuses': dict(statuses),
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': latencies[-1] if latencies else 0.0,
+        }
+
+    return summary
+
+
+def _wait_for_server(host: str, port: int, process: subprocess.Popen,
+                     timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited with code '
+                               f'{process.returncode}')
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+
+    raise RuntimeError(f'gunicorn did not start in {timeout}s')
+
+
+def start_gunicorn(args: argparse.Namespace) -> subprocess.Popen:
+    """
+    Start gunicorn serving film_api:create_app() with the benchmark database
+
+    :param args: Parsed command line arguments
+    :return: Started gunicorn process
+    :rtype: subprocess.Popen
+    """
+    env = dict(output_environ(args.output_dir), **os.environ)
+    env['DB_CONN_STR'] = args.db
+    env.setdefault('SECRET_KEY', 'benchmark')
+    env.setdefault('LOG_INFO_SAMPLE_RATE', '0')
+
+    process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-b',
+             f'{args.host}:{args.port}', '-w', str(args.workers),
+             '--threads', str(args.threads), 'film_api:create_app()'], env=env)
+
+    try:
+        _wait_for_server(args.host, args.port, process)
+    except RuntimeError:
+        process.terminate()
+        raise
+
+    return process
+
+
+def _seed(args: argparse.Namespace) -> None:
+    os.environ['DB_CONN_STR'] = args.db
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    for name, value in output_environ(args.output_dir).items():
+        os.environ.setdefault(name, value)
+
+    from film_api.database import models
+    from benchmarks.catalog import seed_catalog
+
+    seed_catalog(models.engine, args.films, max(args.films // 20, 1),
+                 args.seed)
+    models.engine.dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    """
+    Seed the catalog, start gunicorn, replay the mix and save results
+
+    :param argv: Command line arguments
+    :return: Results of the load test
+    :rtype: Dict
+    """
+    args = _parse_args(argv)
+    weights = parse_mix(args.mix)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if not args.reuse and not args.external:
+        _seed(args)
+
+    process = None if args.external else start_gunicorn(args)
+
+    try:
+        samples = run_load(args.host, args.port, args.films, weights,
+                           args.concurrency, args.duration, args.warmup)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    results = {
+        'meta': {'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                 'films': args.films, 'workers': args.workers,
+                 'threads': args.threads, 'concurrency': args.concurrency,
+                 'duration': args.duration, 'mix': weights},
+        'endpoints': summarize(samples, args.duration),
+    }
+
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2)
+
+    print(f'{"endpoint":<20}{"requests":>10}{"rps":>10}{"errors":>8}'
+          f'{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+
+    for endpoint, stats in results['endpoints'].items():
+        print(f'{endpoint:<20}{stats["requests"]:>10}'
+              f'{stats["throughput_rps"]:>10.1f}{stats["errors"]:>8}'
+              f'{stats["p50_ms"]:>10.2f}{stats["p95_ms"]:>10.2f}'
+              f'{stats["p99_ms"]:>10.2f}')
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
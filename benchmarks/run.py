@@ -0,0 +1,314 @@
+"""
+Benchmarks of DBWorker query paths and API endpoints on synthetic catalog.
+
+Usage::
+
+    python -m benchmarks.run --films 100000 --output results.json
+    python -m benchmarks.run --reuse --baseline results.json
+
+Database is taken from --db (SQLite file by default, any SQLAlchemy
+connection string works), the catalog is seeded unless --reuse is given.
+Database, posters and results are written to --output-dir by default.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.catalog import DEFAULT_OUTPUT_DIR, output_environ
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help='Directory of the database, posters and results')
+    parser.add_argument('--db', default=None,
+                        help='Connection string of the benchmark database, '
+                             'SQLite file in the output directory by default')
+    parser.add_argument('--films', type=int, default=100_000,
+                        help='Amount of films in the catalog')
+    parser.add_argument('--directors', type=int, default=None,
+                        help='Amount of directors, films / 20 by default')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the catalog generator')
+    parser.add_argument('--reuse', action='store_true',
+                        help='Use already seeded database')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Amount of timed runs of every case')
+    parser.add_argument('--filter', default='',
+                        help='Run only cases which name contains the text')
+    parser.add_argument('--output', default=None,
+                        help='Path of the JSON results, '
+                             'benchmark_results.json in the output directory '
+                             'by default')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON results of the previous run to compare')
+    args = parser.parse_args(argv)
+
+    args.db = args.db or 'sqlite:///' + os.path.join(args.output_dir,
+                                                      'benchmark.sqlite')
+    args.output = args.output or os.path.join(args.output_dir,
+                                              'benchmark_results.json')
+
+    return args
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_case(func: Callable[[], object], repeat: int) -> Dict:
+    """
+    Run the case once to warm up and then time it repeatedly
+
+    :param func: Case to be timed
+    :param repeat: Amount of timed runs
+    :return: Dict of min, median and mean time in milliseconds
+    :rtype: Dict
+    """
+    func()
+    timings = []
+
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started_at) * 1000)
+
+    return {'min_ms': min(timings),
+            'median_ms': statistics.median(timings),
+            'mean_ms': statistics.mean(timings),
+            'runs': repeat}
+
+
+def db_worker_cases(films: int) -> List[Case]:
+    """
+    Build cases of every DBWorker query path, each case fetches the page
+    the endpoint would return
+
+    :param films: Amount of films in the catalog
+    :return: List of case names with callables
+    :rtype: List[Case]
+    """
+    from film_api.database import models
+    from film_api.database.db_worker import DBWorker
+
+    def page(query_factory, page_number=1, count_mode='exact'):
+        return lambda: DBWorker.get_page_from_query(
+                query_factory(), page_number, count_mode).items
+
+    def keyset(query_factory, dates=0, rating=0):
+        def run():
+            sort_keys = DBWorker.get_film_sort_keys(dates, rating)
+            first = DBWorker.get_keyset_page_from_query(query_factory(),
+                                                        sort_keys)
+            return DBWorker.get_keyset_page_from_query(
+                    query_factory(), sort_keys, first.next_cursor).items
+        return run
+
+    def all_films():
+        return models.Film.query
+
+    last_page = max(films // int(DBWorker.page_size), 1)
+
+    return [
+        ('db.film_by_id',
+         lambda: DBWorker.get_film_by_id(films // 2).first()),
+        ('db.title_ilike',
+         page(lambda: DBWorker.get_film_by_title('night'))),
+        ('db.title_search_ranked',
+         page(lambda: DBWorker.search_films('night city'))),
+        ('db.title_search_unranked',
+         page(lambda: DBWorker.search_films('night city', ranked=False))),
+        ('db.genre_filter',
+         page(lambda: DBWorker.filter_film_by_genre(all_films(),
+                                                    'drama'))),
+        ('db.genres_any_filter',
+         page(lambda: DBWorker.filter_film_by_genres(
+                 all_films(), ['drama', 'western']))),
+        ('db.genres_all_filter',
+         page(lambda: DBWorker.filter_film_by_genres(
+                 all_films(), ['drama', 'western'], match_all=True))),
+        ('db.director_filter',
+         page(lambda: DBWorker.filter_film_by_director(
+                 all_films(), 'Anna', 'Smith'))),
+        ('db.release_date_range',
+         page(lambda: DBWorker.filter_film_by_release_date(
+                 all_films(), '1990-01-01', '2000-01-01'))),
+        ('db.sort_dates',
+         page(lambda: DBWorker.sort_film(all_films(), -1, 0))),
+        ('db.sort_rating',
+         page(lambda: DBWorker.sort_film(all_films(), 0, 1))),
+        ('db.combined_filters',
+         page(lambda: DBWorker.sort_film(
+                 DBWorker.filter_film_by_release_date(
+                         DBWorker.filter_film_by_genre(
+                                 DBWorker.search_films('night', False),
+                                 'drama'),
+                         '1950-01-01', '2020-01-01'), 0, -1))),
+        ('db.offset_first_page', page(all_films)),
+        ('db.offset_middle_page',
+         page(lambda: all_films(), last_page // 2)),
+        ('db.offset_last_page', page(lambda: all_films(), last_page)),
+        ('db.offset_capped_count', page(all_films, 1, 'capped')),
+        ('db.offset_estimated_count', page(all_films, 1, 'estimate')),
+        ('db.offset_no_count', page(all_films, 1, 'none')),
+        ('db.keyset_second_page', keyset(lambda: models.Film.query)),
+        ('db.keyset_sorted_second_page',
+         keyset(lambda: models.Film.query, dates=-1, rating=1)),
+        ('db.stream_all_films',
+         lambda: sum(1 for _ in DBWorker.stream_query(all_films()))),
+        ('db.directors',
+         page(lambda: DBWorker.get_director('an', None))),
+    ]
+
+
+def endpoint_cases(films: int) -> List[Case]:
+    """
+    Build cases of full requests through the Flask test client
+
+    :param films: Amount of films in the catalog
+    :return: List of case names with callables
+    :rtype: List[Case]
+    """
+    from benchmarks.catalog import BENCH_API_KEY
+    from film_api import app
+
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'X-Token {BENCH_API_KEY}'
+
+    def get(url, headers=None):
+        def run():
+            response = client.get(url, headers=headers)
+
+            # Error responses would benchmark the error path of the case
+            if not 200 <= response.status_code < 300:
+                raise RuntimeError(f'{url} responded with '
+                                   f'{response.status_code}')
+
+            return response.data
+        return run
+
+    return [
+        ('api.film_by_id', get(f'/film/{films // 2}')),
+        ('api.film_title_search', get('/film?title=night city')),
+        ('api.film_genre', get('/film?title=&genre=drama')),
+        ('api.film_genres_all',
+         get('/film?title=&genre=drama,western&genre_mode=all')),
+        ('api.film_director',
+         get('/film?title=&director_name=Anna&director_surname=Smith')),
+        ('api.film_release_date',
+         get('/film?title=&release_date=1990-01-01,2000-01-01')),
+        ('api.film_sorted', get('/film?title=&sort_dates=-1&sort_rating=1')),
+        ('api.film_middle_page', get(f'/film?title=&page={films // 20}')),
+        ('api.film_expanded',
+         get('/film?title=&expand=director,genres')),
+        ('api.film_keyset_first_page', get('/film?title=&cursor=')),
+        ('api.film_ndjson_genre',
+         get('/film?title=&genre=drama', {'Accept': 'application/x-ndjson'})),
+        ('api.director', get('/director?name=an')),
+    ]
+
+
+def compare(results: Dict, baseline: Dict) -> List[str]:
+    """
+    Render median time of the cases against the baseline run
+
+    :param results: Results of the current run
+    :param baseline: Results of the previous run
+    :return: Lines of the comparison report
+    :rtype: List[str]
+    """
+    lines = [f'{"case":<32}{"baseline":>12}{"current":>12}{"ratio":>8}']
+
+    for name, result in results['cases'].items():
+        previous = baseline['cases'].get(name)
+
+        if previous is None:
+            lines.append(f'{name:<32}{"-":>12}'
+                         f'{result["median_ms"]:>12.2f}{"-":>8}')
+            continue
+
+        ratio = result['median_ms'] / max(previous['median_ms'], 1e-9)
+        lines.append(f'{name:<32}{previous["median_ms"]:>12.2f}'
+                     f'{result["median_ms"]:>12.2f}{ratio:>8.2f}')
+
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    """
+    Seed the catalog, run the cases and save results as JSON
+
+    :param argv: Command line arguments
+    :return: Results of the run
+    :rtype: Dict
+    """
+    args = _parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # Database has to be configured before film_api creates its engine
+    os.environ['DB_CONN_STR'] = args.db
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('LOG_INFO_SAMPLE_RATE', '0')
+
+    for name, value in output_environ(args.output_dir).items():
+        os.environ.setdefault(name, value)
+
+    from film_api.database import models
+    from benchmarks.catalog import seed_catalog
+
+    directors = args.directors or max(args.films // 20, 1)
+
+    if not args.reuse:
+        started_at = time.perf_counter()
+        seed_catalog(models.engine, args.films, directors, args.seed)
+        print(f'Seeded {args.films} films in '
+              f'{time.perf_counter() - started_at:.1f}s', file=sys.stderr)
+
+    results = {
+        'meta': {'commit': _git_commit(),
+                 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                 'python': platform.python_version(),
+                 'dialect': models.engine.dialect.name,
+                 'films': args.films, 'directors': directors,
+                 'seed': args.seed, 'repeat': args.repeat},
+        'cases': {},
+    }
+
+    for name, func in db_worker_cases(args.films) + \
+            endpoint_cases(args.films):
+        if args.filter not in name:
+            continue
+
+        try:
+            results['cases'][name] = time_case(func, args.repeat)
+        finally:
+            models.db_session.remove()
+
+        print(f'{name:<32}{results["cases"][name]["median_ms"]:>10.2f} ms',
+              file=sys.stderr)
+
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            print('\n'.join(compare(results, json.load(baseline))))
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
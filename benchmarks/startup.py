@@ -0,0 +1,183 @@
+"""
+Report of cold start time of the API broken down by imports and
+initialization phases.
+
+Usage::
+
+    python -m benchmarks.startup --repeat 5 --output startup.json
+
+Every run starts a fresh interpreter with ``-X importtime`` which imports
+film_api, creates the app, serves the first request and the first Swagger
+specification request. Import time is grouped by package (film_api modules
+separately), medians of the runs are reported.
+"""
+import argparse
+import collections
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+CHILD_CODE = '''
+import json, sys, time
+
+started_at = time.perf_counter()
+phases = {}
+
+def mark(phase):
+    global started_at
+    now = time.perf_counter()
+    phases[phase] = now - started_at
+    started_at = now
+
+import film_api
+mark('import film_api')
+app = film_api.create_app()
+mark('create_app')
+client = app.test_client()
+client.get('/director?name=a')
+mark('first request')
+client.get('/swagger.json')
+mark('swagger spec')
+
+phases.update({f'create_app: {name}': seconds for name, seconds
+               in app.config['STARTUP_TIMINGS'].items()})
+print(json.dumps(phases))
+'''
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--db', default='sqlite:///startup.sqlite',
+                        help='Connection string of the database')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Amount of measured interpreter starts')
+    parser.add_argument('--top', type=int, default=15,
+                        help='Amount of the slowest imports reported')
+    parser.add_argument('--output', default='',
+                        help='Path of JSON file with the report')
+    return parser.parse_args(argv)
+
+
+def import_group(name: str) -> str:
+    """
+    Retrieve group of the imported module, film_api modules are reported
+    separately and other modules by top level package
+
+    :param name: Full name of the module
+    :return: Name of the group
+    :rtype: str
+    """
+    if name.startswith('film_api'):
+        return name
+
+    return name.split('.')[0]
+
+
+def parse_import_times(stderr: str) -> Dict[str, float]:
+    """
+    Sum self import time of the modules by group
+
+    :param stderr: Output of interpreter started with -X importtime
+    :return: Seconds spent importing modules of each group
+    :rtype: Dict[str, float]
+    """
+    groups: Dict[str, float] = collections.defaultdict(float)
+
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+
+        if match:
+            groups[import_group(match.group(4))] += \
+                int(match.group(1)) / 1_000_000
+
+    return dict(groups)
+
+
+def run_once(db: str) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Start fresh interpreter and measure its cold start
+
+    :param db: Connection string of the database
+    :return: Seconds of initialization phases and of import groups
+    :rtype: Tuple[Dict[str, float], Dict[str, float]]
+    """
+    env = dict(os.environ, DB_CONN_STR=db, LOG_FILE='',
+               LOG_INFO_SAMPLE_RATE='0')
+    env.setdefault('SECRET_KEY', 'startup')
+
+    completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_CODE],
+            env=env, capture_output=True, text=True, check=True)
+
+    return json.loads(completed.stdout.splitlines()[-1]), \
+        parse_import_times(completed.stderr)
+
+
+def _medians(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    keys = dict.fromkeys(key for run in runs for key in run)
+    return {key: statistics.median(run.get(key, 0) for run in runs)
+            for key in keys}
+
+
+def format_report(report: Dict, top: int) -> List[str]:
+    """
+    Format report as aligned text lines
+
+    :param report: Medians of phases and import groups in seconds
+    :param top: Amount of the slowest import groups
+    :return: Lines of the report
+    :rtype: List[str]
+    """
+    lines = [f'{"phase":<40}{"ms":>10}']
+    lines += [f'{name:<40}{seconds * 1000:>10.1f}'
+              for name, seconds in report['phases'].items()]
+
+    imports = sorted(report['imports'].items(), key=lambda item: -item[1])
+    lines += ['', f'{"import (self time)":<40}{"ms":>10}']
+    lines += [f'{name:<40}{seconds * 1000:>10.1f}'
+              for name, seconds in imports[:top]]
+    lines.append(f'{"total of all imports":<40}'
+                 f'{sum(report["imports"].values()) * 1000:>10.1f}')
+
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    """
+    Measure cold starts and print the report
+
+    :param argv: Command line arguments
+    :return: Report with medians of phases and import groups in seconds
+    :rtype: Dict
+    """
+    args = _parse_args(argv)
+
+    # Database schema is created once, so runs measure startup only
+    subprocess.run([sys.executable, '-c',
+                    'from film_api.database.models import init_db; '
+                    'init_db()'],
+                   env=dict(os.environ, DB_CONN_STR=args.db, LOG_FILE=''),
+                   check=True)
+
+    runs = [run_once(args.db) for _ in range(args.repeat)]
+    report = {'repeat': args.repeat,
+              'phases': _medians([phases for phases, _ in runs]),
+              'imports': _medians([imports for _, imports in runs])}
+
+    print('\n'.join(format_report(report, args.top)))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    return report
+
+
+if __name__ == '__main__':
+    main()
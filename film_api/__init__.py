@@ -1,24 +1,81 @@
-"""Initialization of film_api package"""
-
+"""
+Initialization of film_api package. Application is built by create_app,
+``film_api.app`` is created by it on the first access, so importing
+subpackages (models, ASGI app, benchmarks) doesn't initialize Flask
+"""
+import contextlib
 import os
-from flask import Flask
-from flask_login import LoginManager
+import time
+from typing import Dict
+
+
+@contextlib.contextmanager
+def _timed(timings: Dict[str, float], phase: str):
+    started_at = time.perf_counter()
+    yield
+    timings[phase] = time.perf_counter() - started_at
+
+
+def create_app():
+    """
+    Create Flask application of the API. Database engine is created on the
+    first request and Swagger specification on the first request of the
+    docs. Seconds spent in the initialization phases are kept in
+    STARTUP_TIMINGS config
+
+    :return: Flask application
+    :rtype: Flask
+    """
+    timings: Dict[str, float] = {}
+
+    with _timed(timings, 'flask'):
+        from flask import Flask
+
+        app = Flask(__name__)
+        app.secret_key = os.getenv('SECRET_KEY')
+
+    with _timed(timings, 'blueprints'):
+        from film_api.blueprints.api_endpoints import (api_blueprint,
+                                                       init_logging)
+        from film_api.blueprints.login import login, login_manager
+        from film_api.database.models import db_session, pool_monitor
+
+        login_manager.init_app(app)
+        app.register_blueprint(login)
+        app.register_blueprint(api_blueprint)
+
+    with _timed(timings, 'logging'):
+        init_logging()
+
+    if os.getenv('FILM_API_PROFILING'):
+        with _timed(timings, 'profiling'):
+            from film_api.profiling import init_profiling
+
+            init_profiling(app)
 
-from film_api.database.models import init_db, User, db_session
+    @app.teardown_appcontext
+    def remove_db_session(exception=None):
+        """
+        Return connection of the request session to the pool and drop its
+        identity map once the request is finished
 
-app = Flask(__name__)
+        :param exception: Exception raised during the request if any
+        :return: None
+        """
+        db_session.remove()
+        pool_monitor.report_leaks()
 
-app.secret_key = os.getenv('SECRET_KEY')
+    app.config['STARTUP_TIMINGS'] = timings
 
-login_manager = LoginManager(app)
+    return app
 
-from film_api.blueprints.login import login
-from film_api.blueprints.api_endpoints import api_blueprint
 
-login_manager.login_view = 'login.login_endpoint'
+def __getattr__(name: str):
+    if name == 'app':
+        app = globals()['app'] = create_app()
+        return app
+    raise AttributeError(f'module {__name__} has no attribute {name}')
 
-app.register_blueprint(login)
-app.register_blueprint(api_blueprint)
 
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
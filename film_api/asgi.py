@@ -0,0 +1,412 @@
+"""
+ASGI application serving film and director searches and login with async
+SQLAlchemy sessions, so one process holds many slow connections without
+blocking on database I/O. Run with any ASGI server::
+
+    uvicorn film_api.asgi:app
+
+Films are changed (POST, PATCH, DELETE) through the WSGI application.
+Queries are built by DBWorker on the synchronous facade of the async
+session, so they never check out connections of the WSGI engine.
+"""
+import json
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from film_api.blueprints.film_search import FilmSearch
+from film_api.blueprints.responses import (JSON_MIMETYPE, NDJSON_CHUNK_SIZE,
+                                           NDJSON_MIMETYPE,
+                                           TOTAL_COUNT_HEADER)
+from film_api.cache.auth_cache import UserPrincipal, user_cache
+from film_api.database.async_db_worker import (AsyncDBWorker,
+                                               create_async_session_factory)
+from film_api.database.db_worker import DBWorker
+from film_api.database.models import Director, User
+from film_api.database.serializers import dumps, get_serializer
+from film_api.event_log import log_event
+
+logger = logging.getLogger(__name__)
+
+FILM_PATH_RE = re.compile(r'^/film(?:/(?P<film_id>\d+))?/?$')
+
+director_serializer = get_serializer(Director)
+
+
+class Request:
+    """Parsed HTTP request of ASGI scope"""
+
+    def __init__(self, scope: Dict, body: bytes):
+        self.method: str = scope['method']
+        self.path: str = scope['path']
+        self.args: Dict[str, str] = {}
+        self.headers: Dict[str, str] = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])}
+        self.body = body
+
+        # First value wins like in werkzeug MultiDict.get
+        for key, value in parse_qsl(scope.get('query_string', b'').decode(),
+                                    keep_blank_values=True):
+            self.args.setdefault(key, value)
+
+    def json(self) -> Optional[Dict]:
+        """
+        Retrieve JSON body of the request
+
+        :return: Decoded body, None if body is not JSON
+        """
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+    def accepts_ndjson(self) -> bool:
+        """Whether client prefers NDJSON over JSON"""
+        accept = self.headers.get('accept', '')
+        return NDJSON_MIMETYPE in accept and JSON_MIMETYPE not in accept
+
+
+class Response:
+    """HTTP response with complete body"""
+
+    def __init__(self, body, status: int = 200,
+                 headers: Optional[Dict[str, str]] = None,
+                 mimetype: str = JSON_MIMETYPE):
+        self.body = body if isinstance(body, bytes) else dumps(body)
+        self.status = status
+        self.headers = dict(headers or {})
+        self.mimetype = mimetype
+
+    async def send(self, send) -> None:
+        """
+        Send response through ASGI send callable
+
+        :param send: ASGI send callable
+        :return: None
+        """
+        await send({'type': 'http.response.start', 'status': self.status,
+                    'headers': _encode_headers(self.headers, self.mimetype)})
+        await send({'type': 'http.response.body', 'body': self.body})
+
+
+def _encode_headers(headers: Dict[str, str],
+                    mimetype: str) -> List[Tuple[bytes, bytes]]:
+    return [(b'content-type', mimetype.encode())] + [
+        (name.lower().encode('latin-1'), value.encode('latin-1'))
+        for name, value in headers.items()]
+
+
+def _error(message: str, status: int) -> Response:
+    return Response(message, status)
+
+
+class FilmAPI:
+    """ASGI application of the film API"""
+
+    def __init__(self, conn_str: Optional[str] = None):
+        self.conn_str = conn_str
+        self.session_factory = None
+
+    async def startup(self) -> None:
+        """
+        Create async engine and detect search features of the database
+
+        :return: None
+        """
+        if self.session_factory is None:
+            session_factory = create_async_session_factory(self.conn_str)
+            await AsyncDBWorker.prepare(session_factory.kw['bind'])
+            self.session_factory = session_factory
+
+    async def shutdown(self) -> None:
+        """
+        Close connections of the async engine
+
+        :return: None
+        """
+        if self.session_factory is not None:
+            await self.session_factory.kw['bind'].dispose()
+            self.session_factory = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        if scope['type'] != 'http':
+            return
+
+        await self.startup()
+
+        body = b''
+        more_body = True
+
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        request = Request(scope, body)
+
+        async with self.session_factory() as session:
+            await self._dispatch(request, session, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _dispatch(self, request: Request, session: AsyncSession,
+                        send) -> None:
+        film_match = FILM_PATH_RE.match(request.path)
+
+        if request.path.rstrip('/') == '/login':
+            response = await self.login(request, session)
+        elif request.method != 'GET' and \
+                (film_match or request.path.rstrip('/') == '/director'):
+            response = _error('Method is served by WSGI application', 405)
+        elif film_match:
+            film_id = film_match.group('film_id')
+            user = await self.load_user(request, session)
+
+            if user is None:
+                response = _error('Unauthorized', 401)
+            else:
+                response = await self.get_films(
+                        request, session, send, user,
+                        int(film_id) if film_id else None)
+        elif request.path.rstrip('/') == '/director':
+            response = await self.get_directors(request, session)
+        else:
+            response = _error('Not found', 404)
+
+        if response is not None:
+            await response.send(send)
+
+    @staticmethod
+    async def authenticate(session: AsyncSession,
+                           user: Optional[User]) -> Optional[UserPrincipal]:
+        """
+        Mark user as authenticated, commit only if the flag is changed, and
+        cache the principal of the user
+
+        :param session: Async session
+        :param user: User instance
+        :return: Principal of the user if user is given
+        :rtype: UserPrincipal
+        """
+        if user is None:
+            return None
+
+        if not user.is_authenticated:
+            user.is_authenticated = True
+            await session.commit()
+
+        principal = UserPrincipal.from_user(user)
+        user_cache.set(principal.api_key, principal)
+
+        return principal
+
+    async def load_user(self, request: Request, session: AsyncSession) \
+            -> Optional[UserPrincipal]:
+        """
+        Retrieve user by api key of Authorization header or by username and
+        password of JSON body
+
+        :param request: HTTP request
+        :param session: Async session
+        :return: Principal of the user if is found
+        :rtype: UserPrincipal
+        """
+        auth_header = request.headers.get('authorization')
+
+        if auth_header:
+            api_key = auth_header.replace('X-Token ', '')
+
+            if not api_key:
+                return None
+
+            principal = user_cache.get(api_key)
+
+            if principal is None:
+                principal = await self.authenticate(
+                        session, await AsyncDBWorker.get_user_by_api_key(
+                                session, api_key))
+
+            return principal
+
+        login_data = request.json()
+
+        if not isinstance(login_data, dict):
+            return None
+
+        return await self.authenticate(
+                session, await AsyncDBWorker.get_user_by_creds(
+                        session, login_data.get('username'),
+                        login_data.get('password')))
+
+    async def login(self, request: Request,
+                    session: AsyncSession) -> Response:
+        """
+        Login endpoint with either in-header token or username/password
+        authorization
+
+        :param request: HTTP request
+        :param session: Async session
+        :return: HTTP response
+        :rtype: Response
+        """
+        if await self.load_user(request, session):
+            return Response('User has been loaded')
+
+        return _error('User with provided credentials was not found', 401)
+
+    async def get_films(self, request: Request, session: AsyncSession, send,
+                        user: UserPrincipal,
+                        film_id: Optional[int] = None) -> Optional[Response]:
+        """
+        Retrieve films with the same parameters as WSGI film endpoint,
+        NDJSON is streamed straight to send callable
+
+        :param request: HTTP request
+        :param session: Async session
+        :param send: ASGI send callable
+        :param user: Principal of the user
+        :param film_id: Film id to be looked (Optional)
+        :return: HTTP response, None if the response has been streamed
+        :rtype: Optional[Response]
+        """
+        log_event(logger, logging.INFO, 'film.get', user_id=user.user_id)
+
+        if request.args.get('title') is None and film_id is None:
+            return _error('Wrong input. Provide either id or title of a film',
+                          400)
+
+        try:
+            search = FilmSearch(request.args, session.sync_session)
+        except ValueError as error:
+            return _error(str(error), 400)
+
+        serializer = search.serializer(listed=not film_id)
+
+        if film_id:
+            return Response(serializer.dumps_many(
+                    await AsyncDBWorker.fetch_all(
+                            session, search.film_by_id_query(film_id))))
+
+        if search.genres:
+            await AsyncDBWorker.load_genre_ids(session)
+
+        film_query = search.query()
+
+        if request.accepts_ndjson():
+            await self._stream_ndjson(
+                    send, serializer,
+                    AsyncDBWorker.stream_query(session,
+                                               search.sort(film_query)))
+            return None
+
+        try:
+            if search.cursor is not None:
+                film_page = await AsyncDBWorker.get_keyset_page_from_query(
+                        session, film_query, search.sort_keys, search.cursor)
+
+                return Response(
+                        {'items': serializer.to_list(film_page.items),
+                         'next_cursor': film_page.next_cursor})
+
+            film_page = await AsyncDBWorker.get_page_from_query(
+                    session, search.sort(film_query), search.page,
+                    search.count_mode)
+        except ValueError as error:
+            return _error(str(error), 400)
+
+        headers = {} if film_page.total is None else \
+            {TOTAL_COUNT_HEADER: film_page.total_label}
+
+        return Response(serializer.dumps_many(film_page.items),
+                        headers=headers)
+
+    @staticmethod
+    async def _stream_ndjson(send, serializer, instances) -> None:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': _encode_headers({}, NDJSON_MIMETYPE)})
+
+        lines = []
+
+        async for instance in instances:
+            lines.append(serializer.dumps(instance))
+
+            if len(lines) >= NDJSON_CHUNK_SIZE:
+                await send({'type': 'http.response.body',
+                            'body': b'\n'.join(lines) + b'\n',
+                            'more_body': True})
+                lines = []
+
+        await send({'type': 'http.response.body',
+                    'body': b'\n'.join(lines) + b'\n' if lines else b''})
+
+    @staticmethod
+    async def get_directors(request: Request,
+                            session: AsyncSession) -> Response:
+        """
+        Retrieve directors with the same parameters as WSGI director
+        endpoint
+
+        :param request: HTTP request
+        :param session: Async session
+        :return: HTTP response
+        :rtype: Response
+        """
+        director_name = request.args.get('name')
+        director_surname = request.args.get('surname')
+        cursor = request.args.get('cursor')
+
+        if cursor is None and director_name is None and \
+                director_surname is None:
+            return Response(director_serializer.dumps_many(
+                    await AsyncDBWorker.fetch_all(
+                            session,
+                            DBWorker.get_directors(session.sync_session))))
+
+        director_query = DBWorker.get_director(director_name,
+                                               director_surname,
+                                               session.sync_session)
+
+        try:
+            if cursor is not None:
+                directors_page = \
+                    await AsyncDBWorker.get_keyset_page_from_query(
+                            session, director_query,
+                            [(Director.director_id, False)], cursor)
+
+                return Response({'items': director_serializer.to_list(
+                        directors_page.items),
+                    'next_cursor': directors_page.next_cursor})
+
+            directors_page = await AsyncDBWorker.get_page_from_query(
+                    session, director_query,
+                    int(request.args.get('page') or 1),
+                    request.args.get('count'))
+        except ValueError as error:
+            return _error(str(error), 400)
+
+        headers = {} if directors_page.total is None else \
+            {TOTAL_COUNT_HEADER: directors_page.total_label}
+
+        return Response(director_serializer.dumps_many(directors_page.items),
+                        headers=headers)
+
+
+app = FilmAPI()
@@ -1,117 +1,175 @@
 """Module with blueprint of api endpoints"""
 import datetime
+import json
 import logging
 import os
+from typing import Dict, List, Optional, Tuple
 
 import flask_login
-from flask import Blueprint, request
+from flask import Blueprint, request, send_file
 from flask_restx import Resource, Api
+from sqlalchemy.orm.exc import StaleDataError
 
 from film_api.blueprints import swagger_parsers as parsers
+from film_api.blueprints.conditional import (conditional_response,
+                                            version_not_modified)
+from film_api.blueprints.film_search import FilmSearch
+from film_api.blueprints.responses import (JSON_MIMETYPE, NDJSON_MIMETYPE,
+                                           json_response, ndjson_response,
+                                           total_count_headers)
+from film_api.cache import response_cache
+from film_api.cache.rate_limit import rate_limited
+from film_api.cache.response_cache import cached_response
 from film_api.checkers.film_checker import FilmChecker
 from film_api.database.db_worker import DBWorker
-from film_api.database.models import Film, db_session
+from film_api.database.models import Director, Film, db_session
+from film_api.database.poster_store import poster_store, store_poster
+from film_api.database.serializers import get_serializer
+from film_api.event_log import configure_logging, log_event
 
 api_blueprint = Blueprint('api_endpoints', __name__)
 
 api = Api(api_blueprint, doc='/doc/')
 
-if os.getenv('DEBUG'):
-    api.logger.setLevel(logging.DEBUG)
-    logging.basicConfig(level=logging.DEBUG)
-else:
-    api.logger.setLevel(logging.INFO)
-    logging.basicConfig(level=logging.INFO)
+FILMS_CACHE = 'films'
+DIRECTORS_CACHE = 'directors'
+DIRECTORS_CATALOG = 'directors'
 
-fh = logging.FileHandler("api.log")
+film_serializer = get_serializer(Film)
+director_serializer = get_serializer(Director)
 
-api.logger.addHandler(fh)
+logger = logging.getLogger(__name__)
+log_listener = None
 
 
-@api.route('/film', methods=['GET', 'POST'])
+def init_logging() -> None:
+    """
+    Start writing events of the endpoints to stderr and the log file, the
+    log file is opened by the first event. Called once by the app factory
+
+    :return: None
+    """
+    global log_listener
+
+    if log_listener is None:
+        log_listener = configure_logging(
+                logger, logging.DEBUG if os.getenv('DEBUG') else logging.INFO)
+
+
+def _user_id() -> Optional[int]:
+    return getattr(flask_login.current_user, 'user_id', None)
+
+
+def _expected_version(body_version) -> Optional[int]:
+    if_match = request.headers.get('If-Match')
+
+    if if_match and if_match.strip() != '*':
+        body_version = if_match.strip().replace('W/', '').strip('"')
+
+    if body_version is None:
+        return None
+
+    try:
+        return int(body_version)
+    except (TypeError, ValueError) as error:
+        raise ValueError(f'Version has to be an integer, '
+                         f'got {body_version}') from error
+
+
+@api.route('/film', methods=['GET', 'POST', 'DELETE'])
 @api.route('/film/<int:film_id>', methods=['GET', 'PATCH', 'DELETE'])
 class FilmEndpoint(Resource):
     """film endpoints class"""
 
     @flask_login.login_required
+    @rate_limited('film.get')
+    @conditional_response(DBWorker.films_catalog)
+    @cached_response(FILMS_CACHE)
     @api.expect(parsers.film_get_parser)
     def get(self, film_id=None):
         """
         Get endpoint for film retrieval with specific parameters like genre,
         director name, surname, release date range and sorting by dates and
-        rating
+        rating. All matched films are streamed as NDJSON without pagination
+        if "Accept: application/x-ndjson" is requested. Director and genres
+        of films are embedded if requested by "expand" parameter. Film
+        retrieved by id has its version in ETag header, which is accepted by
+        "If-Match" header of PATCH
 
         :param film_id: Film id to be looked (Optional)
         :return: HTTP response of films in json
         """
-        film_title = request.args.get('title')
-        genre = request.args.get('genre')
-        director_name = request.args.get('director_name')
-        director_surname = request.args.get('director_surname')
-        release_date_range = request.args.get('release_date')
-        sort_dates = request.args.get('sort_dates')
-        sort_rating = request.args.get('sort_rating')
-
-        api.logger.info(
-                f'INFO:{datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-                f' - Film.GET request '
-                f'from user_id:{flask_login.current_user.user_id}')
-
-        if film_title is None and film_id is None:
+        log_event(logger, logging.INFO, 'film.get', user_id=_user_id)
+
+        if request.args.get('title') is None and film_id is None:
             return 'Wrong input. Provide either id or title of a film', 400
 
-        if film_id:
-            film_query = DBWorker.get_film_by_id(film_id)
-            return str([film.to_json() for film in film_query.all()]), 200
+        try:
+            search = FilmSearch(request.args)
+        except ValueError as error:
+            return str(error), 400
 
-        film_query = DBWorker.get_film_by_title(film_title)
+        serializer = search.serializer(listed=not film_id)
+
+        if film_id:
+            # Precondition is checked on the version alone, the film is
+            # loaded only to be sent
+            if request.if_none_match and not search.expansions:
+                not_modified = version_not_modified(
+                        DBWorker.get_film_version(film_id))
 
-        if director_name is not None or director_surname is not None:
-            film_query = DBWorker.filter_film_by_director(film_query,
-                                                          director_name,
-                                                          director_surname)
+                if not_modified is not None:
+                    return not_modified
 
-        if genre:
-            film_query = DBWorker.filter_film_by_genre(film_query, genre)
+            films = search.film_by_id_query(film_id).all()
+            headers = None
 
-        if release_date_range:
-            start_date, end_date = release_date_range.split(',')[:2]
+            # Version of the film is its ETag for If-Match of PATCH unless
+            # related entities, which have no version, are embedded
+            if films and not search.expansions:
+                headers = {'ETag': f'"{films[0].version}"'}
 
-            film_checker = FilmChecker()
+            return json_response(serializer.dumps_many(films),
+                                 headers=headers)
 
-            film_checker.check_date(start_date)
-            film_checker.check_date(end_date)
+        film_query = search.query()
 
-            if not film_checker.is_correct():
-                return str(film_checker.errors), 400
+        if request.accept_mimetypes.best_match(
+                [JSON_MIMETYPE, NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+            return ndjson_response(serializer, DBWorker.stream_query(
+                    search.sort(film_query)))
 
-            film_query = DBWorker.filter_film_by_release_date(film_query,
-                                                              start_date,
-                                                              end_date)
+        if search.cursor is not None:
+            try:
+                film_page = DBWorker.get_keyset_page_from_query(
+                        film_query, search.sort_keys, search.cursor)
+            except ValueError as error:
+                return str(error), 400
 
-        if sort_dates is not None or sort_rating is not None:
-            if sort_dates is not None:
-                sort_dates = int(sort_dates)
-            if sort_rating is not None:
-                sort_rating = int(sort_rating)
+            return json_response(
+                    {'items': serializer.to_list(film_page.items),
+                     'next_cursor': film_page.next_cursor})
 
-            film_query = DBWorker.sort_film(film_query, sort_dates, sort_rating)
+        film_query = search.sort(film_query)
 
         if film_query:
-            api.logger.info(
-                    f'INFO: for user_id:{flask_login.current_user.user_id}'
-                    f' retrieved {film_query.count()} entries')
+            try:
+                film_page = DBWorker.get_page_from_query(
+                        film_query, search.page, search.count_mode)
+            except ValueError as error:
+                return str(error), 400
 
-            current_page = request.args.get('page') or 1
-            film_pages = DBWorker.get_pagination_from_query(film_query,
-                                                            current_page)
+            log_event(logger, logging.DEBUG, 'film.get.matched',
+                      user_id=_user_id, entries=film_page.total_label)
 
-            return str([film.to_json() for film in film_pages.items]), 200
+            return json_response(serializer.dumps_many(film_page.items),
+                                 headers=total_count_headers(film_page))
 
-        return f'Film with id "{film_id}" or title "{film_title}" ' \
+        return f'Film with id "{film_id}" or title "{search.film_title}" ' \
                f'was not found', 404
 
     @flask_login.login_required
+    @rate_limited('film.post')
     @api.expect(parsers.film_post_parser)
     def post(self):
         """
@@ -119,110 +177,196 @@ class FilmEndpoint(Resource):
 
         :return: HTTP response with status code
         """
-        api.logger.info(
-                f'INFO:{datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-                '- Film.POST request '
-                f'from user_id:{flask_login.current_user.user_id}')
+        log_event(logger, logging.INFO, 'film.post', user_id=_user_id)
         film_data = dict(request.get_json())
         film_checker = FilmChecker()
 
         is_correct, errors = film_checker.start_validation(film_data)
 
         if not is_correct:
-            api.logger.warning(
-                    f'WARNING: Film.POST request; wrong data caused'
-                    f' next errors:'
-                    f'{errors}')
+            log_event(logger, logging.WARNING, 'film.post.invalid',
+                      user_id=_user_id, errors=errors)
             return str(errors), 400
 
+        try:
+            poster = store_poster(film_data['poster'])
+        except ValueError as error:
+            return str(error), 400
+
         film = Film(film_data['film_title'],
                     datetime.datetime.strptime(film_data['release_date'],
                                                '%Y-%m-%d'),
-                    film_data['poster'], film_data['created_by'],
+                    poster, flask_login.current_user.user_id,
                     film_data['director_id'], film_data['description'],
                     film_data['rating'])
 
         db_session.add(film)
+        DBWorker.touch_catalog(DBWorker.films_catalog)
         db_session.commit()
+        response_cache.invalidate(FILMS_CACHE)
 
-        api.logger.info('INFO: film.post request processed film with '
-                        f'film_id:{film.film_id}, title:{film.film_title}')
+        log_event(logger, logging.INFO, 'film.post.added',
+                  film_id=film.film_id, film_title=film.film_title)
 
         return f'film has been added with id {film.film_id}', 200
 
     @flask_login.login_required
-    @api.expect(parsers.film_post_parser)
+    @rate_limited('film.patch')
+    @api.expect(parsers.film_patch_parser)
     def patch(self, film_id):
         """
-        Patch endpoint to apply given changes to a specific film by film id
+        Patch endpoint to apply given changes to a specific film by film id.
+        Only the given fields are validated and written. Changes are
+        rejected with 409 if the film has been changed since the version
+        given in "If-Match" header or "version" field
 
         :param film_id: Film id to be changed
-        :return: HTTP response with status code
+        :return: HTTP response with status code and new version of the film
+            in ETag header
         """
-        api.logger.info(
-                f'INFO:{datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-                '- Film.PATCH request '
-                f'from user_id:{flask_login.current_user.user_id}')
+        log_event(logger, logging.INFO, 'film.patch', user_id=_user_id,
+                  film_id=film_id)
 
-        film_checker = FilmChecker()
-        film_data = DBWorker.get_film_by_id(film_id).first()
-        patch_data = request.get_json()
+        patch_data = request.get_json(silent=True)
 
-        if not film_data:
-            return f'Film with {film_id} has not been found. Try again', 400
+        if not isinstance(patch_data, dict):
+            return 'Wrong input. Provide changes of the film in json', 400
 
-        film_data = film_data.to_json()
+        patch_data = dict(patch_data)
 
-        del film_data['film_id']
-        film_data.update(patch_data)
-        film_data['release_date'] = film_data['release_date'].strftime(
-                '%Y-%m-%d')
+        try:
+            version = _expected_version(patch_data.pop('version', None))
+        except ValueError as error:
+            return str(error), 400
 
-        is_correct, errors = film_checker.start_validation(film_data)
+        film_checker = FilmChecker()
+        is_correct, errors = film_checker.start_patch_validation(patch_data)
 
         if not is_correct:
-            api.logger.warning(
-                    f'WARNING: Film.PATCH request; wrong data with next errors:'
-                    f'{errors}')
+            log_event(logger, logging.WARNING, 'film.patch.invalid',
+                      user_id=_user_id, film_id=film_id, errors=errors)
             return str(errors), 400
 
-        return f'Changes has been applied to film {film_id}', 200
+        if 'release_date' in patch_data:
+            try:
+                patch_data['release_date'] = datetime.datetime.strptime(
+                        patch_data['release_date'], '%Y-%m-%d')
+            except ValueError as error:
+                return str(error), 400
+
+        if 'poster' in patch_data:
+            try:
+                patch_data['poster'] = store_poster(patch_data['poster'])
+            except ValueError as error:
+                return str(error), 400
+
+        try:
+            new_version = DBWorker.update_film(
+                    film_id, flask_login.current_user.user_id, patch_data,
+                    version)
+        except StaleDataError:
+            log_event(logger, logging.INFO, 'film.patch.conflict',
+                      user_id=_user_id, film_id=film_id, version=version)
+            return f'Film {film_id} has been changed since version ' \
+                   f'{version}. Retrieve the film and try again', 409
+
+        if new_version is None:
+            return f'Film with {film_id} has not been found. Try again', 404
+
+        response_cache.invalidate(FILMS_CACHE)
+
+        log_event(logger, logging.INFO, 'film.patch.applied',
+                  user_id=_user_id, film_id=film_id, version=new_version)
+
+        return f'Changes has been applied to film {film_id}', 200, \
+               {'ETag': f'"{new_version}"'}
 
     @flask_login.login_required
-    def delete(self, film_id):
+    @rate_limited('film.delete')
+    @api.expect(parsers.film_delete_parser)
+    def delete(self, film_id=None):
         """
-        Delete endpoint to delete given film by id
+        Delete endpoint to delete given film by id, or films by ids
+        separated by comma in "ids" parameter. Only films created by the
+        user are deleted
 
-        :param film_id: Film id to be deleted
-        :return: HTTP response with deleted film in json and status code
+        :param film_id: Film id to be deleted (Optional)
+        :return: HTTP response with deleted film, or list of deleted films,
+            in json and status code
         """
-        api.logger.info(
-                f'INFO:{datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-                '- Film.DELETE request '
-                f'from user_id:{flask_login.current_user.user_id} '
-                f'requesting to delete film_id:{film_id}')
+        log_event(logger, logging.INFO, 'film.delete', user_id=_user_id,
+                  film_id=film_id)
+
+        if film_id is None:
+            try:
+                film_ids = [int(value) for value in
+                            (request.args.get('ids') or '').split(',')
+                            if value.strip()]
+            except ValueError:
+                return 'Film ids have to be integers separated by comma', 400
+
+            if not film_ids:
+                return 'Wrong input. Provide ids of films', 400
+
+            deleted = DBWorker.delete_films(film_ids,
+                                            flask_login.current_user.user_id)
+
+            if deleted:
+                response_cache.invalidate(FILMS_CACHE)
+
+            log_event(logger, logging.INFO, 'film.delete.deleted',
+                      user_id=_user_id, requested=len(film_ids),
+                      deleted=len(deleted))
+
+            return json_response(film_serializer.dumps_many(deleted))
 
         film_data = DBWorker.delete_film_by_id(film_id,
                                                flask_login.
                                                current_user.user_id)
 
         if film_data:
-            api.logger.info(
-                    f'INFO:'
-                    f'{datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-                    '- Film.DELETE request '
-                    f'from user_id:{flask_login.current_user.user_id} '
-                    f'film_id:{film_id} was deleted by user')
+            response_cache.invalidate(FILMS_CACHE)
+
+            log_event(logger, logging.INFO, 'film.delete.deleted',
+                      user_id=_user_id, film_id=film_id)
 
-            return str(film_data.to_json()), 200
+            return json_response(film_serializer.dumps(film_data))
 
         return f'Film with id "{film_id}" was not found', 404
 
 
+@api.route('/film/<int:film_id>/poster', methods=['GET'])
+class FilmPosterEndpoint(Resource):
+    """Poster of the film endpoint"""
+
+    @flask_login.login_required
+    @rate_limited('film.poster')
+    def get(self, film_id):
+        """
+        Get endpoint to retrieve poster of the film. Poster file is sent
+        without reading it to memory, "Range" and conditional requests are
+        answered with partial content and 304 respectively
+
+        :param film_id: Film id
+        :return: HTTP response with poster of the film
+        """
+        reference = DBWorker.get_film_poster(film_id)
+
+        if reference is None or not poster_store.exists(reference):
+            return f'Poster of film with id "{film_id}" was not found', 404
+
+        return send_file(poster_store.path(reference),
+                         mimetype=poster_store.mimetype(reference),
+                         conditional=True, etag=reference)
+
+
 @api.route('/director', methods=['GET', 'POST'])
 class DirectorEndpoint(Resource):
     """Directors endpoints for GET method"""
 
+    @rate_limited('director.get')
+    @conditional_response(DIRECTORS_CATALOG)
+    @cached_response(DIRECTORS_CACHE)
     @api.expect(parsers.directors_get_parser)
     def get(self):
         """
@@ -233,34 +377,155 @@ class DirectorEndpoint(Resource):
 
         :return: HTTP response with directors list in json and status code
         """
-        api.logger.info(
-                f'INFO:{datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-                f' - Directors.GET request '
-                f'from user_id:{flask_login.current_user.user_id}')
+        log_event(logger, logging.INFO, 'director.get',
+                  user_id=_user_id)
 
         director_name = request.args.get('name')
         director_surname = request.args.get('surname')
+        cursor = request.args.get('cursor')
+
+        if cursor is not None:
+            director_query = DBWorker.get_director(director_name,
+                                                   director_surname)
+            try:
+                directors_page = DBWorker.get_keyset_page_from_query(
+                        director_query,
+                        [(Director.director_id, False)],
+                        cursor)
+            except ValueError as error:
+                return str(error), 400
+
+            return json_response(
+                    {'items': director_serializer.to_list(
+                            directors_page.items),
+                     'next_cursor': directors_page.next_cursor})
 
         if director_name is None and director_surname is None:
-            return str([director.to_json() for director in
-                        DBWorker.get_directors().all()]), 200
+            return json_response(director_serializer.dumps_many(
+                    DBWorker.get_directors()))
 
-        api.logger.debug(
-                f'DEBUG: Directors.GET request '
-                f'from user_id:{flask_login.current_user.user_id} '
-                f'entered filter director name/surname with params: '
-                f'director_name:{director_name} '
-                f'director_surname:{director_surname}')
+        log_event(logger, logging.DEBUG, 'director.get.filter',
+                  user_id=_user_id, director_name=director_name,
+                  director_surname=director_surname)
 
         director_query = DBWorker.get_director(director_name, director_surname)
 
-        api.logger.info(
-                f'INFO: for user_id:{flask_login.current_user.user_id}'
-                f' retrieved {director_query.count()} entries')
+        try:
+            directors_page = DBWorker.get_page_from_query(
+                    director_query, int(request.args.get('page') or 1),
+                    request.args.get('count'))
+        except ValueError as error:
+            return str(error), 400
+
+        log_event(logger, logging.DEBUG, 'director.get.matched',
+                  user_id=_user_id, entries=directors_page.total_label)
+
+        return json_response(
+                director_serializer.dumps_many(directors_page.items),
+                headers=total_count_headers(directors_page))
+
+
+def _parse_batch_body() -> Tuple[Optional[List], Dict[int, List[str]]]:
+    """
+    Parse request body of films batch either from JSON array or
+    from NDJSON lines
+
+    :return: List of records (or None for malformed NDJSON lines) and
+        parsing errors by record index
+    :rtype: Tuple[Optional[List], Dict[int, List[str]]]
+    """
+    errors = {}
+
+    if request.mimetype == NDJSON_MIMETYPE:
+        records = []
+
+        for line in request.get_data().splitlines():
+            if not line.strip():
+                continue
+
+            try:
+                records.append(json.loads(line))
+            except ValueError as error:
+                errors[len(records)] = [f'Malformed JSON line: {error}']
+                records.append(None)
+
+        return records, errors
+
+    records = request.get_json(silent=True)
+
+    if not isinstance(records, list):
+        return None, errors
+
+    return records, errors
+
+
+@api.route('/film/batch', methods=['POST'])
+class FilmBatchEndpoint(Resource):
+    """Films bulk ingestion endpoint"""
+
+    @flask_login.login_required
+    @rate_limited('film.batch')
+    def post(self):
+        """
+        Post endpoint to add many films at once, accepts JSON array of films
+        or NDJSON with one film per line. Valid films are inserted, invalid
+        ones are reported with their index in the batch
+
+        :return: HTTP response with amount of inserted films and errors
+        """
+        log_event(logger, logging.INFO, 'film.batch', user_id=_user_id)
+
+        records, errors = _parse_batch_body()
+
+        if records is None:
+            return 'Wrong input. Provide JSON array or NDJSON of films', 400
+
+        validation_errors = FilmChecker.validate_batch(
+                [film_data for index, film_data in enumerate(records)
+                 if index not in errors])
+        valid_indexes = [index for index in range(len(records))
+                         if index not in errors]
+
+        for position, film_errors in validation_errors.items():
+            errors[valid_indexes[position]] = film_errors
+
+        films_data = []
+        films_indexes = []
+
+        for index, film_data in enumerate(records):
+            if index in errors:
+                continue
+
+            film_data = dict(film_data)
+            film_data['created_by'] = flask_login.current_user.user_id
+            film_data['release_date'] = datetime.datetime.strptime(
+                    film_data['release_date'], '%Y-%m-%d')
+
+            try:
+                film_data['poster'] = store_poster(film_data['poster'])
+            except ValueError as error:
+                errors[index] = [str(error)]
+                continue
+
+            films_data.append(film_data)
+            films_indexes.append(index)
+
+        inserted, insert_errors = DBWorker.insert_films(films_data) \
+            if films_data else (0, {})
+
+        for position, film_errors in insert_errors.items():
+            errors[films_indexes[position]] = film_errors
+
+        if inserted:
+            response_cache.invalidate(FILMS_CACHE)
+
+        log_event(logger, logging.INFO, 'film.batch.inserted',
+                  user_id=_user_id, inserted=inserted, rejected=len(errors))
 
-        current_page = request.args.get('page') or 1
-        directors_pages = DBWorker.get_pagination_from_query(director_query,
-                                                             current_page)
+        status = 400 if errors and not inserted else 200
 
-        return str([director.to_json() for director in
-                    directors_pages.items]), 200
+        return json_response(
+                {'inserted': inserted,
+                 'errors': [{'index': index, 'errors': record_errors}
+                            for index, record_errors in
+                            sorted(errors.items())]}, status)
@@ -0,0 +1,109 @@
+"""Module with conditional GET support with ETag and Last-Modified"""
+import datetime
+import functools
+import hashlib
+from typing import Optional
+
+from flask import Response, request
+
+from film_api.cache.response_cache import request_cache_key
+from film_api.database.db_worker import DBWorker
+
+
+def _not_modified(etag: str, last_modified) -> Response:
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.vary.add('Accept')
+
+    return response
+
+
+def _is_not_modified(etag: str, last_modified) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+
+    return False
+
+
+def version_not_modified(version: Optional[int]) -> Optional[Response]:
+    """
+    Answer with 304 Not Modified if the client already has the version of
+    the entity given in If-None-Match header, so the entity itself doesn't
+    have to be loaded
+
+    :param version: Version of the entity, None if it doesn't exist
+    :return: 304 response, None if the entity has to be sent
+    :rtype: Optional[Response]
+    """
+    if version is None or not request.if_none_match.contains_weak(
+            str(version)):
+        return None
+
+    response = Response(status=304)
+    response.set_etag(str(version))
+    response.vary.add('Accept')
+
+    return response
+
+
+def conditional_response(catalog: str):
+    """
+    Decorator that adds ETag and Last-Modified headers to successful
+    responses of the view and answers with 304 Not Modified if the client
+    already has them.
+
+    If the catalog has a version, ETag is built from the version and the
+    request, so unchanged resources are answered before the view is called.
+    Otherwise ETag is a hash of the response body. ETag set by the view
+    itself (e.g. version of a single film) is kept
+
+    :param catalog: Name of the catalog that the view responses depend on
+    :return: Decorator of the view
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            state = DBWorker.get_catalog_state(catalog)
+
+            if state is None:
+                response = view(*args, **kwargs)
+
+                if isinstance(response, Response) and \
+                        response.status_code == 200 and \
+                        not response.is_streamed:
+                    response.add_etag(weak=True)
+                    response.vary.add('Accept')
+                    response.make_conditional(request)
+
+                return response
+
+            version, modified_at = state
+            last_modified = modified_at.replace(tzinfo=datetime.timezone.utc)
+            etag = hashlib.sha1(
+                    f'{catalog}:{version}:{request_cache_key()}:'
+                    f'{request.accept_mimetypes}'.encode()).hexdigest()
+
+            if _is_not_modified(etag, last_modified):
+                return _not_modified(etag, last_modified)
+
+            response = view(*args, **kwargs)
+
+            if isinstance(response, Response) and \
+                    response.status_code == 200:
+                response.last_modified = last_modified
+                response.vary.add('Accept')
+
+                if response.get_etag()[0] is None:
+                    response.set_etag(etag, weak=True)
+                else:
+                    response.make_conditional(request)
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,197 @@
+"""
+Module with parameters of films search shared by WSGI and ASGI endpoints
+"""
+from typing import List, Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Query, Session
+
+from film_api.checkers.film_checker import FilmChecker
+from film_api.database.db_worker import DBWorker
+from film_api.database.models import Film
+from film_api.database.pagination import SortKey
+from film_api.database.serializers import ModelSerializer, get_serializer
+
+GENRE_MODES = ('any', 'all')
+
+
+def _int_arg(args: Mapping[str, str], name: str) -> Optional[int]:
+    value = args.get(name)
+
+    if value is None:
+        return None
+
+    try:
+        return int(value)
+    except ValueError as error:
+        raise ValueError(f'{name} has to be an integer, got {value}') \
+            from error
+
+
+class FilmSearch:
+    """
+    Parsed and validated query parameters of films search which build
+    query of films with DBWorker
+    """
+
+    def __init__(self, args: Mapping[str, str],
+                 session: Optional[Session] = None):
+        """
+        Parse query parameters of the search
+
+        :param args: Query parameters of the request
+        :param session: Session queries are built on, scoped session if
+            empty
+        :raises ValueError: If any parameter is invalid
+        """
+        self.session = session
+        self.film_title: Optional[str] = args.get('title')
+        self.director_name: Optional[str] = args.get('director_name')
+        self.director_surname: Optional[str] = args.get('director_surname')
+        self.sort_dates = _int_arg(args, 'sort_dates')
+        self.sort_rating = _int_arg(args, 'sort_rating')
+        self.cursor: Optional[str] = args.get('cursor')
+        self.page = _int_arg(args, 'page') or 1
+        self.count_mode: Optional[str] = args.get('count')
+        self.expansions: Tuple[str, ...] = DBWorker.parse_film_expansions(
+                args.get('expand'))
+        self.fields: Optional[Tuple[str, ...]] = DBWorker.parse_film_fields(
+                args.get('fields'))
+
+        self.genres: List[str] = [name.strip() for name in
+                                  (args.get('genre') or '').split(',')
+                                  if name.strip()]
+        self.genre_mode = args.get('genre_mode') or 'any'
+
+        if self.genre_mode not in GENRE_MODES:
+            raise ValueError(f'Unknown genre mode {self.genre_mode}, '
+                             f'choose from {", ".join(GENRE_MODES)}')
+
+        self.release_dates: Optional[Tuple[str, str]] = None
+        release_date_range = args.get('release_date')
+
+        if release_date_range:
+            dates = release_date_range.split(',')
+
+            if len(dates) < 2:
+                raise ValueError('Release date range has to be two dates '
+                                 'separated by comma')
+
+            film_checker = FilmChecker()
+            film_checker.check_date(dates[0])
+            film_checker.check_date(dates[1])
+
+            if not film_checker.is_correct():
+                raise ValueError(str(film_checker.errors))
+
+            self.release_dates = dates[0], dates[1]
+
+    @property
+    def is_sorted(self) -> bool:
+        """Whether films are sorted by dates or rating"""
+        return bool(self.sort_dates) or bool(self.sort_rating)
+
+    def film_fields(self, listed: bool = True) -> Tuple[str, ...]:
+        """
+        Retrieve names of film columns in the response, large text columns
+        are left out of list views unless requested
+
+        :param listed: Whether films are retrieved by search or by id
+        :return: Names of columns
+        :rtype: Tuple[str, ...]
+        """
+        if self.fields is not None:
+            return self.fields
+
+        return DBWorker.film_list_fields if listed else DBWorker.film_fields
+
+    def serializer(self, listed: bool = True) -> ModelSerializer:
+        """
+        Retrieve serializer of films with requested expansions and columns
+
+        :param listed: Whether films are retrieved by search or by id
+        :return: Serializer of films
+        :rtype: ModelSerializer
+        """
+        return get_serializer(Film, self.expansions,
+                              self.film_fields(listed))
+
+    @property
+    def sort_keys(self) -> List[SortKey]:
+        """Sort keys of keyset pagination of films"""
+        return DBWorker.get_film_sort_keys(self.sort_dates, self.sort_rating)
+
+    def _load_fields(self, film_query: Query, listed: bool) -> Query:
+        # Columns of expanded relationships and of the cursor are loaded
+        # too, so they aren't lazy loaded film by film
+        fields = set(self.film_fields(listed))
+        fields.update(column.key for name in self.expansions for column
+                      in DBWorker.film_expansions[name].property.local_columns)
+
+        if self.cursor is not None:
+            fields.update(column.key for column, _ in self.sort_keys)
+
+        # Version of the film is sent in ETag header
+        if not listed:
+            fields.add('version')
+
+        return DBWorker.load_film_fields(film_query, sorted(fields))
+
+    def film_by_id_query(self, film_id: int) -> Query:
+        """
+        Build query of the film by its id with requested expansions and
+        columns
+
+        :param film_id: Id of the film
+        :return: Query of the film
+        :rtype: Query
+        """
+        return DBWorker.expand_films(
+                self._load_fields(
+                        DBWorker.get_film_by_id(film_id, self.session),
+                        False),
+                self.expansions)
+
+    def query(self) -> Query:
+        """
+        Build filtered query of films with requested expansions and
+        columns, films are ranked by relevance unless they are sorted or
+        paginated by cursor
+
+        :return: Query of films
+        :rtype: Query
+        """
+        film_query = DBWorker.search_films(
+                self.film_title,
+                ranked=not self.is_sorted and self.cursor is None,
+                session=self.session)
+
+        if self.director_name is not None or \
+                self.director_surname is not None:
+            film_query = DBWorker.filter_film_by_director(
+                    film_query, self.director_name, self.director_surname)
+
+        if self.genres:
+            film_query = DBWorker.filter_film_by_genres(
+                    film_query, self.genres,
+                    match_all=self.genre_mode == 'all')
+
+        if self.release_dates:
+            film_query = DBWorker.filter_film_by_release_date(
+                    film_query, *self.release_dates)
+
+        return DBWorker.expand_films(self._load_fields(film_query, True),
+                                     self.expansions)
+
+    def sort(self, film_query: Query) -> Query:
+        """
+        Sort query of films by requested dates and rating order
+
+        :param film_query: Query of films
+        :return: Sorted query of films
+        :rtype: Query
+        """
+        if self.sort_dates is None and self.sort_rating is None:
+            return film_query
+
+        return DBWorker.sort_film(film_query, self.sort_dates,
+                                  self.sort_rating)
@@ -4,14 +4,19 @@ Login blueprint with authorization with either username/password or api key
 from typing import Optional
 
 from flask import Blueprint, request, redirect, url_for
-from flask_login import login_user
+from flask_login import LoginManager, login_user
 
-from film_api import login_manager
+from film_api.cache.auth_cache import (UserPrincipal, authenticate,
+                                       get_principal)
 from film_api.database.db_worker import DBWorker
-from film_api.database.models import User, db_session
+from film_api.database.models import db_session
+from film_api.database.routing import set_writer
 
 login = Blueprint('login', __name__)
 
+login_manager = LoginManager()
+login_manager.login_view = 'login.login_endpoint'
+
 
 @login_manager.user_loader
 def load_user(api_key):
@@ -19,26 +24,31 @@ def load_user(api_key):
     Retrieve api key for the given user
 
     :param api_key: Api key of the user
-    :return: User instance
+    :return: Principal of the user
     """
-    return DBWorker.get_user_by_api_key(api_key)
+    user = get_principal(api_key)
+
+    if user:
+        set_writer(db_session, user.user_id)
+
+    return user
 
 
 @login_manager.request_loader
-def load_user_with_password(request) -> Optional[User]:
+def load_user_with_password(request) -> Optional[UserPrincipal]:
     """
     Retrieve authorization header from http request and return user if such
     exists
 
-    :return: User if is found
-    :rtype: User
+    :return: Principal of the user if is found
+    :rtype: UserPrincipal
     """
     if request.headers.get('Authorization'):
         auth_header = request.headers.get('Authorization')
         api_key = auth_header.replace('X-Token ', '')
 
         if api_key:
-            user = DBWorker.get_user_by_api_key(api_key)
+            user = get_principal(api_key)
         else:
             user = None
 
@@ -51,12 +61,11 @@ def load_user_with_password(request) -> Optional[User]:
         username = login_data.get('username')
         password = login_data.get('password')
 
-        user = DBWorker.get_user_by_creds(username, password)
+        user = authenticate(DBWorker.get_user_by_creds(username, password))
 
     if user:
         login_user(user, remember=True)
-        user.is_authenticated = True
-        db_session.commit()
+        set_writer(db_session, user.user_id)
 
     return user
 
@@ -0,0 +1,76 @@
+"""Module with helpers to build HTTP responses"""
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+from flask import Response, stream_with_context
+
+from film_api.database.pagination import OffsetPage
+from film_api.database.serializers import ModelSerializer, dumps
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+NDJSON_CHUNK_SIZE = 64
+
+TOTAL_COUNT_HEADER = 'X-Total-Count'
+
+
+def json_response(data: Union[bytes, object], status: int = 200,
+                  headers: Optional[Dict] = None) -> Response:
+    """
+    Create JSON response from already encoded bytes or from the data
+
+    :param data: JSON bytes or data to be encoded
+    :param status: HTTP status code
+    :param headers: Additional headers of the response
+    :return: HTTP response
+    :rtype: Response
+    """
+    if not isinstance(data, bytes):
+        data = dumps(data)
+
+    return Response(data, status=status, headers=headers,
+                    mimetype=JSON_MIMETYPE)
+
+
+def total_count_headers(page: OffsetPage) -> Dict[str, str]:
+    """
+    Retrieve headers with total amount of entries of the page
+
+    :param page: Page of entries
+    :return: Dict with X-Total-Count header, empty if total wasn't counted
+    :rtype: Dict[str, str]
+    """
+    if page.total is None:
+        return {}
+    return {TOTAL_COUNT_HEADER: page.total_label}
+
+
+def _ndjson_lines(serializer: ModelSerializer,
+                  instances: Iterable) -> Iterator[bytes]:
+    lines = []
+
+    for instance in instances:
+        lines.append(serializer.dumps(instance))
+
+        if len(lines) >= NDJSON_CHUNK_SIZE:
+            yield b'\n'.join(lines) + b'\n'
+            lines = []
+
+    if lines:
+        yield b'\n'.join(lines) + b'\n'
+
+
+def ndjson_response(serializer: ModelSerializer, instances: Iterable,
+                    status: int = 200) -> Response:
+    """
+    Create streamed response with one JSON document per line, instances
+    are consumed lazily while the response is being sent
+
+    :param serializer: Serializer of the instances
+    :param instances: Iterable of model instances
+    :param status: HTTP status code
+    :return: HTTP response
+    :rtype: Response
+    """
+    return Response(stream_with_context(_ndjson_lines(serializer, instances)),
+                    status=status, mimetype=NDJSON_MIMETYPE)
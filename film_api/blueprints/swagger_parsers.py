@@ -1,18 +1,21 @@
-from flask import Blueprint
-from flask_restx import Api
+from flask_restx.reqparse import RequestParser
 
-api_parsers_blueprint = Blueprint('api_parsers_blueprint', __name__)
-api = Api(api_parsers_blueprint)
-film_get_parser = api.parser()
+film_get_parser = RequestParser()
 
 film_get_parser.add_argument('Film id', type=int,
                              help='Film id to be looked (Optional)',
                              location='query')
 film_get_parser.add_argument('title', type=str,
-                             help='Film title, used partial similarity',
+                             help='Text to be searched in film title and '
+                                  'description, results are ranked by '
+                                  'relevance unless sorted',
                              location='query')
 film_get_parser.add_argument('genre', type=str,
-                             help='Film genre, used partial similarity',
+                             help='Film genres separated by comma',
+                             location='query')
+film_get_parser.add_argument('genre_mode', type=str, choices=('any', 'all'),
+                             help='Match films with any of the genres or '
+                                  'with all of them, "any" by default',
                              location='query')
 film_get_parser.add_argument('director_name', type=str,
                              help='Director name that filmed the film',
@@ -35,11 +38,33 @@ film_get_parser.add_argument('sort_rating', type=int,
                                   '-1 for descending, 0 for no sort,'
                                   ' 1 for ascending',
                              location='query')
+film_get_parser.add_argument('cursor', type=str,
+                             help='Cursor of the page for keyset pagination, '
+                                  'empty for the first page. Response '
+                                  'contains next_cursor of the following '
+                                  'page',
+                             location='query')
 film_get_parser.add_argument('page', type=int,
                              help='Page number for pagination',
                              location='query')
+film_get_parser.add_argument('expand', type=str,
+                             help='Related entities embedded into films '
+                                  'separated by comma: director, genres',
+                             location='query')
+film_get_parser.add_argument('fields', type=str,
+                             help='Film columns in the response separated by '
+                                  'comma, e.g. film_id,film_title. Lists of '
+                                  'films leave out description and poster '
+                                  'by default',
+                             location='query')
+film_get_parser.add_argument('count', type=str,
+                             choices=('exact', 'capped', 'estimate', 'none'),
+                             help='How total amount of films is counted for '
+                                  'X-Total-Count header, "capped" stops at '
+                                  'the limit and returns e.g. "10000+"',
+                             location='query')
 
-film_post_parser = api.parser()
+film_post_parser = RequestParser()
 
 film_post_parser.add_argument('film_title', type=str,
                               help='Film title',
@@ -73,7 +98,45 @@ film_post_parser.add_argument('rating', type=float,
                                    ' 1 for ascending',
                               location='json')
 
-directors_get_parser = api.parser()
+film_patch_parser = RequestParser()
+
+film_patch_parser.add_argument('If-Match', type=str,
+                               help='Version of the film the changes are '
+                                    'based on, as returned in ETag header',
+                               location='headers')
+film_patch_parser.add_argument('version', type=int,
+                               help='Version of the film the changes are '
+                                    'based on, alternative to If-Match',
+                               location='json')
+film_patch_parser.add_argument('film_title', type=str,
+                               help='Film title',
+                               location='json')
+film_patch_parser.add_argument('release_date', type=str,
+                               help='Release date in next format '
+                                    '"YYYY-MM-DD"',
+                               location='json')
+film_patch_parser.add_argument('poster', type=str,
+                               help='Poster of the film',
+                               location='json')
+film_patch_parser.add_argument('director_id', type=int,
+                               help='Id of the director of the film',
+                               location='json')
+film_patch_parser.add_argument('description', type=str,
+                               help='Description of the film',
+                               location='json')
+film_patch_parser.add_argument('rating', type=float,
+                               help='Rating of the film',
+                               location='json')
+
+film_delete_parser = RequestParser()
+
+film_delete_parser.add_argument('ids', type=str,
+                                help='Ids of films to be deleted separated '
+                                     'by comma, films of other users are '
+                                     'skipped',
+                                location='query')
+
+directors_get_parser = RequestParser()
 
 directors_get_parser.add_argument('name', type=str,
                                   help='Name of the director,'
@@ -83,6 +146,18 @@ directors_get_parser.add_argument('surname', type=str,
                                   help='Surname of the director,'
                                        ' partial similarity',
                                   location='query')
+directors_get_parser.add_argument('cursor', type=str,
+                                  help='Cursor of the page for keyset '
+                                       'pagination, empty for the first page.'
+                                       ' Response contains next_cursor of '
+                                       'the following page',
+                                  location='query')
 directors_get_parser.add_argument('page', type=int,
                                   help='Page number for pagination',
                                   location='query')
+directors_get_parser.add_argument('count', type=str,
+                                  choices=('exact', 'capped', 'estimate',
+                                           'none'),
+                                  help='How total amount of directors is '
+                                       'counted for X-Total-Count header',
+                                  location='query')
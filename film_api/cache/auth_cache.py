@@ -0,0 +1,101 @@
+"""Module with in-process cache of authenticated users by api key"""
+import os
+from typing import Optional
+
+from sqlalchemy import event, inspect
+
+from film_api.cache.ttl_cache import TTLCache
+from film_api.database import models
+from film_api.database.db_worker import DBWorker
+
+AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE') or 1024)
+AUTH_CACHE_TTL = float(os.getenv('AUTH_CACHE_TTL') or 60)
+
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+
+class UserPrincipal:
+    """
+    Detached snapshot of the authenticated user that is safe to be shared
+    between requests
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id: int, username: str, api_key: str,
+                 role_id: Optional[int] = None, is_admin: bool = False,
+                 is_active: bool = True):
+        self.user_id = user_id
+        self.username = username
+        self.api_key = api_key
+        self.role_id = role_id
+        self.is_admin = is_admin
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user: models.User) -> 'UserPrincipal':
+        """
+        Create principal from the user model
+
+        :param user: User instance
+        :return: Principal of the user
+        :rtype: UserPrincipal
+        """
+        return cls(user.user_id, user.username, user.api_key, user.role_id,
+                   bool(user.is_admin), bool(user.is_active))
+
+    def get_id(self) -> str:
+        """
+        Retrieve api key of the user
+
+        :return: Api key of the user
+        :rtype: str
+        """
+        return self.api_key
+
+
+def authenticate(user: Optional[models.User]) -> Optional[UserPrincipal]:
+    """
+    Mark user as authenticated, commit only if the flag is changed, and
+    cache the principal of the user
+
+    :param user: User instance
+    :return: Principal of the user if user is given
+    :rtype: UserPrincipal
+    """
+    if user is None:
+        return None
+
+    if not user.is_authenticated:
+        user.is_authenticated = True
+        models.db_session.commit()
+
+    principal = UserPrincipal.from_user(user)
+    user_cache.set(principal.api_key, principal)
+
+    return principal
+
+
+def _load_principal(api_key: str) -> Optional[UserPrincipal]:
+    return authenticate(DBWorker.get_user_by_api_key(api_key))
+
+
+def get_principal(api_key: str) -> Optional[UserPrincipal]:
+    """
+    Retrieve principal of the user by api key from the cache, look up
+    the database on cache miss
+
+    :param api_key: Api key of the user
+    :return: Principal of the user if such exists
+    :rtype: UserPrincipal
+    """
+    return user_cache.get_or_load(api_key, _load_principal)
+
+
+@event.listens_for(models.User, 'after_update')
+@event.listens_for(models.User, 'after_delete')
+def _invalidate_user(mapper, connection, target):
+    history = inspect(target).attrs.api_key.history
+
+    for api_key in [target.api_key, *history.deleted]:
+        user_cache.delete(api_key)
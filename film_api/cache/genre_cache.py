@@ -0,0 +1,43 @@
+"""Module with in-process cache of genre ids by genre names"""
+import os
+import functools
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from film_api.cache.ttl_cache import TTLCache
+from film_api.database import models
+
+GENRE_CACHE_TTL = float(os.getenv('GENRE_CACHE_TTL') or 300)
+
+genre_cache = TTLCache(1, GENRE_CACHE_TTL)
+
+_GENRES_KEY = 'genres'
+
+
+def _load_genre_ids(session: Session, key: str) -> Dict[str, int]:
+    return dict(session.query(models.Genres.genre_name,
+                              models.Genres.genre_id))
+
+
+def get_genre_ids(session: Optional[Session] = None) -> Dict[str, int]:
+    """
+    Retrieve ids of all genres by their names, the whole table is loaded
+    once and cached
+
+    :param session: Session the table is loaded with, request session if
+        empty
+    :return: Dict of genre ids by genre names
+    :rtype: Dict[str, int]
+    """
+    return genre_cache.get_or_load(
+            _GENRES_KEY,
+            functools.partial(_load_genre_ids, session or models.db_session))
+
+
+@event.listens_for(models.Genres, 'after_insert')
+@event.listens_for(models.Genres, 'after_update')
+@event.listens_for(models.Genres, 'after_delete')
+def _invalidate_genres(mapper, connection, target):
+    genre_cache.clear()
@@ -0,0 +1,335 @@
+"""
+Module with token bucket rate limiting of API clients. Limits are
+configured per endpoint scope and per role, e.g.::
+
+    RATE_LIMITS="film=100/60,admin:film=1000/60,anonymous:*=30/60"
+
+allows 100 requests per minute to every film endpoint, 1000 for admins and
+30 per minute to any endpoint for clients without api key. Role is
+"admin", id of the user role, "user" for users without role or
+"anonymous". Scope "film" matches "film.get", "film.post" etc., "*" matches
+every scope. Limits of the role take precedence over the limits of "*"
+role, then more specific scope wins
+"""
+import functools
+import math
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import flask_login
+from flask import after_this_request, request
+
+from film_api.cache.sqlite_store import SQLiteStore
+from film_api.cache.ttl_cache import TTLCache
+
+# Buckets have to be shared by worker processes, otherwise every worker
+# allows the whole limit
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND') or 'sqlite'
+RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH') or 'rate_limit.sqlite'
+RATE_LIMIT_SIZE = int(os.getenv('RATE_LIMIT_SIZE') or 100000)
+RATE_LIMITS = os.getenv('RATE_LIMITS') or ''
+
+ANY = '*'
+ANONYMOUS_ROLE = 'anonymous'
+
+
+class RateLimit(NamedTuple):
+    """Bucket of count requests which is fully refilled within period"""
+    count: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second"""
+        return self.count / self.period
+
+
+class Decision(NamedTuple):
+    """Result of taking a token from the bucket"""
+    allowed: bool
+    limit: RateLimit
+    remaining: float
+
+    @property
+    def reset_after(self) -> int:
+        """Seconds till the bucket is full again"""
+        return math.ceil((self.limit.count - self.remaining) /
+                         self.limit.rate)
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds till the next token is available"""
+        return max(math.ceil((1 - self.remaining) / self.limit.rate), 1)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Rate limit headers of the response"""
+        headers = {'RateLimit-Limit': str(self.limit.count),
+                   'RateLimit-Remaining': str(int(self.remaining)),
+                   'RateLimit-Reset': str(self.reset_after)}
+
+        if not self.allowed:
+            headers['Retry-After'] = str(self.retry_after)
+
+        return headers
+
+
+def take_token(tokens: float, updated_at: float, now: float,
+               limit: RateLimit) -> Tuple[bool, float]:
+    """
+    Refill the bucket for the elapsed time and take one token of it
+
+    :param tokens: Tokens in the bucket at the last update
+    :param updated_at: Time of the last update in seconds
+    :param now: Current time in seconds
+    :param limit: Limit of the bucket
+    :return: Whether token was taken and tokens left in the bucket
+    :rtype: Tuple[bool, float]
+    """
+    tokens = min(limit.count,
+                 tokens + max(now - updated_at, 0) * limit.rate)
+
+    if tokens >= 1:
+        return True, tokens - 1
+
+    return False, tokens
+
+
+def parse_rate_limits(spec: str) -> Dict[Tuple[str, str], RateLimit]:
+    """
+    Parse limits of roles and scopes
+
+    :param spec: Limits separated by comma in "[role:]scope=count/seconds"
+        format
+    :return: Limits by role and scope
+    :rtype: Dict[Tuple[str, str], RateLimit]
+    :raises ValueError: If limit is malformed
+    """
+    limits = {}
+
+    for item in filter(None, (item.strip() for item in spec.split(','))):
+        try:
+            target, value = item.split('=')
+            count, period = value.split('/')
+            role, _, scope = target.strip().rpartition(':')
+            limit = RateLimit(int(count), float(period))
+        except ValueError as error:
+            raise ValueError(f'Wrong rate limit {item}, expected '
+                             f'"[role:]scope=count/seconds"') from error
+
+        if limit.count <= 0 or limit.period <= 0:
+            raise ValueError(f'Rate limit {item} has to be positive')
+
+        limits[(role or ANY, scope.strip())] = limit
+
+    return limits
+
+
+class MemoryBackend:
+    """
+    In-process backend, every worker process has its own buckets
+    """
+
+    def __init__(self, maxsize: int):
+        self._buckets = TTLCache(maxsize, 0)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit) -> Tuple[bool, float]:
+        """
+        Take token from the bucket of the key
+
+        :param key: Key of the bucket
+        :param limit: Limit of the bucket
+        :return: Whether token was taken and tokens left in the bucket
+        :rtype: Tuple[bool, float]
+        """
+        now = time.time()
+
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (limit.count, now))
+            allowed, tokens = take_token(tokens, updated_at, now, limit)
+            # Idle bucket is full again after the period, so it's dropped
+            self._buckets.set(key, (tokens, now), limit.period)
+
+        return allowed, tokens
+
+
+class SQLiteBackend:
+    """
+    Backend on local SQLite file that is shared between worker processes.
+    Bucket is read and written within one write transaction, so concurrent
+    requests of the key are serialized
+    """
+
+    def __init__(self, path: str):
+        self._store = SQLiteStore(
+                path,
+                'CREATE TABLE IF NOT EXISTS rate_limit ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated_at REAL NOT NULL, expires_at REAL NOT NULL)',
+                'DELETE FROM rate_limit WHERE expires_at <= ?')
+
+    def take(self, key: str, limit: RateLimit) -> Tuple[bool, float]:
+        connection = self._store.connection()
+        now = time.time()
+
+        connection.execute('BEGIN IMMEDIATE')
+
+        try:
+            row = connection.execute(
+                    'SELECT tokens, updated_at FROM rate_limit '
+                    'WHERE key = ? AND expires_at > ?',
+                    (key, now)).fetchone()
+            tokens, updated_at = row or (limit.count, now)
+            allowed, tokens = take_token(tokens, updated_at, now, limit)
+
+            connection.execute(
+                    'INSERT OR REPLACE INTO rate_limit VALUES (?, ?, ?, ?)',
+                    (key, tokens, now, now + limit.period))
+
+            self._store.written(connection, now)
+
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        return allowed, tokens
+
+
+class RateLimiter:
+    """Rate limiter of API clients with limits per role and scope"""
+
+    def __init__(self, backend, limits: Dict[Tuple[str, str], RateLimit]):
+        self.backend = backend
+        self.limits = limits
+
+    def find_limit(self, role: str, scope: str) \
+            -> Optional[Tuple[str, RateLimit]]:
+        """
+        Retrieve the most specific limit of the role and scope
+
+        :param role: Role of the client
+        :param scope: Scope of the endpoint, e.g. "film.get"
+        :return: Key of the bucket scope and limit, None if unlimited
+        :rtype: Optional[Tuple[str, RateLimit]]
+        """
+        parts = scope.split('.')
+        scopes = ['.'.join(parts[:end])
+                  for end in range(len(parts), 0, -1)] + [ANY]
+
+        for limit_role in (role, ANY):
+            for limit_scope in scopes:
+                limit = self.limits.get((limit_role, limit_scope))
+
+                if limit is not None:
+                    return f'{limit_role}:{limit_scope}', limit
+
+        return None
+
+    def hit(self, scope: str, role: str, client: str) -> Optional[Decision]:
+        """
+        Take token from the bucket of the client
+
+        :param scope: Scope of the endpoint
+        :param role: Role of the client
+        :param client: Key of the client, e.g. id of the user
+        :return: Decision of the request, None if it is unlimited
+        :rtype: Optional[Decision]
+        """
+        found = self.find_limit(role, scope)
+
+        if found is None:
+            return None
+
+        bucket_scope, limit = found
+        allowed, remaining = self.backend.take(f'{bucket_scope}:{client}',
+                                               limit)
+
+        return Decision(allowed, limit, remaining)
+
+
+def create_rate_limiter(backend: str, spec: str) -> Optional[RateLimiter]:
+    """
+    Create rate limiter with backend of bucket state by its name
+
+    :param backend: One of "memory", "sqlite" or "none"
+    :param spec: Limits in "[role:]scope=count/seconds" format
+    :return: Rate limiter, None if rate limiting is disabled
+    :rtype: Optional[RateLimiter]
+    """
+    limits = parse_rate_limits(spec)
+
+    if backend == 'none' or not limits:
+        return None
+    if backend == 'memory':
+        return RateLimiter(MemoryBackend(RATE_LIMIT_SIZE), limits)
+    if backend == 'sqlite':
+        return RateLimiter(SQLiteBackend(RATE_LIMIT_PATH), limits)
+    raise ValueError(f'Unknown rate limit backend {backend}')
+
+
+rate_limiter = create_rate_limiter(RATE_LIMIT_BACKEND, RATE_LIMITS)
+
+
+def current_client() -> Tuple[str, str]:
+    """
+    Retrieve role and key of the client of the current request, clients
+    without api key are distinguished by address
+
+    :return: Role and key of the client
+    :rtype: Tuple[str, str]
+    """
+    user = flask_login.current_user
+
+    if not getattr(user, 'is_authenticated', False):
+        return ANONYMOUS_ROLE, f'address:{request.remote_addr}'
+
+    if user.is_admin:
+        role = 'admin'
+    else:
+        role = str(user.role_id) if user.role_id is not None else 'user'
+
+    return role, f'user:{user.user_id}'
+
+
+def rate_limited(scope: str):
+    """
+    Decorator that takes token from the bucket of the client before the
+    view is called. Responds with 429 and Retry-After header if the bucket
+    is empty, rate limit headers are added to every limited response
+
+    :param scope: Scope of the view, e.g. "film.get"
+    :return: Decorator of the view
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter = rate_limiter
+
+            if limiter is None:
+                return view(*args, **kwargs)
+
+            decision = limiter.hit(scope, *current_client())
+
+            if decision is None:
+                return view(*args, **kwargs)
+
+            if not decision.allowed:
+                return f'Rate limit of {decision.limit.count} requests per ' \
+                       f'{decision.limit.period:g} seconds is exceeded. ' \
+                       f'Retry after {decision.retry_after} seconds', 429, \
+                       decision.headers
+
+            @after_this_request
+            def add_headers(response):
+                response.headers.extend(decision.headers)
+                return response
+
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,214 @@
+"""
+Module with cache of HTTP responses keyed on normalized query parameters
+"""
+import functools
+import hashlib
+import json
+import os
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from flask import Response, request
+
+from film_api.cache.sqlite_store import SQLiteStore
+from film_api.cache.ttl_cache import TTLCache
+
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND') or 'none'
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE') or 4096)
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL') or 30)
+RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH') or \
+                      'response_cache.sqlite'
+
+# Headers of the view that are stored along with the body
+CACHED_HEADERS = ('X-Total-Count',)
+
+
+class CachedResponse(NamedTuple):
+    """Cached part of HTTP response"""
+    status: int
+    mimetype: str
+    body: bytes
+    headers: Tuple[Tuple[str, str], ...] = ()
+
+
+class MemoryBackend:
+    """
+    In-process LRU backend, invalidation is visible only within the process
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+        self._generations: Dict[str, int] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        """
+        Retrieve cached response
+
+        :param namespace: Namespace of the entry
+        :param key: Key of the entry
+        :return: Cached response if present and not expired
+        :rtype: CachedResponse
+        """
+        return self._cache.get(
+                (namespace, self._generations.get(namespace, 0), key))
+
+    def set(self, namespace: str, key: str, value: CachedResponse) -> None:
+        """
+        Cache the response
+
+        :param namespace: Namespace of the entry
+        :param key: Key of the entry
+        :param value: Response to be cached
+        :return: None
+        """
+        self._cache.set(
+                (namespace, self._generations.get(namespace, 0), key), value)
+
+    def invalidate(self, namespace: str) -> None:
+        """
+        Drop all entries of the namespace, entries of the previous
+        generation are left to be evicted by LRU
+
+        :param namespace: Namespace to be invalidated
+        :return: None
+        """
+        self._generations[namespace] = \
+            self._generations.get(namespace, 0) + 1
+
+
+class SQLiteBackend:
+    """
+    Backend on local SQLite file that is shared between worker processes
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._store = SQLiteStore(
+                path,
+                'CREATE TABLE IF NOT EXISTS response_cache ('
+                'namespace TEXT NOT NULL, key TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, status INTEGER NOT NULL, '
+                'mimetype TEXT NOT NULL, body BLOB NOT NULL, '
+                'headers TEXT NOT NULL, PRIMARY KEY (namespace, key))',
+                'DELETE FROM response_cache WHERE expires_at <= ?')
+
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        row = self._store.connection().execute(
+                'SELECT status, mimetype, body, headers FROM response_cache '
+                'WHERE namespace = ? AND key = ? AND expires_at > ?',
+                (namespace, key, time.time())).fetchone()
+
+        if row is None:
+            return None
+
+        status, mimetype, body, headers = row
+
+        return CachedResponse(status, mimetype, body,
+                              tuple(map(tuple, json.loads(headers))))
+
+    def set(self, namespace: str, key: str, value: CachedResponse) -> None:
+        connection = self._store.connection()
+        now = time.time()
+
+        connection.execute(
+                'INSERT OR REPLACE INTO response_cache '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (namespace, key, now + self.ttl, value.status,
+                 value.mimetype, value.body, json.dumps(value.headers)))
+
+        self._store.written(connection, now)
+
+    def invalidate(self, namespace: str) -> None:
+        self._store.connection().execute(
+                'DELETE FROM response_cache WHERE namespace = ?',
+                (namespace,))
+
+
+def create_response_cache(backend: str):
+    """
+    Create response cache backend by its name
+
+    :param backend: One of "memory", "sqlite" or "none"
+    :return: Backend instance, None if cache is disabled
+    """
+    if backend == 'memory':
+        return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+    if backend == 'sqlite':
+        return SQLiteBackend(RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL)
+    if backend == 'none':
+        return None
+    raise ValueError(f'Unknown response cache backend {backend}')
+
+
+response_cache = create_response_cache(RESPONSE_CACHE_BACKEND)
+
+
+def request_cache_key() -> str:
+    """
+    Build cache key of the current request from its path and query
+    parameters regardless of their order
+
+    :return: Cache key
+    :rtype: str
+    """
+    params = sorted((key, value) for key, values in request.args.lists()
+                    for value in values)
+
+    return hashlib.sha1(repr((request.path, params)).encode()).hexdigest()
+
+
+def invalidate(namespace: str) -> None:
+    """
+    Drop cached responses of the namespace
+
+    :param namespace: Namespace to be invalidated
+    :return: None
+    """
+    if response_cache is not None:
+        response_cache.invalidate(namespace)
+
+
+def cached_response(namespace: str):
+    """
+    Decorator that caches successful JSON responses of the view
+
+    :param namespace: Namespace of the view responses used to invalidate them
+    :return: Decorator of the view
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = response_cache
+
+            # Streamed responses are never cached
+            if cache is None or request.accept_mimetypes.best_match(
+                    ['application/json', 'application/x-ndjson'],
+                    default='application/json') != 'application/json':
+                return view(*args, **kwargs)
+
+            key = request_cache_key()
+            cached = cache.get(namespace, key)
+
+            if cached is not None:
+                return Response(cached.body, status=cached.status,
+                                headers=list(cached.headers),
+                                mimetype=cached.mimetype)
+
+            response = view(*args, **kwargs)
+
+            if isinstance(response, Response) and \
+                    response.status_code == 200 and \
+                    not response.is_streamed:
+                cache.set(namespace, key,
+                          CachedResponse(response.status_code,
+                                         response.mimetype,
+                                         response.get_data(),
+                                         tuple((name, response.headers[name])
+                                               for name in CACHED_HEADERS
+                                               if name in response.headers)))
+
+            return response
+
+        return wrapper
+
+    return decorator
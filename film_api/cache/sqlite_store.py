@@ -0,0 +1,62 @@
+"""
+Module with local SQLite file store that is shared between worker processes
+"""
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """
+    Table in local SQLite file with connection per thread. Expired rows are
+    purged every purge_interval writes, so the file doesn't grow with keys
+    that are never read again
+    """
+    purge_interval = 1000
+
+    def __init__(self, path: str, schema: str, purge_statement: str):
+        """
+        :param path: Path of SQLite file
+        :param schema: Statement that creates the table if it is missing
+        :param purge_statement: Statement that deletes expired rows, takes
+            the expiration threshold as its only parameter
+        """
+        self.path = path
+        self.purge_statement = purge_statement
+        self._local = threading.local()
+        self._writes_count = 0
+
+        self.connection().execute(schema)
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Retrieve connection of the current thread, connection is in
+        autocommit mode and in WAL journal mode, so readers don't block
+        the writer
+
+        :return: Connection to the store
+        :rtype: sqlite3.Connection
+        """
+        connection = getattr(self._local, 'connection', None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+
+        return connection
+
+    def written(self, connection: sqlite3.Connection,
+                expired_before: float) -> None:
+        """
+        Count the write and purge expired rows every purge_interval writes
+
+        :param connection: Connection the row has been written with
+        :param expired_before: Expiration threshold of the purge statement
+        :return: None
+        """
+        self._writes_count += 1
+
+        if self._writes_count % self.purge_interval == 0:
+            connection.execute(self.purge_statement, (expired_before,))
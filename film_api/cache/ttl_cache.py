@@ -0,0 +1,105 @@
+"""Module with in-process bounded cache with expiration of entries"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread safe LRU cache which entries expire after given amount of seconds
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default=None) -> Any:
+        """
+        Retrieve value from the cache
+
+        :param key: Key of the entry
+        :param default: Value returned if entry is absent or expired
+        :return: Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+
+            return value
+
+    def set(self, key: Hashable, value: Any,
+            ttl: Optional[float] = None) -> None:
+        """
+        Put value to the cache evicting least recently used entries
+
+        :param key: Key of the entry
+        :param value: Value to be cached
+        :param ttl: Seconds till expiration, cache ttl if not provided
+        :return: None
+        """
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Any]) \
+            -> Any:
+        """
+        Retrieve value from the cache or load and cache it if it's absent.
+        None values are not cached
+
+        :param key: Key of the entry
+        :param loader: Function that loads value by the key
+        :return: Cached or loaded value
+        """
+        value = self.get(key)
+
+        if value is None:
+            value = loader(key)
+
+            if value is not None:
+                self.set(key, value)
+
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Remove entry from the cache if present
+
+        :param key: Key of the entry
+        :return: None
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache
+
+        :return: None
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
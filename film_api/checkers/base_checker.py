@@ -6,6 +6,81 @@ from decimal import Decimal
 
 Numeric = [int, float, Decimal]
 
+DATE_RE = re.compile(r'\d{4}-\d{1,2}-\d{1,2}')
+
+
+def wrong_type_error(expected_type, wrong_type) -> str:
+    """
+    Build error message of the value with wrong type
+
+    :param expected_type: Expected type of the value
+    :param wrong_type: Actual type of the value
+    :return: Error message
+    :rtype: str
+    """
+    return f'Wrong type, expected {expected_type}, got {wrong_type}'
+
+
+def varchar_length_error(max_length: int, length: int) -> str:
+    """
+    Build error message of too long string
+
+    :param max_length: Max length
+    :param length: Actual length
+    :return: Error message
+    :rtype: str
+    """
+    return f'Expected max length of {max_length}, got {length}'
+
+
+def number_range_error(min_value, max_value, data) -> str:
+    """
+    Build error message of the number out of range
+
+    :param min_value: Min range number (included)
+    :param max_value: Max range number (excluded)
+    :param data: Actual number
+    :return: Error message
+    :rtype: str
+    """
+    return f'Value out of range. Expected from {min_value} to' \
+           f' {max_value}. Got {data} instead'
+
+
+def date_errors(data: str, current_year: int) -> List[str]:
+    """
+    Check date string for format and ranges of its parts
+
+    :param data: String that contains date of format 'YYYY-MM-DD'
+    :param current_year: Latest allowed year
+    :return: List of errors, empty if date is correct
+    :rtype: List[str]
+    """
+    if not DATE_RE.fullmatch(data):
+        return [f'Wrong date format. Expected "YYYY-MM-DD" format, '
+                f'got {data}']
+
+    errors = []
+    year, month, day = [int(x) for x in data.split('-')]
+
+    if not 1888 <= year <= current_year:
+        errors.append(f'Wrong year. First film was filmed in 1888. '
+                      f'Got {year}')
+
+    if not 0 < month < 13:
+        errors.append(f'Wrong month. Got {month}')
+
+    if not 0 < day < 32:
+        errors.append(f'Wrong day. Got {day}')
+
+    if not errors:
+        try:
+            datetime.date(year, month, day)
+        except ValueError:
+            errors.append(f'Wrong day. {data} is not a calendar date')
+
+    return errors
+
 
 class BaseChecker:
     """
@@ -17,8 +92,7 @@ class BaseChecker:
         self.errors: List[str] = []
 
     def _add_error_wrong_type(self, expected_type, wrong_type):
-        self.errors.append(
-                f'Wrong type, expected {expected_type}, got {wrong_type}')
+        self.errors.append(wrong_type_error(expected_type, wrong_type))
 
     def check_varchar(self, data, max_length: int) -> None:
         """
@@ -36,8 +110,7 @@ class BaseChecker:
 
         if len(data) > max_length:
             self.mark_incorrect()
-            self.errors.append(
-                    f'Expected max length of {max_length}, got {len(data)}')
+            self.errors.append(varchar_length_error(max_length, len(data)))
 
     def check_number(self, data, min_value: Numeric,
                      max_value: Numeric) -> None:
@@ -57,9 +130,7 @@ class BaseChecker:
 
         if not min_value <= data < max_value:
             self.mark_incorrect()
-            self.errors.append(
-                    f'Value out of range. Expected from {min_value} to'
-                    f' {max_value}. Got {data} instead')
+            self.errors.append(number_range_error(min_value, max_value, data))
 
     def check_date(self, data: str) -> None:
         """
@@ -73,27 +144,11 @@ class BaseChecker:
             self._add_error_wrong_type(str, type(data))
             return
 
-        if not re.match(r'\d{4}-\d{1,2}-\d{1,2}', data):
-            self.mark_incorrect()
-            self.errors.append(
-                    f'Wrong date format. Expected "YYYY-MM-DD" format, '
-                    f'got {data}')
-            return
-
-        year, month, day = [int(x) for x in data.split('-')]
-
-        if not 1888 <= year <= datetime.datetime.now().year:
-            self.mark_incorrect()
-            self.errors.append(f'Wrong year. First film was filmed in 1888. '
-                               f'Got {year}')
-
-        if not 0 < month < 13:
-            self.mark_incorrect()
-            self.errors.append(f'Wrong month. Got {month}')
+        errors = date_errors(data, datetime.datetime.now().year)
 
-        if not 0 < day < 32:
+        if errors:
             self.mark_incorrect()
-            self.errors.append(f'Wrong day. Got {day}')
+            self.errors.extend(errors)
 
     def mark_incorrect(self) -> None:
         """
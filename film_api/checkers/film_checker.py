@@ -1,8 +1,16 @@
 """Module with film checker class"""
-from typing import Dict, Optional, List, Tuple
+import datetime
+from typing import Dict, Optional, List, Tuple, Union
 
 import film_api.checkers.constrains as constr
-from film_api.checkers.base_checker import BaseChecker
+from film_api.checkers.base_checker import (BaseChecker, Numeric,
+                                            date_errors,
+                                            number_range_error,
+                                            varchar_length_error,
+                                            wrong_type_error)
+
+# Errors of the batch by index of the record
+BatchErrors = Dict[int, List[str]]
 
 
 class FilmChecker(BaseChecker):
@@ -12,9 +20,14 @@ class FilmChecker(BaseChecker):
     film_reference_list = ['created_by', 'description', 'director_id',
                            'film_title', 'poster', 'rating', 'release_date']
 
+    film_patch_list = ['description', 'director_id', 'film_title', 'poster',
+                       'rating', 'release_date']
+
     film_str_data = ['film_title', 'poster', 'description']
     film_date_data = ['release_date']
     film_numeric_data = ['rating']
+    # Fields that may be cleared by patch
+    film_nullable_data = ['description', 'rating']
 
     def check_film_data(self, film_data: Dict) -> None:
         """
@@ -42,6 +55,69 @@ class FilmChecker(BaseChecker):
                               constr.FILM_RATING_MIN,
                               constr.FILM_RATING_MAX)
 
+        self.check_director_id(film_data['director_id'])
+
+    def check_director_id(self, director_id) -> None:
+        """
+        Check director id of the film to be integer or empty
+
+        :param director_id: Id of the director
+        :return: None
+        """
+        if director_id is not None and type(director_id) is not int:
+            self.mark_incorrect()
+            self._add_error_wrong_type(int, type(director_id))
+
+    def check_film_patch(self, patch_data: Dict) -> None:
+        """
+        Checks only the given fields of film data for basic column type
+        restrictions, nullable fields may be cleared with None
+
+        :param patch_data: Dict of changed film fields
+        :return: None
+        """
+        if not patch_data or \
+                not set(patch_data.keys()) <= set(self.film_patch_list):
+            self.mark_incorrect()
+            self.errors.append(f'Wrong fields were given. '
+                               f'Expected any of {self.film_patch_list}, '
+                               f'got {patch_data.keys()}')
+            return
+
+        patch_data = {key: value for key, value in patch_data.items()
+                      if value is not None or
+                      key not in self.film_nullable_data}
+
+        for key in self.film_str_data:
+            if key in patch_data:
+                self.check_varchar(patch_data[key],
+                                   constr.film_constraint_dict[key])
+
+        for key in self.film_date_data:
+            if key in patch_data:
+                self.check_date(patch_data[key])
+
+        for key in self.film_numeric_data:
+            if key in patch_data:
+                self.check_number(patch_data[key],
+                                  constr.FILM_RATING_MIN,
+                                  constr.FILM_RATING_MAX)
+
+        self.check_director_id(patch_data.get('director_id'))
+
+    def start_patch_validation(self, patch_data: Dict) \
+            -> Tuple[bool, Optional[List[str]]]:
+        """
+        Perform validation of changed film fields and returns result of it
+
+        :param patch_data: Dict of changed film fields
+        :return: Correctness flag and errors that occurred during the check
+        :rtype: Tuple[bool, Optional[List]]
+        """
+        self.check_film_patch(patch_data)
+
+        return self.is_correct(), self.get_errors()
+
     def start_validation(self, film_data: Dict) \
             -> Tuple[bool, Optional[List[str]]]:
         """
@@ -54,3 +130,133 @@ class FilmChecker(BaseChecker):
         self.check_film_data(film_data)
 
         return self.is_correct(), self.get_errors()
+
+    @classmethod
+    def _wrong_fields_error(cls, keys) -> str:
+        return f'Wrong fields were given. ' \
+               f'Expected {cls.film_reference_list}, ' \
+               f'got {keys}'
+
+    @staticmethod
+    def _check_varchar_column(values: List, max_length: int,
+                              rows: List[int], errors: BatchErrors) -> None:
+        for row, value in zip(rows, values):
+            if not isinstance(value, str):
+                errors.setdefault(row, []).append(
+                        wrong_type_error(str, type(value)))
+            elif len(value) > max_length:
+                errors.setdefault(row, []).append(
+                        varchar_length_error(max_length, len(value)))
+
+    @staticmethod
+    def _check_date_column(values: List, rows: List[int],
+                           errors: BatchErrors) -> None:
+        current_year = datetime.datetime.now().year
+        # Dates repeat a lot in bulk data, so each distinct one is checked once
+        checked_dates = {}
+
+        for row, value in zip(rows, values):
+            if not isinstance(value, str):
+                errors.setdefault(row, []).append(
+                        wrong_type_error(str, type(value)))
+                continue
+
+            value_errors = checked_dates.get(value)
+
+            if value_errors is None:
+                value_errors = checked_dates[value] = \
+                    date_errors(value, current_year)
+
+            if value_errors:
+                errors.setdefault(row, []).extend(value_errors)
+
+    @staticmethod
+    def _check_number_column(values: List, min_value, max_value,
+                             rows: List[int], errors: BatchErrors) -> None:
+        numeric_types = set(Numeric)
+
+        for row, value in zip(rows, values):
+            if type(value) not in numeric_types:
+                errors.setdefault(row, []).append(
+                        wrong_type_error(Numeric, type(value)))
+            elif not min_value <= value < max_value:
+                errors.setdefault(row, []).append(
+                        number_range_error(min_value, max_value, value))
+
+    @staticmethod
+    def _check_id_column(values: List, rows: List[int],
+                         errors: BatchErrors) -> None:
+        for row, value in zip(rows, values):
+            if value is not None and type(value) is not int:
+                errors.setdefault(row, []).append(
+                        wrong_type_error(int, type(value)))
+
+    @classmethod
+    def _check_columns(cls, columns: Dict[str, List], rows: List[int],
+                       errors: BatchErrors) -> None:
+        for key in cls.film_str_data:
+            cls._check_varchar_column(columns[key],
+                                      constr.film_constraint_dict[key],
+                                      rows, errors)
+
+        for key in cls.film_date_data:
+            cls._check_date_column(columns[key], rows, errors)
+
+        for key in cls.film_numeric_data:
+            cls._check_number_column(columns[key],
+                                     constr.FILM_RATING_MIN,
+                                     constr.FILM_RATING_MAX,
+                                     rows, errors)
+
+        cls._check_id_column(columns['director_id'], rows, errors)
+
+    @classmethod
+    def validate_batch(cls, films_data: Union[List[Dict], Dict[str, List]]) \
+            -> BatchErrors:
+        """
+        Perform validation of many films at once column by column.
+        Films are given either as list of dicts or as columnar dict of
+        lists of values with the same length
+
+        :param films_data: List of films data or dict of columns
+        :return: Errors by index of the film, empty if all films are correct
+        :rtype: Dict[int, List[str]]
+        """
+        errors: BatchErrors = {}
+        reference_keys = set(cls.film_reference_list)
+
+        if isinstance(films_data, dict):
+            if set(films_data.keys()) != reference_keys:
+                rows_count = max([len(values) for values in
+                                  films_data.values()] or [0])
+                error = cls._wrong_fields_error(films_data.keys())
+                return {row: [error] for row in range(rows_count)}
+
+            rows_count = len(films_data[cls.film_reference_list[0]])
+
+            for key, values in films_data.items():
+                if len(values) != rows_count:
+                    raise ValueError(f'Column {key} has {len(values)} values,'
+                                     f' expected {rows_count}')
+
+            cls._check_columns(films_data, list(range(rows_count)), errors)
+
+            return errors
+
+        rows = []
+
+        for row, film_data in enumerate(films_data):
+            if not isinstance(film_data, dict):
+                errors[row] = [wrong_type_error(dict, type(film_data))]
+            elif film_data.keys() != reference_keys:
+                errors[row] = [cls._wrong_fields_error(film_data.keys())]
+            else:
+                rows.append(row)
+
+        columns = {key: [films_data[row][key] for row in rows]
+                   for key in cls.film_str_data + cls.film_date_data +
+                   cls.film_numeric_data + ['director_id']}
+
+        cls._check_columns(columns, rows, errors)
+
+        return errors
@@ -0,0 +1,202 @@
+"""
+Module with awaitable counterparts of DBWorker queries for async sessions.
+Queries are built by DBWorker and executed with async SQLAlchemy, requires
+aiosqlite or asyncpg driver of the database
+"""
+import os
+from typing import AsyncIterator, List, Optional, Union
+
+from sqlalchemy import select
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, \
+    create_async_engine
+from sqlalchemy.orm import Query, sessionmaker
+
+from film_api.cache.genre_cache import get_genre_ids
+from film_api.database import models
+from film_api.database.db_worker import DBWorker
+from film_api.database.pagination import KeysetPage, OffsetPage, SortKey
+from film_api.database.search import prepare_search
+
+ASYNC_DB_CONN_STR = os.getenv('ASYNC_DB_CONN_STR')
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_url(conn_str: str) -> URL:
+    """
+    Replace driver of the connection string with the async one
+
+    :param conn_str: Connection string of the database
+    :return: URL of the database with async driver
+    :rtype: URL
+    :raises ValueError: If database has no supported async driver
+    """
+    url = make_url(conn_str)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+
+    if driver is None:
+        raise ValueError(f'No async driver for {url.get_backend_name()}')
+
+    return url.set(drivername=driver)
+
+
+def create_async_session_factory(conn_str: Optional[str] = None) \
+        -> sessionmaker:
+    """
+    Create engine with async driver and factory of its sessions
+
+    :param conn_str: Connection string of the database, ASYNC_DB_CONN_STR
+        or DB_CONN_STR with async driver if empty
+    :return: Factory of async sessions
+    :rtype: sessionmaker
+    """
+    url: Union[str, URL] = conn_str or ASYNC_DB_CONN_STR or \
+        async_url(models.DB_CONN_STR)
+    options = models.engine_options(str(url))
+    engine = create_async_engine(url, **options)
+
+    return sessionmaker(engine, class_=AsyncSession, autoflush=False,
+                        expire_on_commit=False)
+
+
+class AsyncDBWorker:
+    """
+    Proxy class for executing DBWorker queries with async sessions.
+    Pagination helpers are run through AsyncSession.run_sync, so they are
+    shared with DBWorker as is
+    """
+
+    @staticmethod
+    async def prepare(engine: AsyncEngine) -> None:
+        """
+        Detect search features of the database once, so building search
+        queries doesn't block the event loop
+
+        :param engine: Async engine of the database
+        :return: None
+        """
+        async with engine.connect() as connection:
+            await connection.run_sync(prepare_search)
+
+    @staticmethod
+    async def load_genre_ids(session: AsyncSession) -> None:
+        """
+        Load genres cache used by genre filters of DBWorker if it's expired
+
+        :param session: Async session
+        :return: None
+        """
+        await session.run_sync(get_genre_ids)
+
+    @staticmethod
+    async def get_user_by_api_key(session: AsyncSession, api_key: str) \
+            -> Optional[models.User]:
+        """
+        Retrieve user from db by api_key
+
+        :param session: Async session
+        :param api_key: Api key of the user
+        :return: User instance if such exists
+        :rtype: User
+        """
+        result = await session.execute(
+                select(models.User).filter_by(api_key=api_key).limit(1))
+
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_user_by_creds(session: AsyncSession, username: str,
+                                password: str) -> Optional[models.User]:
+        """
+        Retrieve user from db by username and password
+
+        :param session: Async session
+        :param username: Username of user
+        :param password: Password of user
+        :return: User instance if such exists
+        :rtype: User
+        """
+        result = await session.execute(
+                select(models.User).filter_by(username=username,
+                                              password=password).limit(1))
+
+        return result.scalars().first()
+
+    @staticmethod
+    async def fetch_all(session: AsyncSession, query: Query) -> List:
+        """
+        Execute query built by DBWorker
+
+        :param session: Async session
+        :param query: Query of model instances
+        :return: List of model instances
+        :rtype: List
+        """
+        result = await session.execute(query.statement)
+
+        return result.scalars().all()
+
+    @staticmethod
+    async def stream_query(session: AsyncSession,
+                           query: Query) -> AsyncIterator:
+        """
+        Fetch model instances of the query in batches from server-side
+        cursor
+
+        :param session: Async session
+        :param query: Query of model instances
+        :return: Async iterator of model instances
+        :rtype: AsyncIterator
+        """
+        result = await session.stream_scalars(
+                query.statement,
+                execution_options={'yield_per': DBWorker.stream_batch_size})
+
+        async for instance in result:
+            yield instance
+
+    @staticmethod
+    async def get_page_from_query(session: AsyncSession, query: Query,
+                                  page: int,
+                                  count_mode: Optional[str] = None) \
+            -> OffsetPage:
+        """
+        Retrieve page of the query with total amount of entries
+
+        :param session: Async session
+        :param query: Query to be paginated
+        :param page: Number of the page starting from 1
+        :param count_mode: "exact", "capped", "estimate" or "none"
+        :return: Page of items with total amount of entries
+        :rtype: OffsetPage
+        :raises ValueError: If count mode is unknown
+        """
+        return await session.run_sync(
+                lambda sync_session: DBWorker.get_page_from_query(
+                        query.with_session(sync_session), page, count_mode))
+
+    @staticmethod
+    async def get_keyset_page_from_query(session: AsyncSession,
+                                         query: Query,
+                                         sort_keys: List[SortKey],
+                                         cursor: Optional[str] = None) \
+            -> KeysetPage:
+        """
+        Retrieve page of the query after the given cursor
+
+        :param session: Async session
+        :param query: Query to be paginated
+        :param sort_keys: Sort keys with unique tiebreaker as the last one
+        :param cursor: Opaque cursor of the page, first page if empty
+        :return: Page of items with cursor of the next page
+        :rtype: KeysetPage
+        :raises ValueError: If cursor is malformed
+        """
+        return await session.run_sync(
+                lambda sync_session: DBWorker.get_keyset_page_from_query(
+                        query.with_session(sync_session), sort_keys,
+                        cursor))
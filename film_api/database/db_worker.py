@@ -1,17 +1,38 @@
 """Module that contains basic database queries"""
+import datetime
 import os
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from paginate_sqlalchemy import SqlalchemyOrmPage
-from sqlalchemy.orm import Query
+from sqlalchemy import and_, false, select
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Query, Session, load_only, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
+from film_api.cache.genre_cache import get_genre_ids
 from film_api.database import models
+from film_api.database.pagination import (KeysetPage, OffsetPage, SortKey,
+                                         keyset_page, offset_page)
+from film_api.database.search import get_search_backend
 
 
 class DBWorker:
     """Proxy class for retrieving data from the database"""
 
     page_size = os.getenv('paginate_page_size') or 10
+    stream_batch_size = int(os.getenv('stream_batch_size') or 1000)
+    insert_chunk_size = int(os.getenv('insert_chunk_size') or 1000)
+    count_mode = os.getenv('count_mode') or 'exact'
+    count_cap = int(os.getenv('count_cap') or 10000)
+
+    films_catalog = 'films'
+    film_expansions = {'director': models.Film.director,
+                       'genres': models.Film.genres}
+    film_fields = tuple(attr.key for attr in
+                        models.Film.__mapper__.column_attrs)
+    # Large text columns are loaded in list views only if requested
+    film_list_fields = tuple(field for field in film_fields
+                             if field not in ('description', 'poster'))
 
     @staticmethod
     def get_user_by_id(user_id: int) -> Optional[models.User]:
@@ -48,15 +69,86 @@ class DBWorker:
         return models.User.query.filter_by(api_key=api_key).first()
 
     @staticmethod
-    def get_film_by_id(film_id: int) -> Query:
+    def get_catalog_state(name: str) \
+            -> Optional[Tuple[int, datetime.datetime]]:
+        """
+        Retrieve version and modification time of the catalog without
+        loading the model instance
+
+        :param name: Name of the catalog
+        :return: Version and modification time if catalog was ever changed
+        :rtype: Optional[Tuple[int, datetime.datetime]]
+        """
+        return models.db_session.query(models.CatalogState.version,
+                                       models.CatalogState.modified_at) \
+            .filter_by(name=name).first()
+
+    @staticmethod
+    def touch_catalog(name: str) -> None:
+        """
+        Increase version of the catalog within current transaction, has to be
+        called along with every change of the catalog entities
+
+        :param name: Name of the catalog
+        :return: None
+        """
+        modified_at = datetime.datetime.utcnow().replace(microsecond=0)
+
+        updated = models.db_session.query(models.CatalogState) \
+            .filter_by(name=name) \
+            .update({models.CatalogState.version:
+                     models.CatalogState.version + 1,
+                     models.CatalogState.modified_at: modified_at},
+                    synchronize_session=False)
+
+        if not updated:
+            models.db_session.add(models.CatalogState(name, 1, modified_at))
+
+    @staticmethod
+    def _query(model, session: Optional[Session] = None) -> Query:
+        if session is None:
+            return model.query
+
+        return session.query(model)
+
+    @staticmethod
+    def get_film_by_id(film_id: int,
+                       session: Optional[Session] = None) -> Query:
         """
         Retrieve film by it's id
 
         :param film_id: Id of the film
+        :param session: Session the query is built on, scoped session if
+            empty
         :return: Query of film if found
         :rtype: Query
         """
-        return models.Film.query.filter_by(film_id=film_id)
+        return DBWorker._query(models.Film, session) \
+            .filter_by(film_id=film_id)
+
+    @staticmethod
+    def get_film_version(film_id: int) -> Optional[int]:
+        """
+        Retrieve version of the film without loading the film
+
+        :param film_id: Id of the film
+        :return: Version of the film if film exists
+        :rtype: Optional[int]
+        """
+        return models.db_session.query(models.Film.version) \
+            .filter_by(film_id=film_id).scalar()
+
+    @staticmethod
+    def get_film_poster(film_id: int) -> Optional[str]:
+        """
+        Retrieve poster reference of the film without loading the film
+
+        :param film_id: Id of the film
+        :return: Sha256 of the poster if film exists
+        :rtype: Optional[str]
+        """
+        return models.db_session.query(models.Film.poster) \
+            .filter_by(film_id=film_id).scalar()
 
     @staticmethod
     def get_film_by_id_by_user(film_id: int, user_id: int) -> Query:
@@ -72,25 +164,163 @@ class DBWorker:
             .filter_by(created_by=user_id)
 
     @staticmethod
-    def delete_film_by_id(film_id: int, user_id: int) -> Query:
+    def delete_film_by_id(film_id: int, user_id: int) -> Optional[Row]:
         """
-        Delete film by id and commit changes to the database
+        Delete film of the user by id and commit changes to the database
 
         :param film_id: Film id to be deleted
         :param user_id: User that intent to delete the film
-        :return: Query of film
-        :rtype: Query
+        :return: Row of the deleted film, None if nothing was deleted
+        :rtype: Optional[Row]
         """
-        film = DBWorker.get_film_by_id(film_id).first()
+        deleted = DBWorker.delete_films([film_id], user_id)
 
-        models.Film.query.filter_by(film_id=film_id) \
-            .filter_by(created_by=user_id).delete()
+        return deleted[0] if deleted else None
 
+    @staticmethod
+    def delete_films(film_ids: Sequence[int], user_id: int) -> List[Row]:
+        """
+        Delete films of the user in one DELETE ... RETURNING statement and
+        commit changes to the database. Databases without RETURNING
+        (SQLite) select the rows on the primary within the same
+        transaction first and delete exactly these rows. Genres of the
+        films are deleted explicitly there, since SQLite doesn't enforce
+        ON DELETE CASCADE without foreign_keys pragma
+
+        :param film_ids: Ids of films to be deleted
+        :param user_id: User that intent to delete the films
+        :return: Rows of deleted films, films of other users are skipped
+        :rtype: List[Row]
+        """
+        if not film_ids:
+            return []
+
+        films = models.Film.__table__
+        condition = and_(films.c.film_id.in_(film_ids),
+                         films.c.created_by == user_id)
+        primary = models.db_session.get_bind()
+
+        if primary.dialect.full_returning:
+            deleted = models.db_session.execute(
+                    films.delete().where(condition).returning(*films.c)) \
+                .all()
+        else:
+            deleted = models.db_session.execute(
+                    select(films).where(condition),
+                    bind_arguments={'bind': primary}).all()
+
+            if deleted:
+                deleted_ids = [row.film_id for row in deleted]
+                film_genres = models.FilmGenre.__table__
+
+                models.db_session.execute(film_genres.delete().where(
+                        film_genres.c.film_id.in_(deleted_ids)))
+                models.db_session.execute(films.delete().where(
+                        condition, films.c.film_id.in_(deleted_ids)))
+
+        if deleted:
+            DBWorker.touch_catalog(DBWorker.films_catalog)
+
+        models.db_session.commit()
+
+        return deleted
+
+    @staticmethod
+    def update_film(film_id: int, user_id: int, changes: Dict,
+                    version: Optional[int] = None) -> Optional[int]:
+        """
+        Apply changes to the columns of the film of the user in one UPDATE
+        statement which increases version of the film, and commit changes
+        to the database. Film is updated only if it still has the expected
+        version
+
+        :param film_id: Film id to be changed
+        :param user_id: User that intent to change the film
+        :param changes: Dict of changed column values
+        :param version: Version of the film the changes are based on, the
+            latest version if empty
+        :return: New version of the film, None if film of the user was not
+            found
+        :rtype: Optional[int]
+        :raises StaleDataError: If the film has been changed since the
+            expected version
+        """
+        films = models.Film.__table__
+        film_condition = and_(films.c.film_id == film_id,
+                              films.c.created_by == user_id)
+        condition = film_condition
+
+        if version is not None:
+            condition = and_(condition, films.c.version == version)
+
+        statement = films.update().where(condition) \
+            .values({**changes, 'version': films.c.version + 1})
+        primary = models.db_session.get_bind()
+        version_query = select(films.c.version).where(film_condition)
+
+        if primary.dialect.full_returning:
+            new_version = models.db_session.execute(
+                    statement.returning(films.c.version)).scalar()
+        else:
+            updated = models.db_session.execute(statement).rowcount
+            new_version = models.db_session.execute(
+                    version_query, bind_arguments={'bind': primary}) \
+                .scalar() if updated else None
+
+        if new_version is None:
+            models.db_session.rollback()
+
+            if version is not None and models.db_session.execute(
+                    version_query,
+                    bind_arguments={'bind': primary}).scalar() is not None:
+                raise StaleDataError(f'Film {film_id} has been changed '
+                                     f'since version {version}')
+            return None
+
+        DBWorker.touch_catalog(DBWorker.films_catalog)
+        models.db_session.commit()
+
+        return new_version
+
+    @staticmethod
+    def insert_films(films_data: List[Dict]) \
+            -> Tuple[int, Dict[int, List[str]]]:
+        """
+        Insert films with bulk executemany statements in chunks and commit
+        them in a single transaction. Chunk rejected by the database is
+        retried film by film, so only the rejected films are left out
+
+        :param films_data: List of dicts with column values of films
+        :return: Amount of inserted films and errors by index of the film
+        :rtype: Tuple[int, Dict[int, List[str]]]
+        """
+        insert_statement = models.Film.__table__.insert()
+        chunk_size = DBWorker.insert_chunk_size
+        errors = {}
+
+        for start in range(0, len(films_data), chunk_size):
+            chunk = films_data[start:start + chunk_size]
+
+            try:
+                with models.db_session.begin_nested():
+                    models.db_session.execute(insert_statement, chunk)
+            except (IntegrityError, DataError):
+                for index, film_data in enumerate(chunk, start):
+                    try:
+                        with models.db_session.begin_nested():
+                            models.db_session.execute(insert_statement,
+                                                      film_data)
+                    except (IntegrityError, DataError) as error:
+                        errors[index] = [f'Film was rejected by the '
+                                         f'database: {error.orig}']
+
+        inserted = len(films_data) - len(errors)
+
+        if inserted:
+            DBWorker.touch_catalog(DBWorker.films_catalog)
         models.db_session.commit()
 
-        if film:
-            return film
-        return None
+        return inserted, errors
 
     @staticmethod
     def get_film_by_title(film_title: str) -> Query:
@@ -104,6 +334,108 @@ class DBWorker:
         search = "%{}%".format(film_title)
         return models.Film.query.filter(models.Film.film_title.ilike(search))
 
+    @staticmethod
+    def search_films(search_text: str, ranked: bool = True,
+                     session: Optional[Session] = None) -> Query:
+        """
+        Full-text search of films by title and description with
+        index of the database
+
+        :param search_text: Text to be searched
+        :param ranked: Order films by relevance if True
+        :param session: Session the query is built on, scoped session if
+            empty
+        :return: Query of films that matched the text
+        :rtype: Query
+        """
+        film_query = DBWorker._query(models.Film, session)
+        backend = get_search_backend(film_query.session.get_bind()
+                                     .dialect.name)
+
+        return backend.search(film_query, search_text, ranked)
+
+    @staticmethod
+    def parse_film_expansions(expand: Optional[str]) -> Tuple[str, ...]:
+        """
+        Parse comma separated names of film relationships to be expanded
+
+        :param expand: Names like "director,genres", nothing if empty
+        :return: Sorted unique names of relationships
+        :rtype: Tuple[str, ...]
+        :raises ValueError: If relationship can't be expanded
+        """
+        names = {name.strip() for name in (expand or '').split(',')
+                 if name.strip()}
+        unknown = names - DBWorker.film_expansions.keys()
+
+        if unknown:
+            raise ValueError(f'Unknown expansions {sorted(unknown)}, '
+                             f'choose from {sorted(DBWorker.film_expansions)}')
+
+        return tuple(sorted(names))
+
+    @staticmethod
+    def expand_films(film_query: Query, expansions: Tuple[str, ...]) -> Query:
+        """
+        Load related entities of films with one additional batched query
+        per relationship regardless of the amount of films
+
+        :param film_query: Query of films
+        :param expansions: Names of relationships from parse_film_expansions
+        :return: Query of films with eager loading options
+        :rtype: Query
+        """
+        if not expansions:
+            return film_query
+
+        return film_query.options(
+                *[selectinload(DBWorker.film_expansions[name])
+                  for name in expansions])
+
+    @staticmethod
+    def parse_film_fields(fields: Optional[str]) \
+            -> Optional[Tuple[str, ...]]:
+        """
+        Parse comma separated names of film columns to be retrieved
+
+        :param fields: Names like "film_id,film_title", nothing if empty
+        :return: Unique names of columns in order of the model, None if
+            columns weren't requested
+        :rtype: Optional[Tuple[str, ...]]
+        :raises ValueError: If film has no such column
+        """
+        names = {name.strip() for name in (fields or '').split(',')
+                 if name.strip()}
+
+        if not names:
+            return None
+
+        unknown = names - set(DBWorker.film_fields)
+
+        if unknown:
+            raise ValueError(f'Unknown fields {sorted(unknown)}, '
+                             f'choose from {list(DBWorker.film_fields)}')
+
+        return tuple(field for field in DBWorker.film_fields
+                     if field in names)
+
+    @staticmethod
+    def load_film_fields(film_query: Query, fields: Sequence[str]) -> Query:
+        """
+        Load only the given columns of films, other columns are deferred
+        and excluded from the SELECT. Primary key is always loaded
+
+        :param film_query: Query of films
+        :param fields: Names of loaded columns
+        :return: Query of films with column loading options
+        :rtype: Query
+        """
+        if set(fields) >= set(DBWorker.film_fields):
+            return film_query
+
+        return film_query.options(load_only(
+                *[getattr(models.Film, field) for field in fields]))
+
     @staticmethod
     def filter_film_by_genre(film_query: Query, genre: str) -> Query:
         """
@@ -114,13 +446,40 @@ class DBWorker:
         :return: Filtered query of films
         :rtype: Query
         """
-        film_query = film_query.join(models.FilmGenre,
-                                     models.Film.film_id ==
-                                     models.FilmGenre.film_id) \
-            .join(models.Genres,
-                  models.FilmGenre.genre_id == models.Genres.genre_id) \
-            .where(models.Genres.genre_name == genre) \
-            .group_by(models.Film.film_id)
+        return DBWorker.filter_film_by_genres(film_query, [genre])
+
+    @staticmethod
+    def filter_film_by_genres(film_query: Query, genres: Sequence[str],
+                              match_all: bool = False) -> Query:
+        """
+        Retrieve films with any or all of given genres. Genre names are
+        resolved to ids from the cache, films are matched with semi-joins
+        on films_genres, which keep films unique without GROUP BY
+
+        :param film_query: Created query of films to be filtered by genres
+        :param genres: Names of genres to be filtered by
+        :param match_all: Films have to have all genres if True, any of them
+            otherwise
+        :return: Filtered query of films
+        :rtype: Query
+        """
+        genre_ids = get_genre_ids()
+        ids = {genre_ids[genre] for genre in genres if genre in genre_ids}
+
+        if not ids or match_all and len(ids) < len(set(genres)):
+            return film_query.filter(false())
+
+        film_genres = models.FilmGenre.__table__
+
+        if not match_all:
+            return film_query.filter(models.Film.film_id.in_(
+                    select(film_genres.c.film_id)
+                    .where(film_genres.c.genre_id.in_(sorted(ids)))))
+
+        for genre_id in sorted(ids):
+            film_query = film_query.filter(models.Film.film_id.in_(
+                    select(film_genres.c.film_id)
+                    .where(film_genres.c.genre_id == genre_id)))
 
         return film_query
 
@@ -154,20 +513,46 @@ class DBWorker:
         """
         if dates != 0:
             if dates == -1:
-                print('get here!')
                 film_query = film_query.order_by(
                         models.Film.release_date.desc())
             elif dates == 1:
                 film_query = film_query.order_by(models.Film.release_date.asc())
 
+        # Films without rating go last as in keyset pagination
         if rating != 0:
             if rating == -1:
-                film_query = film_query.order_by(models.Film.rating.desc())
+                film_query = film_query.order_by(
+                        models.Film.rating.desc().nulls_last())
             elif rating == 1:
-                film_query = film_query.order_by(models.Film.rating.asc())
+                film_query = film_query.order_by(
+                        models.Film.rating.asc().nulls_last())
 
         return film_query
 
+    @staticmethod
+    def get_film_sort_keys(dates: int, rating: int) -> List[SortKey]:
+        """
+        Retrieve sort keys of films that correspond to the sort_film order
+        with film id as a tiebreaker
+
+        :param dates: -1 for descending sort, 0 for no sort, 1 for ascending
+            sort
+        :param rating: -1 for descending sort, 0 for no sort, 1 for
+            ascending sort
+        :return: List of columns with descending flag
+        :rtype: List[SortKey]
+        """
+        sort_keys = []
+
+        if dates in (-1, 1):
+            sort_keys.append((models.Film.release_date, dates == -1))
+        if rating in (-1, 1):
+            sort_keys.append((models.Film.rating, rating == -1))
+
+        sort_keys.append((models.Film.film_id, False))
+
+        return sort_keys
+
     @staticmethod
     def filter_film_by_director(film_query, director_name: str = None,
                                 director_surname: str = None) -> Query:
@@ -192,26 +577,32 @@ class DBWorker:
         return film_query
 
     @staticmethod
-    def get_directors() -> Query:
+    def get_directors(session: Optional[Session] = None) -> Query:
         """
         Retrieve all directors from the database
 
+        :param session: Session the query is built on, scoped session if
+            empty
         :return: Query of directors
         :rtype: Query
         """
-        return models.Director.query
+        return DBWorker._query(models.Director, session)
 
     @staticmethod
-    def get_director(director_name: str = None, director_surname: str = None):
+    def get_director(director_name: str = None, director_surname: str = None,
+                     session: Optional[Session] = None) -> Query:
         """
-        Retrieve directors with partial similarity with given name or surname
+        Retrieve directors with partial similarity with given name or
+        surname
 
         :param director_name: Director name
         :param director_surname: Director surname
+        :param session: Session the query is built on, scoped session if
+            empty
         :return: Query of directors that was found
         :rtype: Query
         """
-        directors_query = models.Director.query
+        directors_query = DBWorker._query(models.Director, session)
 
         if director_name:
             name_search = "%{}%".format(director_name)
@@ -226,8 +617,49 @@ class DBWorker:
         return directors_query
 
     @staticmethod
-    def get_pagination_from_query(query: Query, start_page: int) -> Query:
-        query_pages = SqlalchemyOrmPage(query, page=start_page,
-                                        items_per_page=DBWorker.page_size)
+    def get_page_from_query(query: Query, page: int,
+                            count_mode: Optional[str] = None) -> OffsetPage:
+        """
+        Retrieve page of the query with total amount of entries, exact
+        total is retrieved within the page query
+
+        :param query: Query to be paginated
+        :param page: Number of the page starting from 1
+        :param count_mode: "exact", "capped", "estimate" or "none",
+            count_mode setting if empty
+        :return: Page of items with total amount of entries
+        :rtype: OffsetPage
+        :raises ValueError: If count mode is unknown
+        """
+        return offset_page(query, page, int(DBWorker.page_size),
+                           count_mode or DBWorker.count_mode,
+                           DBWorker.count_cap)
+
+    @staticmethod
+    def stream_query(query: Query) -> Query:
+        """
+        Make query fetch rows in batches from server-side cursor instead of
+        buffering the whole result
 
-        return query_pages
+        :param query: Query to be streamed
+        :return: Query that yields rows batch by batch
+        :rtype: Query
+        """
+        return query.execution_options(stream_results=True) \
+            .yield_per(DBWorker.stream_batch_size)
+
+    @staticmethod
+    def get_keyset_page_from_query(query: Query, sort_keys: List[SortKey],
+                                   cursor: Optional[str] = None) -> KeysetPage:
+        """
+        Retrieve page of the query after the given cursor without counting
+        total amount of entries
+
+        :param query: Query to be paginated
+        :param sort_keys: Sort keys with unique tiebreaker as the last one
+        :param cursor: Opaque cursor of the page, first page if empty
+        :return: Page of items with cursor of the next page
+        :rtype: KeysetPage
+        :raises ValueError: If cursor is malformed
+        """
+        return keyset_page(query, sort_keys, int(DBWorker.page_size), cursor)
@@ -1,7 +1,8 @@
 """Module with database models"""
+import functools
 import os
 from decimal import Decimal
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from sqlalchemy import (Column,
                         ForeignKey,
@@ -12,43 +13,174 @@ from sqlalchemy import (Column,
                         DateTime,
                         Boolean,
                         create_engine,
+                        inspect,
+                        text,
                         Index)
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm import relationship, scoped_session, sessionmaker
+
+from film_api.database.pool_monitor import PoolMonitor
+from film_api.database.routing import ReplicaBalancer, RoutingSession
+from film_api.database.serializers import get_serializer
 
 DB_CONN_STR = os.getenv('DB_CONN_STR')
 
 if DB_CONN_STR is None:
     DB_CONN_STR = 'sqlite:///dev.sqlite'
 
-engine = create_engine(DB_CONN_STR)
-db_session = scoped_session(sessionmaker(autocommit=False,
-                                         autoflush=False,
-                                         bind=engine))
+DB_REPLICA_CONN_STRS = [conn_str.strip() for conn_str in
+                        (os.getenv('DB_REPLICA_CONN_STRS') or '').split(',')
+                        if conn_str.strip()]
+DB_REPLICA_BALANCING = os.getenv('DB_REPLICA_BALANCING') or 'round_robin'
+
+DB_LEAK_THRESHOLD = float(os.getenv('DB_LEAK_THRESHOLD') or 30)
+
+
+def engine_options(conn_str: str) -> Dict:
+    """
+    Retrieve connection pool options of the engine from the environment.
+    Pool size, overflow and timeout are skipped for SQLite which doesn't
+    use a queue pool
+
+    :param conn_str: Connection string of the database
+    :return: Dict of create_engine keyword arguments
+    :rtype: Dict
+    """
+    options = {
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'false').lower()
+        in ('1', 'true', 'yes'),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE') or -1),
+    }
+
+    if not conn_str.startswith('sqlite'):
+        options['pool_size'] = int(os.getenv('DB_POOL_SIZE') or 5)
+        options['max_overflow'] = int(os.getenv('DB_MAX_OVERFLOW') or 10)
+        options['pool_timeout'] = float(os.getenv('DB_POOL_TIMEOUT') or 30)
+
+    return options
+
+
+pool_monitor = PoolMonitor(DB_LEAK_THRESHOLD,
+                           capture_stack=bool(os.getenv('DB_LEAK_TRACEBACK')))
+
+
+@functools.lru_cache(maxsize=None)
+def get_engines() -> Tuple[Engine, List[Engine]]:
+    """
+    Create engines of the primary database and read replicas on the first
+    use, so importing models neither loads database drivers nor opens
+    connection pools
+
+    :return: Engine of the primary database and engines of replicas
+    :rtype: Tuple[Engine, List[Engine]]
+    """
+    primary = create_engine(DB_CONN_STR, **engine_options(DB_CONN_STR))
+    replicas = [create_engine(conn_str, **engine_options(conn_str))
+                for conn_str in DB_REPLICA_CONN_STRS]
+
+    for pool_engine in [primary, *replicas]:
+        pool_monitor.attach(pool_engine)
+
+    return primary, replicas
+
+
+@functools.lru_cache(maxsize=None)
+def get_session_factory() -> sessionmaker:
+    """
+    Create factory of request sessions bound to the primary database with
+    reads balanced between replicas
+
+    :return: Factory of sessions
+    :rtype: sessionmaker
+    """
+    primary, replicas = get_engines()
+
+    return sessionmaker(
+            class_=RoutingSession,
+            autocommit=False,
+            autoflush=False,
+            bind=primary,
+            balancer=ReplicaBalancer(replicas, DB_REPLICA_BALANCING)
+            if replicas else None)
+
+
+def _create_session() -> RoutingSession:
+    return get_session_factory()()
+
+
+def __getattr__(name: str):
+    # Engines are module attributes created on the first access
+    if name == 'engine':
+        return get_engines()[0]
+    if name == 'replica_engines':
+        return get_engines()[1]
+    raise AttributeError(f'module {__name__} has no attribute {name}')
+
+
+db_session = scoped_session(_create_session)
 Base = declarative_base()
 Base.query = db_session.query_property()
 
 
+def add_missing_columns(connection: Connection) -> List[str]:
+    """
+    Add columns of the models that are missing in existing tables, e.g.
+    version of films, create_all creates missing tables only. Columns are
+    added with their server default, so existing rows get a value
+
+    :param connection: Connection to the database
+    :return: Names of added columns as "table.column"
+    :rtype: List[str]
+    """
+    inspector = inspect(connection)
+    ddl_compiler = connection.dialect.ddl_compiler(connection.dialect, None)
+    added = []
+
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {column['name']
+                    for column in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            if column.name not in existing:
+                connection.execute(text(
+                        f'ALTER TABLE {table.name} ADD COLUMN '
+                        f'{ddl_compiler.get_column_specification(column)}'))
+                added.append(f'{table.name}.{column.name}')
+
+    return added
+
+
 def init_db():
-    """Init db and update created models to the metadata"""
-    Base.metadata.create_all(bind=engine)
+    """
+    Init db and update created models to the metadata, tables and columns
+    missing in an existing database are added
+    """
+    from film_api.database.search import install_search
+
+    primary = get_engines()[0]
+
+    Base.metadata.create_all(bind=primary)
+
+    with primary.begin() as connection:
+        add_missing_columns(connection)
+
+    install_search(primary)
 
 
 class JSONSerializable:
     def to_json(self) -> Dict:
         """
-        Iterate throughout the instance of class and add its properties
-        to a dict
+        Retrieve column values of the instance with the serializer of
+        its model
 
-        :return: Dict of properties
+        :return: Dict of column values
         :rtype: Dict
         """
-        json_result = dict()
-
-        for item in [item for item in vars(self) if not item.startswith('_')]:
-            json_result[item] = eval('self.' + item)
-
-        return json_result
+        return get_serializer(type(self)).to_dict(self)
 
 
 class Role(Base, JSONSerializable):
@@ -127,6 +259,8 @@ class Director(Base, JSONSerializable):
     birth_date = Column(DateTime)
     country_id = Column(ForeignKey('countries.country_id'))
 
+    films = relationship('Film', back_populates='director')
+
     def __init__(self, name: str, surname: str, birth_date: str = None,
                  country_id: int = None):
         self.name = name
@@ -146,27 +280,54 @@ class Film(Base, JSONSerializable):
 
     description = Column(Text)
     rating = Column(Numeric(4, 2))
-    poster = Column(Text, nullable=False)
+    # Sha256 of the poster in the poster store
+    poster = Column(String(64), nullable=False)
     created_by = Column(ForeignKey('users.user_id'), nullable=False)
+    # Increased by every change of the film for optimistic concurrency
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+
+    director = relationship('Director', back_populates='films')
+    # Genres are changed through FilmGenre entries
+    genres = relationship('Genres', secondary='films_genres', viewonly=True,
+                          order_by='Genres.genre_id')
 
     def __init__(self, film_title: str, release_date, poster, created_by,
-                 producer_id: int = None, description: str = None,
+                 director_id: int = None, description: str = None,
                  rating: Decimal = None):
         self.film_title = film_title
         self.release_date = release_date
-        self.producer_id = producer_id
+        self.director_id = director_id
         self.description = description
         self.rating = rating
         self.poster = poster
         self.created_by = created_by
 
 
+class CatalogState(Base, JSONSerializable):
+    """Version and modification time of the catalog of some entities"""
+    __tablename__ = 'catalog_state'
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False)
+    modified_at = Column(DateTime, nullable=False)
+
+    def __init__(self, name: str, version: int, modified_at):
+        self.name = name
+        self.version = version
+        self.modified_at = modified_at
+
+
 class FilmGenre(Base, JSONSerializable):
     """Films and genres proxy table"""
     __tablename__ = 'films_genres'
 
-    film_id = Column(Integer, primary_key=True)
-    genre_id = Column(Integer, primary_key=True)
+    film_id = Column(ForeignKey('films.film_id', ondelete='CASCADE'),
+                     primary_key=True)
+    genre_id = Column(ForeignKey('genres.genre_id', ondelete='CASCADE'),
+                      primary_key=True)
+
+    film = relationship('Film')
+    genre = relationship('Genres')
 
     def __init__(self, film_id: int, genre_id: int):
         self.film_id = film_id
@@ -176,5 +337,6 @@ class FilmGenre(Base, JSONSerializable):
 Index('film_id_idx', Film.film_id)
 Index('film_id_user_id_idx', Film.film_id, Film.created_by)
 Index('film_genre_film_id_idx', FilmGenre.film_id, FilmGenre.genre_id)
+Index('film_genre_genre_id_idx', FilmGenre.genre_id, FilmGenre.film_id)
 Index('director_name_idx', Director.name)
 Index('director_surname_idx', Director.surname)
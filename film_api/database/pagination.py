@@ -0,0 +1,316 @@
+"""Module with keyset (cursor) and offset pagination helpers"""
+import base64
+import datetime
+import json
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, false, func, or_, select
+from sqlalchemy.orm import Query
+
+# Sort key is a pair of ORM column and descending flag
+SortKey = Tuple[Any, bool]
+
+
+COUNT_EXACT = 'exact'
+COUNT_CAPPED = 'capped'
+COUNT_ESTIMATE = 'estimate'
+COUNT_NONE = 'none'
+COUNT_MODES = (COUNT_EXACT, COUNT_CAPPED, COUNT_ESTIMATE, COUNT_NONE)
+
+
+class KeysetPage:
+    """Page of items retrieved with keyset pagination"""
+
+    def __init__(self, items: List, next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def _encode_value(value) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value) -> Any:
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.datetime.fromisoformat(value['dt'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+        raise ValueError(f'Unknown cursor value {value}')
+    return value
+
+
+def encode_cursor(values: Sequence) -> str:
+    """
+    Pack values of the sort keys into an opaque url-safe token
+
+    :param values: Values of the sort keys of the last item on the page
+    :return: Cursor token
+    :rtype: str
+    """
+    raw = json.dumps([_encode_value(value) for value in values],
+                     separators=(',', ':'))
+
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _matches_column(column, value) -> bool:
+    if value is None:
+        return is_nullable(column)
+
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return True
+
+    if isinstance(value, bool) and python_type is not bool:
+        return False
+    if python_type is float:
+        return isinstance(value, (int, float, Decimal))
+
+    return isinstance(value, python_type)
+
+
+def decode_cursor(cursor: str, sort_keys: Sequence[SortKey]) -> List:
+    """
+    Unpack cursor token into values of the sort keys, each value has to be
+    of the type of its sort key column
+
+    :param cursor: Cursor token
+    :param sort_keys: Sort keys of the query
+    :return: List of sort keys values
+    :rtype: List
+    :raises ValueError: If cursor is malformed or doesn't match the sort
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError) as error:
+        raise ValueError(f'Malformed cursor {cursor}') from error
+
+    if not isinstance(values, list) or len(values) != len(sort_keys):
+        raise ValueError(f'Cursor {cursor} does not match the sort order')
+
+    values = [_decode_value(value) for value in values]
+
+    if not all(_matches_column(column, value)
+               for (column, _), value in zip(sort_keys, values)):
+        raise ValueError(f'Cursor {cursor} does not match the sort order')
+
+    return values
+
+
+def is_nullable(column) -> bool:
+    """
+    Check whether sort key column may contain NULL
+
+    :param column: ORM column or SQL expression
+    :return: False only for columns declared as not nullable
+    :rtype: bool
+    """
+    return getattr(getattr(column, 'expression', column), 'nullable', True)
+
+
+def order_by_key(column, descending: bool):
+    """
+    Build ORDER BY clause of the sort key, NULLs of nullable columns go
+    last in both directions, so the order doesn't depend on the database
+
+    :param column: ORM column
+    :param descending: Sort in descending order if True
+    :return: SQL ORDER BY clause
+    """
+    clause = column.desc() if descending else column.asc()
+
+    return clause.nulls_last() if is_nullable(column) else clause
+
+
+def _keyset_condition(sort_keys: Sequence[SortKey], values: Sequence):
+    """
+    Build lexicographic "row goes after the cursor" condition that works
+    for mixed sort directions. NULLs are ordered last, so only NULLs go
+    after NULL and they are compared by the following keys
+
+    :param sort_keys: Sort keys of the query
+    :param values: Values of the sort keys of the last seen row
+    :return: SQL expression
+    """
+    conditions = []
+
+    for i, (column, descending) in enumerate(sort_keys):
+        if values[i] is None:
+            continue
+
+        # Comparison with None is compiled to IS NULL
+        equal_prefix = [sort_keys[j][0] == values[j] for j in range(i)]
+        after = column < values[i] if descending else column > values[i]
+
+        if is_nullable(column):
+            after = or_(after, column.is_(None))
+
+        conditions.append(and_(*equal_prefix, after))
+
+    return or_(false(), *conditions)
+
+
+def keyset_page(query: Query, sort_keys: Sequence[SortKey],
+                page_size: int, cursor: Optional[str] = None) -> KeysetPage:
+    """
+    Retrieve a page of the query that goes right after the cursor.
+    Last sort key has to be unique (e.g. primary key) to make order total
+
+    :param query: Query to be paginated
+    :param sort_keys: Sort keys of the query
+    :param page_size: Amount of items on the page
+    :param cursor: Cursor returned with the previous page (Optional)
+    :return: Page of items with the cursor of the next page
+    :rtype: KeysetPage
+    :raises ValueError: If cursor is malformed
+    """
+    if cursor:
+        values = decode_cursor(cursor, sort_keys)
+        query = query.filter(_keyset_condition(sort_keys, values))
+
+    query = query.order_by(None).order_by(
+            *[order_by_key(column, descending)
+              for column, descending in sort_keys])
+
+    items = query.limit(page_size + 1).all()
+
+    next_cursor = None
+
+    if len(items) > page_size:
+        items = items[:page_size]
+        last_item = items[-1]
+        next_cursor = encode_cursor(
+                [getattr(last_item, column.key) for column, _ in sort_keys])
+
+    return KeysetPage(items, next_cursor)
+
+
+class OffsetPage:
+    """Page of items retrieved by page number with total amount of entries"""
+
+    def __init__(self, items: List, total: Optional[int],
+                 is_exact: bool = True):
+        self.items = items
+        self.total = total
+        self.is_exact = is_exact
+
+    @property
+    def total_label(self) -> Optional[str]:
+        """
+        Render total for X-Total-Count header, lower bounds are rendered
+        as "10000+"
+
+        :return: Total as string, None if it wasn't counted
+        :rtype: Optional[str]
+        """
+        if self.total is None:
+            return None
+        return str(self.total) if self.is_exact else f'{self.total}+'
+
+
+def _page_bounds(page: int, page_size: int) -> Tuple[int, int]:
+    return page_size, (max(page, 1) - 1) * page_size
+
+
+def count_capped(query: Query, cap: int) -> Tuple[int, bool]:
+    """
+    Count entries of the query but stop scanning after the cap
+
+    :param query: Query to be counted
+    :param cap: Maximal amount of counted entries
+    :return: Amount of entries and flag whether it is exact
+    :rtype: Tuple[int, bool]
+    """
+    limited = query.order_by(None).limit(cap + 1).subquery()
+    total = query.session.query(func.count()).select_from(limited).scalar()
+
+    if total > cap:
+        return cap, False
+    return total, True
+
+
+def estimate_count(query: Query) -> Optional[int]:
+    """
+    Retrieve planner estimate of amount of entries of the query, only
+    PostgreSQL exposes it
+
+    :param query: Query to be estimated
+    :return: Estimated amount of entries, None if dialect has no estimates
+    :rtype: Optional[int]
+    """
+    connection = query.session.connection()
+
+    if connection.dialect.name != 'postgresql':
+        return None
+
+    compiled = query.order_by(None).statement.compile(
+            dialect=connection.dialect)
+    plan = connection.exec_driver_sql(
+            'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params) \
+        .scalar()
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def offset_page(query: Query, page: int, page_size: int,
+                count_mode: str = COUNT_EXACT,
+                count_cap: int = 10000) -> OffsetPage:
+    """
+    Retrieve a page of the query by its number along with total amount of
+    entries. Exact total is taken from scalar subquery of the same query,
+    capped total stops counting at the cap, estimate is taken from the
+    PostgreSQL planner and falls back to capped count elsewhere or when
+    the estimate is below the cap
+
+    :param query: Query to be paginated
+    :param page: Number of the page starting from 1
+    :param page_size: Amount of items on the page
+    :param count_mode: One of COUNT_MODES
+    :param count_cap: Maximal amount counted in capped and estimate modes
+    :return: Page of items with total amount of entries
+    :rtype: OffsetPage
+    :raises ValueError: If count mode is unknown
+    """
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f'Unknown count mode {count_mode}')
+
+    limit, offset = _page_bounds(page, page_size)
+
+    if count_mode != COUNT_EXACT:
+        items = query.limit(limit).offset(offset).all()
+
+        if count_mode == COUNT_NONE:
+            return OffsetPage(items, None)
+
+        if count_mode == COUNT_ESTIMATE:
+            estimate = estimate_count(query)
+
+            if estimate is not None and estimate > count_cap:
+                return OffsetPage(items, estimate, is_exact=False)
+
+        return OffsetPage(items, *count_capped(query, count_cap))
+
+    # Uncorrelated subquery is evaluated once, unlike window function it
+    # doesn't conflict with ranking functions of SQLite full-text search
+    total = select(func.count()) \
+        .select_from(query.order_by(None).subquery()).scalar_subquery()
+    rows = query.add_columns(total).limit(limit).offset(offset).all()
+
+    if rows:
+        return OffsetPage([row[0] for row in rows], rows[0][-1])
+
+    # Window is empty past the last page, total has to be counted apart
+    total = query.order_by(None).count() if offset else 0
+
+    return OffsetPage([], total)
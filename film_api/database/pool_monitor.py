@@ -0,0 +1,157 @@
+"""Module with instrumentation of connection pool checkouts and leaks"""
+import functools
+import logging
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class _Checkout:
+    __slots__ = ('started_at', 'thread_name', 'stack', 'reported')
+
+    def __init__(self, started_at: float, thread_name: str,
+                 stack: Optional[str]):
+        self.started_at = started_at
+        self.thread_name = thread_name
+        self.stack = stack
+        self.reported = False
+
+
+class PoolMonitor:
+    """
+    Collects time connections are waited for and held out of the pool and
+    reports connections that are held longer than the threshold
+    """
+
+    def __init__(self, leak_threshold: float, capture_stack: bool = False):
+        self.leak_threshold = leak_threshold
+        self.capture_stack = capture_stack
+        self.checkouts = 0
+        self.total_hold_time = 0.0
+        self.max_hold_time = 0.0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.wait_hook: Optional[Callable[[float], None]] = None
+        self._checked_out: Dict[int, _Checkout] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine: Engine) -> None:
+        """
+        Listen to checkout and checkin events of the engine pool and time
+        the checkouts. Pool has no event before the checkout, so wait time
+        is measured around raw_connection of the engine which every
+        connection of the engine is taken with
+
+        :param engine: Engine to be instrumented
+        :return: None
+        """
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        engine.raw_connection = self._timed(engine.raw_connection)
+
+    def _timed(self, raw_connection):
+        @functools.wraps(raw_connection)
+        def wrapper(*args, **kwargs):
+            started_at = time.monotonic()
+
+            try:
+                return raw_connection(*args, **kwargs)
+            finally:
+                self._on_wait(time.monotonic() - started_at)
+
+        return wrapper
+
+    def _on_wait(self, wait_time: float) -> None:
+        with self._lock:
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        if self.wait_hook is not None:
+            self.wait_hook(wait_time)
+
+    def _on_checkout(self, dbapi_connection, connection_record,
+                     connection_proxy) -> None:
+        stack = ''.join(traceback.format_stack(limit=15)) \
+            if self.capture_stack else None
+        checkout = _Checkout(time.monotonic(),
+                             threading.current_thread().name, stack)
+
+        with self._lock:
+            self._checked_out[id(connection_record)] = checkout
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            checkout = self._checked_out.pop(id(connection_record), None)
+
+            if checkout is None:
+                return
+
+            hold_time = time.monotonic() - checkout.started_at
+            self.total_hold_time += hold_time
+            self.max_hold_time = max(self.max_hold_time, hold_time)
+
+        if hold_time > self.leak_threshold and not checkout.reported:
+            logger.warning('Connection was held out of the pool for %.2fs '
+                           'by thread %s', hold_time, checkout.thread_name)
+
+    def find_leaks(self) -> List[Dict]:
+        """
+        Retrieve connections held out of the pool longer than the threshold
+
+        :return: List of held time, thread name and checkout stack
+        :rtype: List[Dict]
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            return [{'held': now - checkout.started_at,
+                     'thread': checkout.thread_name,
+                     'stack': checkout.stack}
+                    for checkout in self._checked_out.values()
+                    if now - checkout.started_at > self.leak_threshold]
+
+    def report_leaks(self) -> None:
+        """
+        Log warning for each connection held longer than the threshold,
+        every connection is reported once
+
+        :return: None
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            leaks = [checkout for checkout in self._checked_out.values()
+                     if not checkout.reported and
+                     now - checkout.started_at > self.leak_threshold]
+
+            for checkout in leaks:
+                checkout.reported = True
+
+        for checkout in leaks:
+            logger.warning('Possible connection leak: connection is held '
+                           'for %.2fs by thread %s%s',
+                           now - checkout.started_at, checkout.thread_name,
+                           f'\n{checkout.stack}' if checkout.stack else '')
+
+    def stats(self) -> Dict:
+        """
+        Retrieve checkout statistics of the pool
+
+        :return: Dict of checkouts count, checked out now, total and max
+            time connections were held and waited for
+        :rtype: Dict
+        """
+        with self._lock:
+            return {'checkouts': self.checkouts,
+                    'checked_out': len(self._checked_out),
+                    'total_hold_time': self.total_hold_time,
+                    'max_hold_time': self.max_hold_time,
+                    'total_wait_time': self.total_wait_time,
+                    'max_wait_time': self.max_wait_time}
@@ -0,0 +1,333 @@
+"""
+Module with content addressed store of film posters on local disk. Films
+keep only sha256 of their poster, equal posters are stored once.
+
+Existing databases are upgraded (missing tables and columns are added) and
+posters that are still kept in films rows are moved to the store with::
+
+    python -m film_api.database.poster_store migrate
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import List, Optional, Set
+
+from sqlalchemy import String, bindparam, inspect, select, text
+
+from film_api.database.models import Film, get_engines, init_db
+
+POSTER_DIR = os.getenv('POSTER_DIR') or 'posters'
+
+REFERENCE_RE = re.compile(r'[0-9a-f]{64}')
+DATA_URI_RE = re.compile(r'data:(?P<mimetype>[\w.+-]+/[\w.+-]+)?'
+                         r'(?:;[\w-]+=[\w.-]+)*;base64,')
+
+# Leading bytes of supported image formats
+SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+SNIFF_SIZE = 16
+
+
+def is_reference(poster: Optional[str]) -> bool:
+    """
+    Check whether poster value of the film is reference to the store
+
+    :param poster: Poster value of the film
+    :return: True if value is sha256 of the poster
+    :rtype: bool
+    """
+    return poster is not None and REFERENCE_RE.fullmatch(poster) is not None
+
+
+def decode_poster(poster: str) -> bytes:
+    """
+    Retrieve poster bytes of the given poster value, base64 data URIs are
+    decoded and other strings are encoded with UTF-8
+
+    :param poster: Poster value of the request
+    :return: Poster bytes
+    :rtype: bytes
+    :raises ValueError: If data URI has malformed base64
+    """
+    match = DATA_URI_RE.match(poster)
+
+    if match is None:
+        return poster.encode()
+
+    try:
+        return base64.b64decode(poster[match.end():], validate=True)
+    except binascii.Error as error:
+        raise ValueError('Poster has malformed base64 data') from error
+
+
+def poster_mimetype(head: bytes) -> str:
+    """
+    Detect mimetype of the poster by its leading bytes
+
+    :param head: Leading bytes of the poster
+    :return: Mimetype of the poster
+    :rtype: str
+    """
+    for signature, mimetype in SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+
+    try:
+        head.decode()
+    except UnicodeDecodeError:
+        return 'application/octet-stream'
+
+    return 'text/plain'
+
+
+class PosterStore:
+    """
+    Store of posters in files named by sha256 of their content, files are
+    never changed once written, so they are shared by worker processes
+    without locking
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def path(self, reference: str) -> str:
+        """
+        Retrieve path of the poster file
+
+        :param reference: Sha256 of the poster
+        :return: Path of the poster file
+        :rtype: str
+        :raises ValueError: If reference is not sha256 hex digest
+        """
+        if not is_reference(reference):
+            raise ValueError(f'Wrong poster reference {reference}')
+
+        return os.path.join(self.root, reference[:2], reference)
+
+    def exists(self, reference: str) -> bool:
+        """
+        Check whether the poster is stored
+
+        :param reference: Sha256 of the poster
+        :return: True if poster file exists
+        :rtype: bool
+        """
+        return is_reference(reference) and os.path.exists(
+                self.path(reference))
+
+    def put(self, data: bytes) -> str:
+        """
+        Store the poster unless the same poster is already stored. File is
+        written under temporary name and renamed, so readers never see
+        partial posters
+
+        :param data: Poster bytes
+        :return: Sha256 of the poster
+        :rtype: str
+        """
+        reference = hashlib.sha256(data).hexdigest()
+        path = self.path(reference)
+
+        if os.path.exists(path):
+            return reference
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory)
+
+        try:
+            with os.fdopen(file_descriptor, 'wb') as poster_file:
+                poster_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        return reference
+
+    def mimetype(self, reference: str) -> str:
+        """
+        Detect mimetype of the stored poster
+
+        :param reference: Sha256 of the poster
+        :return: Mimetype of the poster
+        :rtype: str
+        """
+        with open(self.path(reference), 'rb') as poster_file:
+            return poster_mimetype(poster_file.read(SNIFF_SIZE))
+
+    def references(self) -> List[str]:
+        """
+        Retrieve references of all stored posters
+
+        :return: Sha256 of stored posters
+        :rtype: List[str]
+        """
+        if not os.path.isdir(self.root):
+            return []
+
+        return [name for directory in os.listdir(self.root)
+                if os.path.isdir(os.path.join(self.root, directory))
+                for name in os.listdir(os.path.join(self.root, directory))
+                if is_reference(name)]
+
+    def prune(self, referenced: Set[str], min_age: float = 3600) -> int:
+        """
+        Remove posters that aren't referenced by any film. Recently stored
+        posters are kept, since films referencing them may be not committed
+        yet
+
+        :param referenced: References of films
+        :param min_age: Seconds since the poster was stored
+        :return: Amount of removed posters
+        :rtype: int
+        """
+        removed = 0
+        stored_before = time.time() - min_age
+
+        for reference in self.references():
+            path = self.path(reference)
+
+            if reference not in referenced and \
+                    os.path.getmtime(path) < stored_before:
+                os.unlink(path)
+                removed += 1
+
+        return removed
+
+
+poster_store = PosterStore(POSTER_DIR)
+
+
+def store_poster(poster: str) -> str:
+    """
+    Put poster value of the request to the store, references of already
+    stored posters are kept as is
+
+    :param poster: Poster value of the request
+    :return: Sha256 of the poster
+    :rtype: str
+    :raises ValueError: If data URI has malformed base64
+    """
+    if poster_store.exists(poster):
+        return poster
+
+    return poster_store.put(decode_poster(poster))
+
+
+def migrate_posters(batch_size: int = 1000) -> int:
+    """
+    Move posters kept in films rows to the store and replace them with
+    references, films are walked in batches by id
+
+    :param batch_size: Amount of films read and updated at once
+    :return: Amount of migrated films
+    :rtype: int
+    """
+    films = Film.__table__
+    update = films.update().where(films.c.film_id == bindparam('id')) \
+        .values(poster=bindparam('reference'))
+    migrated = 0
+    last_id = 0
+
+    with get_engines()[0].connect() as connection:
+        while True:
+            rows = connection.execute(
+                    select(films.c.film_id, films.c.poster)
+                    .where(films.c.film_id > last_id)
+                    .order_by(films.c.film_id).limit(batch_size)).all()
+
+            if not rows:
+                return migrated
+
+            last_id = rows[-1].film_id
+            batch = [{'id': film_id,
+                      'reference': poster_store.put(decode_poster(poster))}
+                     for film_id, poster in rows if not is_reference(poster)]
+
+            if batch:
+                with connection.begin():
+                    connection.execute(update, batch)
+
+            migrated += len(batch)
+
+
+def shrink_poster_column() -> bool:
+    """
+    Change type of poster column of existing PostgreSQL database to the
+    type of references once all posters are moved to the store, SQLite
+    doesn't enforce length of strings
+
+    :return: True if type of the column has been changed
+    :rtype: bool
+    """
+    poster_type = Film.__table__.c.poster.type
+
+    with get_engines()[0].begin() as connection:
+        if connection.dialect.name != 'postgresql':
+            return False
+
+        current_type = next(column['type'] for column in
+                            inspect(connection).get_columns('films')
+                            if column['name'] == 'poster')
+
+        if isinstance(current_type, String) and \
+                current_type.length == poster_type.length:
+            return False
+
+        connection.execute(text(
+                f'ALTER TABLE films ALTER COLUMN poster TYPE '
+                f'{poster_type.compile(connection.dialect)}'))
+
+    return True
+
+
+def migrate() -> int:
+    """
+    Upgrade schema of existing database, move posters to the store and
+    change poster column to the type of references
+
+    :return: Amount of migrated films
+    :rtype: int
+    """
+    init_db()
+    migrated = migrate_posters()
+    shrink_poster_column()
+
+    return migrated
+
+
+def prune_posters() -> int:
+    """
+    Remove stored posters that aren't referenced by any film
+
+    :return: Amount of removed posters
+    :rtype: int
+    """
+    with get_engines()[0].connect() as connection:
+        referenced = set(connection.execute(
+                select(Film.__table__.c.poster).distinct()).scalars())
+
+    return poster_store.prune(referenced)
+
+
+if __name__ == '__main__':
+    COMMANDS = {'migrate': migrate, 'prune': prune_posters}
+
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        sys.exit(f'Usage: python -m film_api.database.poster_store '
+                 f'{"|".join(COMMANDS)}')
+
+    print(f'{sys.argv[1]}: {COMMANDS[sys.argv[1]]()} posters')
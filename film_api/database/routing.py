@@ -0,0 +1,235 @@
+"""
+Module with routing of session statements between the primary database and
+read replicas
+"""
+import functools
+import itertools
+import os
+import threading
+import time
+from typing import Hashable, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from film_api.cache.sqlite_store import SQLiteStore
+from film_api.cache.ttl_cache import TTLCache
+
+DB_READ_YOUR_WRITES_WINDOW = float(os.getenv('DB_READ_YOUR_WRITES_WINDOW')
+                                   or 5)
+DB_RECENT_WRITERS_BACKEND = os.getenv('DB_RECENT_WRITERS_BACKEND') or 'sqlite'
+DB_RECENT_WRITERS_PATH = os.getenv('DB_RECENT_WRITERS_PATH') or \
+    'recent_writers.sqlite'
+DB_RECENT_WRITERS_SIZE = int(os.getenv('DB_RECENT_WRITERS_SIZE') or 10000)
+
+ROUND_ROBIN = 'round_robin'
+LEAST_BUSY = 'least_busy'
+
+# Keys of Session.info
+USE_PRIMARY = 'use_primary'
+WROTE = 'wrote'
+WRITER_KEY = 'writer_key'
+REPLICA = 'replica'
+
+
+class MemoryWriters:
+    """
+    Writers remembered by the process they wrote through, another worker
+    process may still serve their next read from a replica
+    """
+
+    def __init__(self, size: int, window: float):
+        self._writers = TTLCache(size, window)
+
+    def mark(self, writer_key: Hashable) -> None:
+        """
+        Remember that the writer has committed changes just now
+
+        :param writer_key: Key of the writer
+        :return: None
+        """
+        self._writers.set(writer_key, True)
+
+    def wrote_recently(self, writer_key: Hashable) -> bool:
+        """
+        Check whether the writer has committed changes within the window
+
+        :param writer_key: Key of the writer
+        :return: True if reads of the writer have to go to the primary
+        :rtype: bool
+        """
+        return self._writers.get(writer_key) is not None
+
+
+class SQLiteWriters:
+    """
+    Writers remembered in local SQLite file that is shared between worker
+    processes, so the next request of the writer reads from the primary
+    whichever worker serves it
+    """
+
+    def __init__(self, path: str, window: float):
+        self.window = window
+        self._store = SQLiteStore(
+                path,
+                'CREATE TABLE IF NOT EXISTS recent_writers ('
+                'key TEXT PRIMARY KEY, written_at REAL NOT NULL)',
+                'DELETE FROM recent_writers WHERE written_at <= ?')
+
+    def mark(self, writer_key: Hashable) -> None:
+        connection = self._store.connection()
+        now = time.time()
+
+        connection.execute('INSERT OR REPLACE INTO recent_writers '
+                           'VALUES (?, ?)', (str(writer_key), now))
+
+        self._store.written(connection, now - self.window)
+
+    def wrote_recently(self, writer_key: Hashable) -> bool:
+        return self._store.connection().execute(
+                'SELECT 1 FROM recent_writers '
+                'WHERE key = ? AND written_at > ?',
+                (str(writer_key), time.time() - self.window)) \
+            .fetchone() is not None
+
+
+def create_recent_writers(backend: str):
+    """
+    Create store of recent writers by its name
+
+    :param backend: One of "memory" or "sqlite"
+    :return: Store of recent writers
+    """
+    if backend == 'memory':
+        return MemoryWriters(DB_RECENT_WRITERS_SIZE,
+                             DB_READ_YOUR_WRITES_WINDOW)
+    if backend == 'sqlite':
+        return SQLiteWriters(DB_RECENT_WRITERS_PATH,
+                             DB_READ_YOUR_WRITES_WINDOW)
+    raise ValueError(f'Unknown recent writers backend {backend}')
+
+
+@functools.lru_cache(maxsize=None)
+def get_recent_writers():
+    """
+    Retrieve store of recent writers, it's created on the first write
+    or read of a session with replicas
+
+    :return: Store of recent writers
+    """
+    return create_recent_writers(DB_RECENT_WRITERS_BACKEND)
+
+
+class ReplicaBalancer:
+    """
+    Chooses replica engine for the next read either in turn or by the least
+    amount of connections checked out of its pool
+    """
+
+    def __init__(self, replicas: Sequence[Engine],
+                 strategy: str = ROUND_ROBIN):
+        if strategy not in (ROUND_ROBIN, LEAST_BUSY):
+            raise ValueError(f'Unknown balancing strategy {strategy}')
+
+        self.replicas: List[Engine] = list(replicas)
+        self.strategy = strategy
+        self._cycle = itertools.cycle(range(len(self.replicas)))
+        self._busy = [0] * len(self.replicas)
+        self._lock = threading.Lock()
+
+        for index, replica in enumerate(self.replicas):
+            event.listen(replica, 'checkout', self._on_checkout(index, 1))
+            event.listen(replica, 'checkin', self._on_checkout(index, -1))
+
+    def _on_checkout(self, index: int, delta: int):
+        def listener(*args):
+            with self._lock:
+                self._busy[index] += delta
+        return listener
+
+    def choose(self) -> Engine:
+        """
+        Retrieve replica engine for the next read
+
+        :return: Replica engine
+        :rtype: Engine
+        """
+        with self._lock:
+            if self.strategy == LEAST_BUSY:
+                index = min(range(len(self.replicas)),
+                            key=self._busy.__getitem__)
+            else:
+                index = next(self._cycle)
+
+        return self.replicas[index]
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from replicas and writes to the primary (its bind).
+    Replica is chosen once per session so all its reads see the same
+    replica state. Once the session has written, all its statements go to
+    the primary so the session sees its own changes
+    """
+
+    def __init__(self, *args, balancer: Optional[ReplicaBalancer] = None,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self.balancer = balancer
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.balancer is None or self._flushing or \
+                self.info.get(USE_PRIMARY) or self.info.get(WROTE) or \
+                not isinstance(clause, Select):
+            return super().get_bind(mapper, clause, **kwargs)
+
+        replica = self.info.get(REPLICA)
+
+        if replica is None:
+            writer_key = self.info.get(WRITER_KEY)
+
+            # Writer is looked up once, before the first read of the session
+            if writer_key is not None and \
+                    get_recent_writers().wrote_recently(writer_key):
+                self.info[USE_PRIMARY] = True
+                return super().get_bind(mapper, clause, **kwargs)
+
+            replica = self.info[REPLICA] = self.balancer.choose()
+
+        return replica
+
+
+def set_writer(session: Session, writer_key: Hashable) -> None:
+    """
+    Tie session to the writer, e.g. user of the request. Session reads from
+    the primary if the writer has committed changes within the
+    read-your-writes window through any worker process. Store of recent
+    writers is checked by the first read of the session
+
+    :param session: Session of the request
+    :param writer_key: Key of the writer
+    :return: None
+    """
+    session.info[WRITER_KEY] = writer_key
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _detect_write_statement(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[WROTE] = True
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _detect_flush(session, flush_context):
+    session.info[WROTE] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_writer(session):
+    writer_key = session.info.get(WRITER_KEY)
+
+    if session.info.get(WROTE) and writer_key is not None and \
+            session.balancer is not None:
+        get_recent_writers().mark(writer_key)
@@ -0,0 +1,293 @@
+"""Module with full-text search backends for films"""
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func, literal_column, table, column, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Query
+
+from film_api.database import models
+
+FTS_TABLE = 'films_fts'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+_SQLITE_INSTALL_DDL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "film_title, description, content='films', content_rowid='film_id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON films "
+    f"BEGIN INSERT INTO {FTS_TABLE}(rowid, film_title, description) "
+    "VALUES (new.film_id, new.film_title, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON films "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, film_title, "
+    "description) VALUES ('delete', old.film_id, old.film_title, "
+    "old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON films "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, film_title, "
+    "description) VALUES ('delete', old.film_id, old.film_title, "
+    f"old.description); INSERT INTO {FTS_TABLE}(rowid, film_title, "
+    "description) VALUES (new.film_id, new.film_title, new.description); "
+    "END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+_PG_CONFIG = "'simple'::regconfig"
+
+# Has to be kept in sync with PostgresSearchBackend.document
+_PG_DOCUMENT_SQL = (
+    f"setweight(to_tsvector({_PG_CONFIG}, coalesce(film_title, '')), 'A') || "
+    f"setweight(to_tsvector({_PG_CONFIG}, coalesce(description, '')), 'B')")
+
+
+def _words(search_text: str) -> List[str]:
+    return _WORD_RE.findall(search_text or '')
+
+
+class SearchBackend:
+    """
+    Base search backend, uses partial similarity of the title as
+    it can't rely on any index
+    """
+
+    def install(self, connection: Connection) -> None:
+        """
+        Create indexes and auxiliary tables needed by the backend
+
+        :param connection: Connection to the database
+        :return: None
+        """
+
+    def uninstall(self, connection: Connection) -> None:
+        """
+        Drop auxiliary tables created by the backend
+
+        :param connection: Connection to the database
+        :return: None
+        """
+
+    def prepare(self, connection: Connection) -> None:
+        """
+        Detect features of the database used by the backend in advance, so
+        building search queries doesn't touch the database
+
+        :param connection: Connection to the database
+        :return: None
+        """
+
+    def _prepare_bind(self, film_query: Query) -> None:
+        # Short connection of its own is returned to the pool at once,
+        # unlike the connection of the session of the query
+        with film_query.session.get_bind().connect() as connection:
+            self.prepare(connection)
+
+    def search(self, film_query: Query, search_text: str,
+               ranked: bool = True) -> Query:
+        """
+        Filter film query by the text in film title or description
+
+        :param film_query: Query of films to be filtered
+        :param search_text: Text to be searched
+        :param ranked: Order films by relevance if True
+        :return: Filtered query of films
+        :rtype: Query
+        """
+        search = "%{}%".format(search_text)
+        return film_query.filter(models.Film.film_title.ilike(search))
+
+
+class SqliteSearchBackend(SearchBackend):
+    """Search backend on SQLite FTS5 external content table"""
+
+    fts_table = table(FTS_TABLE, column('rowid'))
+
+    def __init__(self):
+        self._is_installed: Optional[bool] = None
+
+    def install(self, connection: Connection) -> None:
+        self._is_installed = None
+
+        if not self._has_fts_table(connection):
+            for statement in _SQLITE_INSTALL_DDL:
+                connection.execute(text(statement))
+
+        self._is_installed = True
+
+    def uninstall(self, connection: Connection) -> None:
+        connection.execute(text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+        self._is_installed = None
+
+    def prepare(self, connection: Connection) -> None:
+        self._has_fts_table(connection)
+
+    def _has_fts_table(self, connection: Connection) -> bool:
+        if self._is_installed is None:
+            self._is_installed = connection.execute(
+                    text("SELECT 1 FROM sqlite_master "
+                         "WHERE type = 'table' AND name = :name"),
+                    {'name': FTS_TABLE}).first() is not None
+
+        return self._is_installed
+
+    @staticmethod
+    def build_match(search_text: str) -> str:
+        """
+        Build FTS5 match expression that requires every word of the text
+        as a prefix
+
+        :param search_text: Text to be searched
+        :return: FTS5 match expression
+        :rtype: str
+        """
+        return ' '.join(f'"{word}"*' for word in _words(search_text))
+
+    def search(self, film_query: Query, search_text: str,
+               ranked: bool = True) -> Query:
+        match = self.build_match(search_text)
+
+        if not match:
+            return film_query
+
+        if self._is_installed is None:
+            self._prepare_bind(film_query)
+
+        if not self._is_installed:
+            return super().search(film_query, search_text, ranked)
+
+        film_query = film_query \
+            .join(self.fts_table,
+                  self.fts_table.c.rowid == models.Film.film_id) \
+            .filter(literal_column(FTS_TABLE).op('MATCH')(match))
+
+        if ranked:
+            # Lower bm25 is better, title matches weigh more
+            film_query = film_query.order_by(
+                    func.bm25(literal_column(FTS_TABLE), 10.0, 1.0))
+
+        return film_query
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Search backend on PostgreSQL tsvector GIN index with pg_trgm index of
+    the title for partial similarity if the extension is available
+    """
+
+    def __init__(self):
+        self._has_trigrams: Optional[bool] = None
+
+    @property
+    def document(self):
+        """Weighted tsvector of film title and description"""
+        config = literal_column(_PG_CONFIG)
+
+        return func.setweight(
+                func.to_tsvector(config, func.coalesce(
+                        models.Film.film_title, literal_column("''"))),
+                literal_column("'A'")).op('||')(
+                func.setweight(
+                        func.to_tsvector(config, func.coalesce(
+                                models.Film.description,
+                                literal_column("''"))),
+                        literal_column("'B'")))
+
+    def install(self, connection: Connection) -> None:
+        connection.execute(text(
+                'CREATE INDEX IF NOT EXISTS film_search_idx ON films '
+                f'USING gin (({_PG_DOCUMENT_SQL}))'))
+
+        savepoint = connection.begin_nested()
+        try:
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            connection.execute(text(
+                    'CREATE INDEX IF NOT EXISTS film_title_trgm_idx ON films '
+                    'USING gin (film_title gin_trgm_ops)'))
+            savepoint.commit()
+        except Exception:  # pylint: disable=broad-except
+            # Extension requires privileges that may not be granted
+            savepoint.rollback()
+
+        self._has_trigrams = None
+
+    def prepare(self, connection: Connection) -> None:
+        self._check_trigrams(connection)
+
+    def _check_trigrams(self, connection: Connection) -> bool:
+        if self._has_trigrams is None:
+            self._has_trigrams = connection.execute(
+                    text("SELECT 1 FROM pg_indexes "
+                         "WHERE indexname = 'film_title_trgm_idx'")) \
+                                     .first() is not None
+
+        return self._has_trigrams
+
+    def search(self, film_query: Query, search_text: str,
+               ranked: bool = True) -> Query:
+        words = _words(search_text)
+
+        if not words:
+            return film_query
+
+        ts_query = func.to_tsquery(literal_column(_PG_CONFIG),
+                                   ' & '.join(f'{word}:*' for word in words))
+        condition = self.document.op('@@')(ts_query)
+
+        if self._has_trigrams is None:
+            self._prepare_bind(film_query)
+
+        if self._has_trigrams:
+            condition = condition | models.Film.film_title.ilike(
+                    "%{}%".format(search_text))
+
+        film_query = film_query.filter(condition)
+
+        if ranked:
+            film_query = film_query.order_by(
+                    func.ts_rank(self.document, ts_query).desc())
+
+        return film_query
+
+
+_backends: Dict[str, SearchBackend] = {
+    'postgresql': PostgresSearchBackend(),
+    'sqlite': SqliteSearchBackend(),
+}
+_default_backend = SearchBackend()
+
+
+def get_search_backend(dialect_name: str) -> SearchBackend:
+    """
+    Retrieve search backend for the given database dialect
+
+    :param dialect_name: Name of SQLAlchemy dialect
+    :return: Search backend
+    :rtype: SearchBackend
+    """
+    return _backends.get(dialect_name, _default_backend)
+
+
+def install_search(bind) -> None:
+    """
+    Create search indexes for the database, safe to be called repeatedly
+
+    :param bind: Engine or connection to the database
+    :return: None
+    """
+    with bind.begin() as connection:
+        get_search_backend(connection.dialect.name).install(connection)
+
+
+def prepare_search(connection: Connection) -> None:
+    """
+    Detect search features of the database, has to be called before
+    building search queries outside of synchronous sessions
+
+    :param connection: Connection to the database
+    :return: None
+    """
+    get_search_backend(connection.dialect.name).prepare(connection)
+
+
+@event.listens_for(models.Film.__table__, 'after_drop')
+def _drop_search_tables(target, connection, **kwargs):
+    get_search_backend(connection.dialect.name).uninstall(connection)
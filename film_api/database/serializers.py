@@ -0,0 +1,200 @@
+"""Module with JSON serialization of database models"""
+import datetime
+import functools
+import json
+import operator
+import time
+from decimal import Decimal
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Sequence,
+                    Tuple)
+
+from sqlalchemy import inspect
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_timing_hook: Optional[Callable[[float], None]] = None
+
+
+def set_timing_hook(hook: Optional[Callable[[float], None]]) -> None:
+    """
+    Set function that receives time spent on each serialization
+
+    :param hook: Function called with elapsed seconds, None to disable
+    :return: None
+    """
+    global _timing_hook  # pylint: disable=global-statement
+    _timing_hook = hook
+
+
+def _timed(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _timing_hook is None:
+            return func(*args, **kwargs)
+
+        started_at = time.perf_counter()
+        result = func(*args, **kwargs)
+        _timing_hook(time.perf_counter() - started_at)
+
+        return result
+
+    return wrapper
+
+
+def _default(value) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'Type {type(value)} is not JSON serializable')
+
+
+if orjson is not None:
+    def dumps(data) -> bytes:
+        """
+        Encode data to JSON bytes, Decimal is encoded as float and
+        datetime in ISO format
+
+        :param data: Data to be encoded
+        :return: JSON bytes
+        :rtype: bytes
+        """
+        return orjson.dumps(data, default=_default,
+                            option=orjson.OPT_NON_STR_KEYS)
+else:
+    _encoder = json.JSONEncoder(default=_default, separators=(',', ':'))
+
+    def dumps(data) -> bytes:
+        """
+        Encode data to JSON bytes, Decimal is encoded as float and
+        datetime in ISO format
+
+        :param data: Data to be encoded
+        :return: JSON bytes
+        :rtype: bytes
+        """
+        return _encoder.encode(data).encode()
+
+
+dumps = _timed(dumps)
+
+
+class ModelSerializer:
+    """
+    Serializer of model instances compiled once from the columns of the
+    model, related instances are embedded by serializers of nested
+    relationships
+    """
+
+    def __init__(self, model, fields: Optional[Sequence[str]] = None,
+                 nested: Optional[Dict[str, 'ModelSerializer']] = None):
+        self.model = model
+        self.fields: List[str] = list(
+                fields or [attr.key for attr in inspect(model).column_attrs])
+        self.nested: List[Tuple[str, 'ModelSerializer', bool]] = [
+            (key, serializer, inspect(model).relationships[key].uselist)
+            for key, serializer in (nested or {}).items()]
+
+        if len(self.fields) == 1:
+            getter = operator.attrgetter(self.fields[0])
+            self._getter = lambda instance: (getter(instance),)
+        else:
+            self._getter = operator.attrgetter(*self.fields)
+
+    def to_dict(self, instance) -> Dict:
+        """
+        Retrieve column values of the instance along with embedded related
+        instances
+
+        :param instance: Model instance
+        :return: Dict of column values
+        :rtype: Dict
+        """
+        data = dict(zip(self.fields, self._getter(instance)))
+
+        for key, serializer, uselist in self.nested:
+            related = getattr(instance, key)
+
+            if uselist:
+                data[key] = serializer._to_list(related)
+            else:
+                data[key] = None if related is None \
+                    else serializer.to_dict(related)
+
+        return data
+
+    def _to_list(self, instances: Iterable) -> List[Dict]:
+        if self.nested:
+            return [self.to_dict(instance) for instance in instances]
+
+        fields = self.fields
+        getter = self._getter
+
+        return [dict(zip(fields, getter(instance))) for instance in instances]
+
+    @_timed
+    def to_list(self, instances: Iterable) -> List[Dict]:
+        """
+        Retrieve column values of each instance
+
+        :param instances: Model instances
+        :return: List of dicts of column values
+        :rtype: List[Dict]
+        """
+        return self._to_list(instances)
+
+    def dumps(self, instance) -> bytes:
+        """
+        Encode instance to JSON bytes
+
+        :param instance: Model instance
+        :return: JSON bytes
+        :rtype: bytes
+        """
+        return dumps(self.to_dict(instance))
+
+    def dumps_many(self, instances: Iterable) -> bytes:
+        """
+        Encode instances to JSON array
+
+        :param instances: Model instances
+        :return: JSON bytes
+        :rtype: bytes
+        """
+        return dumps(self.to_list(instances))
+
+
+_serializers: Dict[Tuple[type, Tuple[str, ...], Optional[Tuple[str, ...]]],
+                   ModelSerializer] = {}
+
+
+def get_serializer(model, expand: Sequence[str] = (),
+                   fields: Optional[Sequence[str]] = None) -> ModelSerializer:
+    """
+    Retrieve serializer of the columns of the model, serializer is created
+    once per model, set of expanded relationships and set of columns
+
+    :param model: Model class
+    :param expand: Relationships whose instances are embedded
+    :param fields: Names of serialized columns, all columns if empty
+    :return: Serializer of the model
+    :rtype: ModelSerializer
+    :raises KeyError: If model has no such relationship
+    """
+    key = (model, tuple(sorted(expand)),
+           tuple(fields) if fields else None)
+    serializer = _serializers.get(key)
+
+    if serializer is None:
+        relationships = inspect(model).relationships
+        serializer = _serializers[key] = ModelSerializer(
+                model, fields=key[2],
+                nested={name: get_serializer(relationships[name]
+                                             .mapper.class_)
+                        for name in key[1]})
+
+    return serializer
@@ -0,0 +1,126 @@
+"""
+Module with structured logging that writes records in a background thread
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_FILE = os.getenv('LOG_FILE') or 'api.log'
+LOG_INFO_SAMPLE_RATE = float(os.getenv('LOG_INFO_SAMPLE_RATE') or 1)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Formatter that renders event fields as key=value pairs"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s %(message)s')
+
+    @staticmethod
+    def _format_value(value) -> str:
+        value = str(value)
+
+        if not value or ' ' in value or '"' in value or '=' in value:
+            return '"{}"'.format(value.replace('"', '\\"'))
+
+        return value
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = getattr(record, 'fields', None)
+
+        if not fields:
+            return message
+
+        return message + ' ' + ' '.join(
+                f'{key}={self._format_value(value)}'
+                for key, value in fields.items())
+
+
+class _Sampler:
+    """Decides whether INFO event has to be logged with the given rate"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+
+    def __call__(self) -> bool:
+        return self.rate >= 1 or random.random() < self.rate
+
+
+_sampler = _Sampler(LOG_INFO_SAMPLE_RATE)
+
+
+def set_info_sample_rate(rate: float) -> None:
+    """
+    Set share of INFO events that are logged
+
+    :param rate: Float from 0 to 1
+    :return: None
+    """
+    _sampler.rate = rate
+
+
+def log_event(logger: logging.Logger, level: int, event: str,
+              **fields) -> None:
+    """
+    Log event with key/value fields. Nothing is computed if the level is
+    disabled or INFO event is not sampled, callable fields are called only
+    when the event is logged
+
+    :param logger: Logger of the event
+    :param level: Logging level
+    :param event: Name of the event
+    :param fields: Fields of the event, callables are evaluated lazily
+    :return: None
+    """
+    if not logger.isEnabledFor(level):
+        return
+
+    if level == logging.INFO and not _sampler():
+        return
+
+    for key, value in fields.items():
+        if callable(value):
+            fields[key] = value()
+
+    logger.log(level, event, extra={'fields': fields})
+
+
+def configure_logging(logger: logging.Logger, level: int,
+                      log_file: Optional[str] = LOG_FILE) -> QueueListener:
+    """
+    Make logger put records to the queue that is drained by the background
+    thread writing them to stderr and the log file
+
+    :param logger: Logger to be configured
+    :param level: Logging level
+    :param log_file: Path to the log file, no file is written if None
+    :return: Started queue listener
+    :rtype: QueueListener
+    """
+    formatter = KeyValueFormatter()
+    handlers = [logging.StreamHandler()]
+
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, delay=True))
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    logger.addHandler(QueueHandler(records))
+    logger.setLevel(level)
+    logger.propagate = False
+
+    listener.start()
+    atexit.register(listener.stop)
+
+    return listener
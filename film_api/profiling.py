@@ -0,0 +1,146 @@
+"""
+Module with opt-in per request profiling: wall time, SQL statements
+accounting, connection pool wait, serialization time and sampled cProfile
+dumps
+"""
+import json
+import os
+import random
+import time
+from typing import Optional
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from film_api.database import models, serializers
+
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE') or 0)
+PROFILE_DIR = os.getenv('PROFILE_DIR') or 'profiles'
+
+
+class RequestStats:
+    """Timings collected during one request"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.pool_wait_time = 0.0
+        self.serialization_time = 0.0
+        self.profiler = None
+
+    def server_timing(self, total: float) -> str:
+        """
+        Render stats as Server-Timing header value
+
+        :param total: Wall time of the request in seconds
+        :return: Server-Timing header value
+        :rtype: str
+        """
+        return f'total;dur={total * 1000:.2f}, ' \
+               f'db;dur={self.sql_time * 1000:.2f};' \
+               f'desc="{self.sql_count} queries", ' \
+               f'pool;dur={self.pool_wait_time * 1000:.2f}, ' \
+               f'serialization;dur={self.serialization_time * 1000:.2f}'
+
+
+def _current_stats() -> Optional[RequestStats]:
+    if has_request_context():
+        return g.get('request_stats')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if context is not None and _current_stats() is not None:
+        context.profiling_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    stats = _current_stats()
+    started_at = getattr(context, 'profiling_started_at', None)
+
+    if stats is not None and started_at is not None:
+        stats.sql_count += 1
+        stats.sql_time += time.perf_counter() - started_at
+
+
+def _record_pool_wait(elapsed: float) -> None:
+    stats = _current_stats()
+
+    if stats is not None:
+        stats.pool_wait_time += elapsed
+
+
+def _record_serialization(elapsed: float) -> None:
+    stats = _current_stats()
+
+    if stats is not None:
+        stats.serialization_time += elapsed
+
+
+def _start_request():
+    g.request_stats = stats = RequestStats()
+
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        import cProfile
+
+        stats.profiler = cProfile.Profile()
+        stats.profiler.enable()
+
+
+def _dump_profile(stats: RequestStats, total: float) -> None:
+    stats.profiler.disable()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f'{request.endpoint or "unknown"}-{int(time.time() * 1000)}-' \
+           f'{os.getpid()}'
+    path = os.path.join(PROFILE_DIR, name)
+
+    stats.profiler.dump_stats(path + '.prof')
+
+    with open(path + '.json', 'w') as stats_file:
+        json.dump({'endpoint': request.endpoint, 'method': request.method,
+                   'url': request.full_path, 'total': total,
+                   'sql_count': stats.sql_count, 'sql_time': stats.sql_time,
+                   'pool_wait_time': stats.pool_wait_time,
+                   'serialization_time': stats.serialization_time},
+                  stats_file)
+
+
+def _finish_request(response):
+    stats = _current_stats()
+
+    if stats is None:
+        return response
+
+    total = time.perf_counter() - stats.started_at
+    response.headers['Server-Timing'] = stats.server_timing(total)
+
+    if stats.profiler is not None:
+        _dump_profile(stats, total)
+
+    return response
+
+
+def init_profiling(app: Flask) -> None:
+    """
+    Enable profiling of every request of the app. Timings including wait
+    for pooled connections are returned in Server-Timing header, sampled
+    requests (PROFILE_SAMPLE_RATE) are profiled with cProfile and dumped
+    to PROFILE_DIR
+
+    :param app: Flask application
+    :return: None
+    """
+    for name, listener in [('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute)]:
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+    serializers.set_timing_hook(_record_serialization)
+    models.pool_monitor.wait_hook = _record_pool_wait
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
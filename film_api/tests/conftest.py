@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix='film_api_tests_')
+
+os.environ.setdefault('DB_CONN_STR', 'sqlite:///' + os.path.join(
+        TEST_DIR, 'test.sqlite'))
+os.environ.setdefault('POSTER_DIR', os.path.join(TEST_DIR, 'posters'))
+os.environ.setdefault('LOG_FILE', os.path.join(TEST_DIR, 'api.log'))
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+
+from film_api import app
+from film_api.cache import auth_cache, genre_cache
+from film_api.database import models
+
+
+@pytest.fixture(name='test_dir', scope='session', autouse=True)
+def fixture_test_dir():
+    # Directory is created on import, since the app reads the environment
+    # when it is imported, so it is removed after the whole session
+    yield TEST_DIR
+    models.engine.dispose()
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture(name='db')
+def fixture_db():
+    models.init_db()
+    yield models.db_session
+    models.db_session.remove()
+    models.Base.metadata.drop_all(bind=models.engine)
+    genre_cache.genre_cache.clear()
+
+
+@pytest.fixture(name='user')
+def fixture_user(db):
+    user = models.User('tester')
+    user.password = 'password'
+    user.api_key = 'api-key'
+    user.is_authenticated = False
+    user.is_active = True
+    user.is_anonymous = False
+    user.is_admin = False
+
+    db.add(user)
+    db.commit()
+
+    yield user
+
+    auth_cache.user_cache.clear()
+
+
+@pytest.fixture(name='client')
+def fixture_client(user):
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'X-Token {user.api_key}'
+    return client
@@ -0,0 +1,449 @@
+import base64
+import datetime
+import hashlib
+import json
+
+import pytest
+from sqlalchemy import event
+
+from film_api.database import models
+from film_api.database.pagination import encode_cursor
+
+
+@pytest.fixture(name='films')
+def fixture_films(db, user):
+    films = [models.Film(f'film {i}', datetime.datetime(2000 + i, 1, 1),
+                         'poster', user.user_id, rating=i % 5 + 1,
+                         description=f'description {i}')
+             for i in range(15)]
+
+    db.add_all(films)
+    db.commit()
+
+    return films
+
+
+def test_get_film_by_id(client, films):
+    response = client.get(f'/film/{films[0].film_id}')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert response.json[0]['film_title'] == 'film 0'
+
+
+def test_get_films_ndjson(client, films):
+    response = client.get('/film?title=film&sort_dates=-1',
+                          headers={'Accept': 'application/x-ndjson'})
+
+    lines = response.data.decode().splitlines()
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line)['film_title'] for line in lines] == \
+           [f'film {i}' for i in reversed(range(15))]
+
+
+@pytest.fixture(name='expandable_films')
+def fixture_expandable_films(db, films):
+    director = models.Director('Anna', 'Smith')
+    db.add_all([director, models.Genres('drama'), models.Genres('comedy')])
+    db.flush()
+
+    for i, film in enumerate(films):
+        film.director_id = director.director_id if i % 2 else None
+        db.add(models.FilmGenre(film.film_id, i % 2 + 1))
+    db.add(models.FilmGenre(films[0].film_id, 2))
+    db.commit()
+
+    return films
+
+
+def test_get_film_not_modified_loads_only_version(client, films):
+    url = f'/film/{films[0].film_id}'
+    etag = client.get(url).headers['ETag']
+
+    response, statements = capture_statements(lambda: client.get(
+            url, headers={'If-None-Match': etag}))
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert not any('films.film_title' in statement
+                   for statement in statements)
+
+
+def count_statements(func):
+    result, statements = capture_statements(func)
+    return result, len(statements)
+
+
+def capture_statements(func):
+    statements = []
+
+    def before_execute(*args):
+        statements.append(args[2])
+
+    event.listen(models.engine, 'before_cursor_execute', before_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(models.engine, 'before_cursor_execute', before_execute)
+
+    return result, statements
+
+
+def test_get_films_expanded(client, expandable_films):
+    response = client.get('/film?title=film&sort_dates=1'
+                          '&expand=genres,director')
+    films = response.json
+
+    assert response.status_code == 200
+    assert films[0]['director'] is None
+    assert [genre['genre_name'] for genre in films[0]['genres']] == \
+           ['drama', 'comedy']
+    assert films[1]['director']['surname'] == 'Smith'
+    assert [genre['genre_name'] for genre in films[1]['genres']] == \
+           ['comedy']
+
+
+def test_get_films_expanded_queries_do_not_grow(client, expandable_films):
+    # Warm up the cache of authenticated users
+    client.get('/film/1')
+
+    first_page, first_count = count_statements(lambda: client.get(
+            '/film?title=film&page=1&expand=director,genres'))
+    last_page, last_count = count_statements(lambda: client.get(
+            '/film?title=film&page=2&expand=director,genres'))
+
+    assert len(first_page.json) == 10
+    assert len(last_page.json) == 5
+    assert first_count == last_count
+
+
+def test_get_films_by_all_genres(client, expandable_films):
+    response = client.get('/film?title=film&genre=comedy,drama'
+                          '&genre_mode=all')
+
+    assert [film['film_id'] for film in response.json] == \
+           [expandable_films[0].film_id]
+    assert client.get('/film?title=film&genre=drama&genre_mode=some') \
+               .status_code == 400
+
+
+@pytest.mark.parametrize('url', [
+    '/film?title=film&expand=producer',
+    '/film/1?expand=director,owner',
+])
+def test_get_films_wrong_expand(client, films, url):
+    assert client.get(url).status_code == 400
+
+
+def test_get_films_leave_out_large_columns(client, films):
+    listed = client.get('/film?title=film').json[0]
+    film = client.get(f'/film/{films[0].film_id}').json[0]
+
+    assert 'description' not in listed and 'poster' not in listed
+    assert listed['film_title'] == film['film_title']
+    assert film['description'] == 'description 0'
+
+
+@pytest.mark.parametrize('url', [
+    '/film?title=film&sort_dates=1&fields=film_title,film_id',
+    '/film/1?fields=film_id,film_title',
+])
+def test_get_films_fields(client, films, url):
+    # Warm up the cache of authenticated users
+    client.get('/film/1')
+
+    response, statements = capture_statements(lambda: client.get(url))
+
+    assert response.status_code == 200
+    assert list(response.json[0]) == ['film_id', 'film_title']
+    # Count subquery may list all columns, only selected ones are fetched
+    selected = [statement.split('FROM')[0] for statement in statements]
+
+    assert not any('description' in columns or 'rating' in columns
+                   for columns in selected)
+
+
+def test_get_films_fields_with_expansions_and_cursor(client,
+                                                     expandable_films):
+    response = client.get('/film?title=film&sort_rating=-1&cursor='
+                          '&fields=film_title&expand=director')
+    next_page = client.get('/film?title=film&sort_rating=-1&fields=film_title'
+                           f'&expand=director&cursor='
+                           f'{response.json["next_cursor"]}')
+    items = response.json['items'] + next_page.json['items']
+
+    assert list(items[0]) == ['film_title', 'director']
+    assert len({item['film_title'] for item in items}) == 15
+    assert [item['director'] is not None for item in items].count(True) == 7
+
+
+def test_get_films_cursor_of_wrong_type(client, films):
+    cursor = encode_cursor(['high', 1])
+
+    assert client.get(f'/film?title=film&sort_rating=-1&cursor={cursor}') \
+        .status_code == 400
+
+
+@pytest.mark.parametrize('url', [
+    '/film?title=film&fields=film_title,budget',
+    '/film/1?fields=owner',
+])
+def test_get_films_wrong_fields(client, films, url):
+    assert client.get(url).status_code == 400
+
+
+@pytest.mark.parametrize('url, expected_len', [
+    ('/film?title=film&page=2', 5),
+    ('/film?title=film&page=2&count=capped', 5),
+    ('/film?title=description', 10),
+])
+def test_get_films_total_count(client, films, url, expected_len):
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers['X-Total-Count'] == '15'
+    assert len(response.json) == expected_len
+
+
+def test_get_films_wrong_count_mode(client, films):
+    assert client.get('/film?title=film&count=precise').status_code == 400
+
+
+def film_record(user, title):
+    return {'film_title': title, 'release_date': '2001-02-03',
+            'poster': 'poster', 'created_by': user.user_id,
+            'director_id': None, 'description': 'description',
+            'rating': 5.5}
+
+
+def test_post_films_batch(client, user):
+    records = [film_record(user, f'batch {i}') for i in range(5)]
+    records[2]['rating'] = 100
+    records[4] = 'film'
+
+    response = client.post('/film/batch', json=records)
+
+    assert response.status_code == 200
+    assert response.json['inserted'] == 3
+    assert [error['index'] for error in response.json['errors']] == [2, 4]
+    assert sorted(film.film_title for film in models.Film.query) == \
+           ['batch 0', 'batch 1', 'batch 3']
+
+
+@pytest.mark.parametrize('field, value', [
+    ('rating', 100),
+    ('release_date', '2001-02-31'),
+    ('release_date', '2001-13-01'),
+    ('director_id', 'x'),
+])
+def test_post_films_batch_wrong_record(client, user, field, value):
+    records = [film_record(user, f'batch {i}') for i in range(3)]
+    records[1][field] = value
+
+    response = client.post('/film/batch', json=records)
+
+    assert response.status_code == 200
+    assert response.json['inserted'] == 2
+    assert [error['index'] for error in response.json['errors']] == [1]
+
+
+def test_post_films_batch_created_by_current_user(client, user):
+    user_id = user.user_id
+    records = [film_record(user, f'batch {i}') for i in range(2)]
+    records[1]['created_by'] = user_id + 1
+
+    assert client.post('/film/batch', json=records).json['inserted'] == 2
+    assert {film.created_by for film in models.Film.query} == {user_id}
+
+
+def test_post_films_batch_ndjson(client, user):
+    lines = [json.dumps(film_record(user, 'ndjson 0')), '{malformed',
+             json.dumps(film_record(user, 'ndjson 1'))]
+
+    response = client.post('/film/batch', data='\n'.join(lines),
+                           content_type='application/x-ndjson')
+
+    assert response.json['inserted'] == 2
+    assert response.json['errors'][0]['index'] == 1
+    assert models.Film.query.count() == 2
+
+
+def test_post_films_batch_wrong_body(client):
+    assert client.post('/film/batch', json={'a': 1}).status_code == 400
+
+
+def test_get_film_not_modified_until_change(client, user, films):
+    response = client.get('/film?title=film&page=1')
+
+    assert response.headers['ETag']
+    assert client.get('/film?title=film&page=1', headers={
+        'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    client.post('/film', json=film_record(user, 'film new'))
+
+    response = client.get('/film?title=film&page=1')
+    etag = response.headers['ETag']
+
+    assert response.headers['Last-Modified']
+    assert client.get('/film?page=1&title=film', headers={
+        'If-None-Match': etag}).status_code == 304
+    assert client.get('/film?title=film&page=1', headers={
+        'If-Modified-Since': response.headers['Last-Modified']}) \
+               .status_code == 304
+
+    client.delete(f'/film/{films[0].film_id}')
+
+    assert client.get('/film?title=film&page=1', headers={
+        'If-None-Match': etag}).status_code == 200
+
+
+def test_delete_films(client, films):
+    film_ids = [films[0].film_id, films[1].film_id]
+
+    response = client.delete(f'/film?ids={film_ids[0]},{film_ids[1]},999')
+
+    assert response.status_code == 200
+    assert sorted(film['film_id'] for film in response.json) == film_ids
+    assert client.get(f'/film/{film_ids[0]}').json == []
+
+
+@pytest.mark.parametrize('url, status_code', [
+    ('/film?ids=', 400),
+    ('/film?ids=1,first', 400),
+    ('/film/999', 404),
+])
+def test_delete_films_wrong_input(client, films, url, status_code):
+    assert client.delete(url).status_code == status_code
+
+
+def test_patch_film(client, films):
+    film_id = films[0].film_id
+
+    response = client.patch(f'/film/{film_id}', json={'rating': 9.5})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] == '"2"'
+
+    film = client.get(f'/film/{film_id}').json[0]
+
+    assert (film['rating'], film['version']) == (9.5, 2)
+    assert film['description'] == 'description 0'
+
+
+def test_patch_film_clears_nullable_fields(client, films):
+    film_id = films[0].film_id
+
+    response = client.patch(f'/film/{film_id}',
+                            json={'description': None, 'rating': None})
+
+    assert response.status_code == 200
+
+    film = client.get(f'/film/{film_id}').json[0]
+
+    assert (film['description'], film['rating']) == (None, None)
+
+
+@pytest.mark.parametrize('headers, body', [
+    ({'If-Match': '"1"'}, {'rating': 2}),
+    ({}, {'rating': 2, 'version': 1}),
+])
+def test_patch_film_conflict(client, films, headers, body):
+    film_id = films[0].film_id
+    client.patch(f'/film/{film_id}', json={'rating': 9.5},
+                 headers={'If-Match': '"1"'})
+
+    response = client.patch(f'/film/{film_id}', json=body, headers=headers)
+
+    assert response.status_code == 409
+    assert client.get(f'/film/{film_id}').json[0]['rating'] == 9.5
+
+
+@pytest.mark.parametrize('url, body, status_code', [
+    ('/film/1', {'rating': 11}, 400),
+    ('/film/1', {'created_by': 2}, 400),
+    ('/film/1', {'rating': 5, 'version': 'first'}, 400),
+    ('/film/1', {'release_date': '2001-02-31'}, 400),
+    ('/film/999', {'rating': 5}, 404),
+])
+def test_patch_film_wrong_input(client, films, url, body, status_code):
+    assert client.patch(url, json=body).status_code == status_code
+
+
+def test_get_then_patch_film_with_etag(client, films):
+    url = f'/film/{films[0].film_id}'
+
+    response = client.get(url)
+    etag = response.headers['ETag']
+
+    assert etag == '"1"'
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.patch(url, json={'rating': 3},
+                        headers={'If-Match': etag}).status_code == 200
+
+    response = client.get(url)
+
+    assert response.headers['ETag'] == '"2"'
+    assert response.json[0]['rating'] == 3
+    assert client.patch(url, json={'rating': 4},
+                        headers={'If-Match': etag}).status_code == 409
+
+
+def test_patch_film_of_other_user(client, films, db):
+    film_id = films[0].film_id
+    films[0].created_by = 2
+    db.commit()
+
+    assert client.patch(f'/film/{film_id}',
+                        json={'rating': 2}).status_code == 404
+    assert client.get(f'/film/{film_id}').json[0]['rating'] == 1
+
+
+@pytest.fixture(name='poster_film')
+def fixture_poster_film(client, db):
+    poster = bytes(range(256)) * 8
+    response = client.post('/film', json={
+        'film_title': 'poster film', 'release_date': '2000-01-01',
+        'poster': 'data:application/octet-stream;base64,' +
+                  base64.b64encode(poster).decode(),
+        'created_by': 1, 'director_id': None, 'description': 'description',
+        'rating': 5})
+
+    assert response.status_code == 200
+
+    return models.Film.query.filter_by(film_title='poster film').one(), \
+        poster
+
+
+def test_post_film_stores_poster_reference(poster_film):
+    film, poster = poster_film
+
+    assert film.poster == hashlib.sha256(poster).hexdigest()
+
+
+def test_get_film_poster(client, poster_film):
+    film, poster = poster_film
+
+    response = client.get(f'/film/{film.film_id}/poster')
+
+    assert response.status_code == 200
+    assert response.data == poster
+    assert client.get(f'/film/{film.film_id}/poster', headers={
+        'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_get_film_poster_range(client, poster_film):
+    film, poster = poster_film
+
+    response = client.get(f'/film/{film.film_id}/poster',
+                          headers={'Range': 'bytes=100-199'})
+
+    assert response.status_code == 206
+    assert response.data == poster[100:200]
+    assert response.headers['Content-Range'] == \
+           f'bytes 100-199/{len(poster)}'
+
+
+def test_get_film_poster_not_found(client, films):
+    assert client.get(f'/film/{films[0].film_id}/poster').status_code == 404
+    assert client.get('/film/999/poster').status_code == 404
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+import film_api
+
+
+def test_create_app_reports_startup_timings():
+    app = film_api.create_app()
+
+    assert app is not film_api.app
+    assert set(app.config['STARTUP_TIMINGS']) >= {'flask', 'blueprints',
+                                                  'logging'}
+
+
+def test_models_are_imported_without_app_and_engine():
+    code = ('import sys\n'
+            'from film_api.database import models\n'
+            'print("flask" in sys.modules, "film_api.blueprints" in '
+            'sys.modules, models.get_engines.cache_info().currsize)')
+    completed = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True,
+            check=True, env=dict(os.environ, LOG_FILE=''),
+            cwd=os.path.dirname(os.path.dirname(film_api.__file__)))
+
+    assert completed.stdout.split() == ['False', 'False', '0']
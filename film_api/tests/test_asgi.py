@@ -0,0 +1,182 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+
+from film_api.asgi import FilmAPI
+from film_api.database import models
+
+
+def call(asgi_app, path, query='', headers=None, body=b'', method='GET'):
+    """Run single HTTP request through the ASGI app"""
+    scope = {'type': 'http', 'method': method, 'path': path,
+             'query_string': query.encode(),
+             'headers': [(name.lower().encode(), value.encode())
+                         for name, value in (headers or {}).items()]}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await asgi_app(scope, receive, send)
+        await asgi_app.shutdown()
+
+    asyncio.run(run())
+
+    start = messages[0]
+    response_headers = {name.decode(): value.decode()
+                        for name, value in start['headers']}
+    response_body = b''.join(message.get('body', b'')
+                             for message in messages[1:])
+
+    return start['status'], response_headers, response_body
+
+
+@pytest.fixture(name='asgi_app')
+def fixture_asgi_app(user):
+    return FilmAPI()
+
+
+@pytest.fixture(name='auth')
+def fixture_auth(user):
+    return {'Authorization': f'X-Token {user.api_key}'}
+
+
+@pytest.fixture(name='films')
+def fixture_films(db, user):
+    director = models.Director('Anna', 'Smith')
+    db.add_all([director, models.Genres('drama')])
+    db.flush()
+
+    films = [models.Film(f'film {i}', datetime.datetime(2000 + i, 1, 1),
+                         'poster', user.user_id, rating=i % 5 + 1,
+                         director_id=director.director_id)
+             for i in range(5)]
+    db.add_all(films)
+    db.flush()
+    db.add(models.FilmGenre(films[0].film_id, 1))
+    db.commit()
+
+    return films
+
+
+def test_get_films(asgi_app, auth, films):
+    status, headers, body = call(asgi_app, '/film',
+                                 'title=film&sort_dates=-1', auth)
+
+    assert status == 200
+    assert headers['content-type'] == 'application/json'
+    assert headers['x-total-count'] == '5'
+    assert [film['film_title'] for film in json.loads(body)] == \
+           [f'film {i}' for i in reversed(range(5))]
+
+
+def test_get_film_by_id_expanded(asgi_app, auth, films):
+    _, _, body = call(asgi_app, f'/film/{films[0].film_id}',
+                      'expand=director,genres', auth)
+
+    film = json.loads(body)[0]
+
+    assert film['director']['name'] == 'Anna'
+    assert [genre['genre_name'] for genre in film['genres']] == ['drama']
+
+
+def test_get_films_by_genre(asgi_app, auth, films):
+    _, _, body = call(asgi_app, '/film', 'title=film&genre=drama', auth)
+
+    assert [film['film_title'] for film in json.loads(body)] == ['film 0']
+
+
+def test_get_films_ndjson(asgi_app, auth, films):
+    status, headers, body = call(asgi_app, '/film', 'title=film&sort_dates=1',
+                                 {**auth, 'Accept': 'application/x-ndjson'})
+
+    assert status == 200
+    assert headers['content-type'] == 'application/x-ndjson'
+    assert [json.loads(line)['film_title']
+            for line in body.decode().splitlines()] == \
+           [f'film {i}' for i in range(5)]
+
+
+def test_get_films_cursor(asgi_app, auth, films, monkeypatch):
+    monkeypatch.setattr('film_api.database.db_worker.DBWorker.page_size', 3)
+
+    _, _, body = call(asgi_app, '/film', 'title=film&cursor=', auth)
+    first_page = json.loads(body)
+    _, _, body = call(asgi_app, '/film',
+                      f'title=film&cursor={first_page["next_cursor"]}', auth)
+
+    assert len(first_page['items']) == 3
+    assert len(json.loads(body)['items']) == 2
+
+
+def test_get_films_fields(asgi_app, auth, films):
+    _, _, body = call(asgi_app, '/film', 'title=film&sort_rating=1&cursor='
+                                         '&fields=film_title', auth)
+    page = json.loads(body)
+    _, _, body = call(asgi_app, '/film', 'title=film', auth)
+
+    assert [list(item) for item in page['items']] == [['film_title']] * 5
+    assert 'description' not in json.loads(body)[0]
+
+
+@pytest.mark.parametrize('path, query', [
+    ('/film', 'title=film'),
+    ('/film', 'title=film&genre=drama&cursor='),
+    ('/film/1', ''),
+    ('/director', 'name=anna'),
+])
+def test_get_does_not_check_out_sync_connections(asgi_app, auth, films,
+                                                 path, query):
+    checkouts = models.pool_monitor.stats()['checkouts']
+
+    status, _, _ = call(asgi_app, path, query, auth)
+
+    assert status == 200
+    assert models.pool_monitor.stats()['checked_out'] == 0
+    assert models.pool_monitor.stats()['checkouts'] == checkouts
+
+
+@pytest.mark.parametrize('query', ['', 'title=film&page=first',
+                                   'title=film&genre_mode=some'])
+def test_get_films_wrong_input(asgi_app, auth, films, query):
+    status, _, _ = call(asgi_app, '/film', query, auth)
+
+    assert status == 400
+
+
+def test_get_films_unauthorized(asgi_app, films):
+    status, _, _ = call(asgi_app, '/film', 'title=film')
+
+    assert status == 401
+
+
+def test_get_directors(asgi_app, films):
+    status, headers, body = call(asgi_app, '/director', 'name=Anna')
+
+    assert status == 200
+    assert headers['x-total-count'] == '1'
+    assert json.loads(body)[0]['surname'] == 'Smith'
+
+
+@pytest.mark.parametrize('headers, body, status', [
+    ({'Authorization': 'X-Token api-key'}, b'', 200),
+    ({}, b'{"username": "tester", "password": "password"}', 200),
+    ({}, b'{"username": "tester", "password": "wrong"}', 401),
+])
+def test_login(asgi_app, headers, body, status):
+    assert call(asgi_app, '/login', headers=headers, body=body)[0] == status
+
+
+def test_write_methods_are_not_served(asgi_app, auth, films):
+    status, _, _ = call(asgi_app, f'/film/{films[0].film_id}', headers=auth,
+                        method='DELETE')
+
+    assert status == 405
@@ -0,0 +1,26 @@
+from film_api.cache import auth_cache
+
+
+def test_get_principal_caches_user(user, db, monkeypatch):
+    principal = auth_cache.get_principal('api-key')
+
+    assert principal.user_id == user.user_id
+    assert user.is_authenticated is True
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Database was queried')
+
+    monkeypatch.setattr(auth_cache.DBWorker, 'get_user_by_api_key', fail)
+    monkeypatch.setattr(db, 'commit', fail)
+
+    assert auth_cache.get_principal('api-key') is principal
+
+
+def test_get_principal_is_invalidated_on_change(user, db):
+    auth_cache.get_principal('api-key')
+
+    user.api_key = 'new-api-key'
+    db.commit()
+
+    assert auth_cache.get_principal('api-key') is None
+    assert auth_cache.get_principal('new-api-key').user_id == user.user_id
@@ -129,6 +129,8 @@ def test_check_date_wrong_forms(base_checker, date):
     ('1900-13-1', 'Wrong month. Got 13'),
     ('1900-1-0', 'Wrong day. Got 0'),
     ('1900-1-32', 'Wrong day. Got 32'),
+    ('2001-02-31', 'Wrong day. 2001-02-31 is not a calendar date'),
+    ('1900-2-29', 'Wrong day. 1900-2-29 is not a calendar date'),
 ])
 def test_check_date_out_of_range(base_checker, date, expected):
     base_checker.check_date(date)
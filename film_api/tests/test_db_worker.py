@@ -0,0 +1,306 @@
+import datetime
+
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from film_api.database import models
+from film_api.database.db_worker import DBWorker
+from film_api.database.pagination import encode_cursor
+
+
+@pytest.fixture(name='films')
+def fixture_films(db):
+    films = []
+
+    for i in range(25):
+        film = models.Film(f'film {i}', datetime.datetime(2000 + i % 5, 1, 1),
+                           'poster', 1, rating=i % 7 + 1)
+        films.append(film)
+
+    db.add_all(films)
+    db.commit()
+
+    return films
+
+
+def collect_keyset_pages(sort_keys):
+    film_ids = []
+    cursor = ''
+
+    while cursor is not None:
+        film_page = DBWorker.get_keyset_page_from_query(
+                DBWorker.get_film_by_title('film'), sort_keys, cursor)
+
+        assert len(film_page.items) <= int(DBWorker.page_size)
+
+        film_ids.extend(film.film_id for film in film_page.items)
+        cursor = film_page.next_cursor
+
+    return film_ids
+
+
+@pytest.mark.parametrize('dates, rating, unrated', [
+    (None, None, False),
+    (1, None, False),
+    (-1, None, False),
+    (None, -1, False),
+    (1, -1, False),
+    (-1, 1, False),
+    (None, 1, True),
+    (None, -1, True),
+    (1, -1, True),
+    (-1, 1, True),
+])
+def test_keyset_pagination_matches_sorted_query(films, db, dates, rating,
+                                                unrated):
+    if unrated:
+        for film in films[::3]:
+            film.rating = None
+        db.commit()
+
+    sort_keys = DBWorker.get_film_sort_keys(dates, rating)
+
+    expected_query = DBWorker.sort_film(DBWorker.get_film_by_title('film'),
+                                        dates, rating) \
+        .order_by(models.Film.film_id)
+
+    assert collect_keyset_pages(sort_keys) == \
+           [film.film_id for film in expected_query.all()]
+
+
+@pytest.mark.parametrize('cursor, dates, rating', [
+    ('not a cursor', None, None),
+    ('W10', None, None),
+    (encode_cursor(['1']), None, None),
+    (encode_cursor([None]), None, None),
+    (encode_cursor([True]), None, None),
+    (encode_cursor([1, 1]), 1, None),
+    (encode_cursor(['high', 1]), None, 1),
+])
+def test_keyset_pagination_wrong_cursor(films, cursor, dates, rating):
+    with pytest.raises(ValueError):
+        DBWorker.get_keyset_page_from_query(
+                DBWorker.get_film_by_title('film'),
+                DBWorker.get_film_sort_keys(dates, rating), cursor)
+
+
+@pytest.fixture(name='search_films')
+def fixture_search_films(db):
+    db.add_all([
+        models.Film('The Green Mile', datetime.datetime(1999, 1, 1), 'poster',
+                    1, description='Prison guards and a gentle giant'),
+        models.Film('Prisoners', datetime.datetime(2013, 1, 1), 'poster', 1,
+                    description='Missing daughters'),
+        models.Film('Green Book', datetime.datetime(2018, 1, 1), 'poster', 1,
+                    description='A road trip'),
+    ])
+    db.commit()
+
+
+@pytest.mark.parametrize('search_text, expected', [
+    ('green', ['Green Book', 'The Green Mile']),
+    ('GREEN mile', ['The Green Mile']),
+    ('prison', ['Prisoners', 'The Green Mile']),
+    ('road', ['Green Book']),
+    ('nothing', []),
+])
+def test_search_films(search_films, search_text, expected):
+    film_titles = [film.film_title for film in
+                   DBWorker.search_films(search_text).all()]
+
+    assert sorted(film_titles) == expected
+
+
+def test_search_films_ranks_title_first(search_films):
+    film_titles = [film.film_title for film in
+                   DBWorker.search_films('prison').all()]
+
+    assert film_titles == ['Prisoners', 'The Green Mile']
+
+
+def test_search_films_follows_changes(search_films, db):
+    film = DBWorker.search_films('road').one()
+    film.description = 'Piano tour'
+    db.commit()
+
+    assert DBWorker.search_films('road').all() == []
+    assert DBWorker.search_films('piano').one().film_id == film.film_id
+
+
+def test_search_films_ranked_with_genre(search_films, db):
+    db.add_all([models.Genres('drama'), models.Genres('comedy')])
+    db.add_all([models.FilmGenre(film_id, 1) for film_id in (1, 2)] +
+               [models.FilmGenre(1, 2)])
+    db.commit()
+
+    film_query = DBWorker.filter_film_by_genre(
+            DBWorker.search_films('prison'), 'drama')
+
+    assert [film.film_title for film in film_query.all()] == \
+           ['Prisoners', 'The Green Mile']
+
+
+@pytest.mark.parametrize('page, expected_ids, expected_total', [
+    (1, list(range(1, 11)), 25),
+    (3, list(range(21, 26)), 25),
+    (4, [], 25),
+])
+def test_get_page_from_query(films, page, expected_ids, expected_total):
+    film_page = DBWorker.get_page_from_query(
+            models.Film.query.order_by(models.Film.film_id), page, 'exact')
+
+    assert [film.film_id for film in film_page.items] == expected_ids
+    assert film_page.total == expected_total
+    assert film_page.total_label == str(expected_total)
+
+
+@pytest.mark.parametrize('count_cap, expected_label', [
+    (10, '10+'),
+    (25, '25'),
+    (100, '25'),
+])
+def test_get_page_from_query_capped(films, monkeypatch, count_cap,
+                                    expected_label):
+    monkeypatch.setattr(DBWorker, 'count_cap', count_cap)
+
+    for count_mode in ('capped', 'estimate'):
+        film_page = DBWorker.get_page_from_query(models.Film.query, 1,
+                                                 count_mode)
+
+        assert len(film_page.items) == 10
+        assert film_page.total_label == expected_label
+
+
+def test_get_page_from_query_ranked_search(search_films):
+    film_page = DBWorker.get_page_from_query(DBWorker.search_films('prison'),
+                                             1, 'exact')
+
+    assert [film.film_title for film in film_page.items] == \
+           ['Prisoners', 'The Green Mile']
+    assert film_page.total == 2
+
+
+def test_get_page_from_query_wrong_count_mode(films):
+    with pytest.raises(ValueError):
+        DBWorker.get_page_from_query(models.Film.query, 1, 'precise')
+
+    assert DBWorker.get_page_from_query(models.Film.query, 1,
+                                        'none').total_label is None
+
+
+@pytest.fixture(name='genre_films')
+def fixture_genre_films(films, db):
+    db.add_all([models.Genres('drama'), models.Genres('comedy')])
+    db.add_all([models.FilmGenre(film.film_id, 1)
+                for i, film in enumerate(films) if i % 2 == 0] +
+               [models.FilmGenre(film.film_id, 2)
+                for i, film in enumerate(films) if i % 3 == 0])
+    db.commit()
+
+    return films
+
+
+@pytest.mark.parametrize('genres, match_all, expected', [
+    (['drama'], False, lambda i: i % 2 == 0),
+    (['drama', 'comedy'], False, lambda i: i % 2 == 0 or i % 3 == 0),
+    (['drama', 'comedy'], True, lambda i: i % 6 == 0),
+    (['drama', 'western'], False, lambda i: i % 2 == 0),
+    (['drama', 'western'], True, lambda i: False),
+    (['western'], False, lambda i: False),
+])
+def test_filter_film_by_genres(genre_films, genres, match_all, expected):
+    film_query = DBWorker.filter_film_by_genres(
+            models.Film.query.order_by(models.Film.film_id), genres,
+            match_all)
+
+    assert [film.film_id for film in film_query] == \
+           [film.film_id for i, film in enumerate(genre_films) if expected(i)]
+
+
+def test_filter_film_by_genres_sees_new_genre(genre_films, db):
+    assert DBWorker.filter_film_by_genre(models.Film.query,
+                                         'western').all() == []
+
+    db.add(models.Genres('western'))
+    db.add(models.FilmGenre(genre_films[0].film_id, 3))
+    db.commit()
+
+    assert DBWorker.filter_film_by_genre(models.Film.query, 'western') \
+               .one().film_id == genre_films[0].film_id
+
+
+def test_delete_films_returns_deleted_rows(films, db):
+    films[1].created_by = 2
+    db.commit()
+    film_ids = [films[0].film_id, films[1].film_id, films[2].film_id, 999]
+
+    deleted = DBWorker.delete_films(film_ids, 1)
+
+    assert sorted(row.film_title for row in deleted) == ['film 0', 'film 2']
+    assert [film.film_id for film in
+            models.Film.query.filter(models.Film.film_id.in_(film_ids))] \
+           == [films[1].film_id]
+
+
+def test_delete_films_deletes_their_genres(genre_films):
+    film_ids = [film.film_id for film in genre_films[:2]]
+
+    assert len(DBWorker.delete_films(film_ids, 1)) == 2
+    assert models.FilmGenre.query.filter(
+            models.FilmGenre.film_id.in_(film_ids)).all() == []
+    assert models.FilmGenre.query.count() > 0
+
+
+def test_delete_film_by_id_of_other_user(films):
+    film_id = films[0].film_id
+
+    assert DBWorker.delete_film_by_id(film_id, 2) is None
+    assert DBWorker.delete_film_by_id(film_id, 1).film_title == 'film 0'
+    assert DBWorker.get_film_by_id(film_id).first() is None
+
+
+def test_update_film_changes_columns_and_version(films):
+    film_id = films[0].film_id
+
+    assert DBWorker.update_film(film_id, 1, {'rating': 9}) == 2
+    assert DBWorker.update_film(film_id, 1, {'description': 'new'}, 2) == 3
+
+    film = DBWorker.get_film_by_id(film_id).one()
+
+    assert (film.rating, film.description, film.version) == (9, 'new', 3)
+    assert film.film_title == 'film 0'
+
+
+def test_update_film_stale_version(films):
+    film_id = films[0].film_id
+    DBWorker.update_film(film_id, 1, {'rating': 9}, 1)
+
+    with pytest.raises(StaleDataError):
+        DBWorker.update_film(film_id, 1, {'rating': 2}, 1)
+
+    assert DBWorker.get_film_by_id(film_id).one().rating == 9
+    assert DBWorker.update_film(999, 1, {'rating': 2}, 1) is None
+
+
+def test_update_film_of_other_user(films):
+    film_id = films[0].film_id
+
+    assert DBWorker.update_film(film_id, 2, {'rating': 2}) is None
+    assert DBWorker.update_film(film_id, 2, {'rating': 2}, 1) is None
+    assert DBWorker.get_film_by_id(film_id).one().rating == 1
+    assert DBWorker.update_film(film_id, 1, {'rating': 2}, 1) == 2
+
+
+def test_insert_films_reports_rejected_films(db):
+    films_data = [{'film_title': f'insert {i}',
+                   'release_date': datetime.datetime(2000, 1, 1),
+                   'poster': 'poster', 'created_by': 1}
+                  for i in range(3)]
+    films_data[1]['film_title'] = None
+
+    inserted, errors = DBWorker.insert_films(films_data)
+
+    assert inserted == 2
+    assert list(errors) == [1]
+    assert sorted(film.film_title for film in models.Film.query) == \
+           ['insert 0', 'insert 2']
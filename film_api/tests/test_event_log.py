@@ -0,0 +1,52 @@
+import logging
+
+import pytest
+
+from film_api import event_log
+from film_api.event_log import KeyValueFormatter, log_event
+
+
+@pytest.fixture(name='logger')
+def fixture_logger(caplog):
+    logger = logging.getLogger('film_api.tests.event_log')
+    caplog.set_level(logging.INFO, logger=logger.name)
+    return logger
+
+
+def test_log_event_skips_disabled_level(logger, caplog):
+    def fail():
+        raise AssertionError('Field was computed')
+
+    log_event(logger, logging.DEBUG, 'event', entries=fail)
+
+    assert caplog.records == []
+
+
+def test_log_event_computes_callable_fields(logger, caplog):
+    log_event(logger, logging.INFO, 'event', entries=lambda: 5, user_id=1)
+
+    assert caplog.records[0].fields == {'entries': 5, 'user_id': 1}
+
+
+@pytest.mark.parametrize('rate, expected', [
+    (0, 0),
+    (1, 10),
+])
+def test_log_event_samples_info(logger, caplog, monkeypatch, rate,
+                                expected):
+    monkeypatch.setattr(event_log._sampler, 'rate', rate)
+
+    for _ in range(10):
+        log_event(logger, logging.INFO, 'event')
+    log_event(logger, logging.WARNING, 'event')
+
+    assert len(caplog.records) == expected + 1
+
+
+def test_key_value_formatter():
+    record = logging.LogRecord('name', logging.INFO, 'path', 1, 'film.get',
+                               None, None)
+    record.fields = {'user_id': 1, 'title': 'the film', 'empty': ''}
+
+    assert KeyValueFormatter().format(record).endswith(
+            'INFO name film.get user_id=1 title="the film" empty=""')
@@ -39,3 +39,63 @@ def test_film_checker_wrong_dict_len(film_checker, film_data):
                 f"Expected ['film_title', 'release_date', 'rating', 'poster', "
                 f"'created_at', 'producer_id', 'description'], "
                 f'got {film_data.keys()}'])
+
+
+def valid_film(**changes):
+    film_data = {'created_by': 1, 'description': 'description',
+                 'director_id': 2, 'film_title': 'test', 'poster': 'poster',
+                 'rating': 5.5, 'release_date': '2020-10-20'}
+    film_data.update(changes)
+    return film_data
+
+
+@pytest.mark.parametrize('film_data', [
+    valid_film(),
+    valid_film(film_title='t' * 101),
+    valid_film(film_title=2),
+    valid_film(rating=0),
+    valid_film(rating='5'),
+    valid_film(release_date='1800-13-1'),
+    valid_film(release_date='2020/10/20'),
+    valid_film(release_date=None, rating=10),
+    {'film_title': 'test'},
+])
+def test_validate_batch_matches_single_validation(film_data):
+    is_correct, errors = FilmChecker().start_validation(film_data)
+
+    batch_errors = FilmChecker.validate_batch([valid_film(), film_data])
+
+    assert 0 not in batch_errors
+    assert batch_errors.get(1, []) == errors
+    assert is_correct is (1 not in batch_errors)
+
+
+def test_validate_batch_columns():
+    films_data = [valid_film(), valid_film(rating=11), valid_film()]
+    columns = {key: [film_data[key] for film_data in films_data]
+               for key in FilmChecker.film_reference_list}
+
+    assert FilmChecker.validate_batch(columns) == \
+           FilmChecker.validate_batch(films_data)
+    assert list(FilmChecker.validate_batch(columns)) == [1]
+
+
+def test_validate_batch_wrong_record_type():
+    assert list(FilmChecker.validate_batch([valid_film(), 'film'])) == [1]
+
+
+@pytest.mark.parametrize('patch_data, is_correct', [
+    ({'rating': 7.5}, True),
+    ({'description': 'new description', 'director_id': None}, True),
+    ({'release_date': '2001-02-03', 'film_title': 'new'}, True),
+    ({'description': None, 'rating': None}, True),
+    ({'film_title': None}, False),
+    ({'release_date': None}, False),
+    ({'rating': 11}, False),
+    ({'release_date': '2001/02/03'}, False),
+    ({'director_id': '2'}, False),
+    ({'created_by': 2}, False),
+    ({}, False),
+])
+def test_film_checker_patch(film_checker, patch_data, is_correct):
+    assert film_checker.start_patch_validation(patch_data)[0] is is_correct
@@ -0,0 +1,17 @@
+import pytest
+
+from benchmarks.load_test import percentile
+
+
+@pytest.mark.parametrize('values, share, expected', [
+    (list(range(1, 101)), 0.5, 50),
+    (list(range(1, 101)), 0.95, 95),
+    (list(range(1, 101)), 0.99, 99),
+    (list(range(1, 101)), 1, 100),
+    (list(range(1, 11)), 0.5, 5),
+    (list(range(1, 11)), 0, 1),
+    ([7], 0.99, 7),
+    ([], 0.5, 0.0),
+])
+def test_percentile(values, share, expected):
+    assert percentile(values, share) == expected
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from film_api.database import pool_monitor
+from film_api.database.pool_monitor import PoolMonitor
+
+
+@pytest.fixture(name='clock')
+def fixture_clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(pool_monitor.time, 'monotonic', lambda: now[0])
+    return now
+
+
+@pytest.fixture(name='monitor')
+def fixture_monitor(tmp_path):
+    monitor = PoolMonitor(leak_threshold=10)
+    engine = create_engine(f'sqlite:///{tmp_path / "pool.sqlite"}')
+    monitor.attach(engine)
+    return monitor, engine
+
+
+def test_pool_monitor_counts_checkouts(monitor, clock):
+    monitor, engine = monitor
+
+    with engine.connect() as connection:
+        clock[0] += 2
+        connection.execute(text('SELECT 1'))
+
+    assert monitor.stats() == {'checkouts': 1, 'checked_out': 0,
+                               'total_hold_time': 2.0, 'max_hold_time': 2.0,
+                               'total_wait_time': 0.0, 'max_wait_time': 0.0}
+
+
+def test_pool_monitor_finds_leaks(monitor, clock, caplog):
+    monitor, engine = monitor
+    connection = engine.connect()
+
+    clock[0] += 5
+    assert monitor.find_leaks() == []
+
+    clock[0] += 6
+    monitor.report_leaks()
+    monitor.report_leaks()
+
+    assert len(monitor.find_leaks()) == 1
+    assert len([record for record in caplog.records
+                if 'connection leak' in record.message]) == 1
+
+    connection.close()
+
+    assert monitor.find_leaks() == []
+
+
+def test_pool_monitor_times_checkout_wait(monitor, clock, monkeypatch):
+    monitor, engine = monitor
+    waits = []
+    connect = engine.pool.connect
+
+    def slow_connect():
+        clock[0] += 3
+        return connect()
+
+    monkeypatch.setattr(engine.pool, 'connect', slow_connect)
+    monitor.wait_hook = waits.append
+
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+
+    assert waits == [3.0]
+    assert monitor.stats()['max_wait_time'] == 3.0
@@ -0,0 +1,106 @@
+import base64
+import datetime
+import hashlib
+import os
+
+import pytest
+
+from film_api.database import models, poster_store
+from film_api.database.poster_store import (PosterStore, decode_poster,
+                                            poster_mimetype)
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+
+
+@pytest.fixture(name='store')
+def fixture_store(tmp_path, monkeypatch):
+    store = PosterStore(str(tmp_path / 'posters'))
+    monkeypatch.setattr(poster_store, 'poster_store', store)
+    return store
+
+
+def test_put_deduplicates_posters(store):
+    reference = store.put(PNG)
+
+    assert reference == hashlib.sha256(PNG).hexdigest()
+    assert store.put(PNG) == reference
+    assert store.references() == [reference]
+
+    with open(store.path(reference), 'rb') as poster_file:
+        assert poster_file.read() == PNG
+
+
+@pytest.mark.parametrize('reference', ['poster', '../' + 'a' * 61, 'A' * 64])
+def test_path_wrong_reference(store, reference):
+    with pytest.raises(ValueError):
+        store.path(reference)
+
+
+@pytest.mark.parametrize('poster, expected', [
+    ('poster', b'poster'),
+    ('data:image/png;base64,' + base64.b64encode(PNG).decode(), PNG),
+    ('data:;base64,cG9zdGVy', b'poster'),
+])
+def test_decode_poster(poster, expected):
+    assert decode_poster(poster) == expected
+
+
+def test_decode_poster_malformed_base64():
+    with pytest.raises(ValueError):
+        decode_poster('data:image/png;base64,not base64!')
+
+
+@pytest.mark.parametrize('head, mimetype', [
+    (PNG, 'image/png'),
+    (b'\xff\xd8\xff\xe0', 'image/jpeg'),
+    (b'RIFF\x00\x00\x00\x00WEBPVP8 ', 'image/webp'),
+    (b'poster', 'text/plain'),
+    (b'\xff\xfe\x00', 'application/octet-stream'),
+])
+def test_poster_mimetype(head, mimetype):
+    assert poster_mimetype(head) == mimetype
+
+
+def test_prune_keeps_referenced_and_recent_posters(store):
+    kept, recent, removed = store.put(b'kept'), store.put(b'recent'), \
+        store.put(b'removed')
+    old_time = datetime.datetime(2000, 1, 1).timestamp()
+
+    for reference in (kept, removed):
+        os.utime(store.path(reference), (old_time, old_time))
+
+    assert store.prune({kept}) == 1
+    assert sorted(store.references()) == sorted([kept, recent])
+
+
+def test_migrate_posters(store, db):
+    db.add_all([models.Film('film', datetime.datetime(2000, 1, 1), poster, 1)
+                for poster in ('first', 'second', 'first')])
+    db.commit()
+
+    assert poster_store.migrate_posters(batch_size=2) == 3
+    assert poster_store.migrate_posters() == 0
+    assert [film.poster for film in
+            models.Film.query.order_by(models.Film.film_id)] == \
+           [hashlib.sha256(poster).hexdigest()
+            for poster in (b'first', b'second', b'first')]
+    assert len(store.references()) == 2
+
+
+def test_migrate_upgrades_schema_of_old_database(store, db):
+    db.add(models.Film('film', datetime.datetime(2000, 1, 1), 'first', 1))
+    db.commit()
+    db.remove()
+
+    # Schema before film versions and catalog state were introduced
+    with models.engine.begin() as connection:
+        connection.exec_driver_sql('ALTER TABLE films DROP COLUMN version')
+        connection.exec_driver_sql('DROP TABLE catalog_state')
+
+    assert poster_store.migrate() == 1
+
+    film = models.Film.query.one()
+
+    assert film.version == 1
+    assert film.poster == hashlib.sha256(b'first').hexdigest()
+    assert models.CatalogState.query.all() == []
@@ -0,0 +1,49 @@
+import re
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from film_api import profiling
+from film_api.database import models, serializers
+from film_api.database.serializers import get_serializer
+
+
+@pytest.fixture(name='profiled_client')
+def fixture_profiled_client(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    app = Flask(__name__)
+
+    @app.route('/queries/<int:count>')
+    def queries(count):
+        for _ in range(count):
+            db.execute(text('SELECT 1'))
+
+        return get_serializer(models.Film).dumps_many([])
+
+    profiling.init_profiling(app)
+
+    yield app.test_client()
+
+    serializers.set_timing_hook(None)
+    models.pool_monitor.wait_hook = None
+
+
+@pytest.mark.parametrize('count', [0, 3])
+def test_server_timing_counts_queries(profiled_client, count):
+    response = profiled_client.get(f'/queries/{count}')
+
+    assert re.fullmatch(r'total;dur=[\d.]+, db;dur=[\d.]+;'
+                        rf'desc="{count} queries", '
+                        r'pool;dur=[\d.]+, '
+                        r'serialization;dur=[\d.]+',
+                        response.headers['Server-Timing'])
+
+
+def test_sampled_request_is_dumped(profiled_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_SAMPLE_RATE', 1)
+
+    profiled_client.get('/queries/1')
+
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == \
+           ['.json', '.prof']
@@ -0,0 +1,105 @@
+import pytest
+
+from film_api.cache import rate_limit
+from film_api.cache.rate_limit import (MemoryBackend, RateLimit, RateLimiter,
+                                       SQLiteBackend, parse_rate_limits)
+
+
+@pytest.fixture(name='clock')
+def fixture_clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'time', lambda: now[0])
+    return now
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits('film=10/60, admin:film.get=100/1,*=5/2') == {
+        ('*', 'film'): RateLimit(10, 60),
+        ('admin', 'film.get'): RateLimit(100, 1),
+        ('*', '*'): RateLimit(5, 2)}
+
+
+@pytest.mark.parametrize('spec', ['film=10', 'film=ten/60', 'film=0/60'])
+def test_parse_rate_limits_wrong_spec(spec):
+    with pytest.raises(ValueError):
+        parse_rate_limits(spec)
+
+
+@pytest.mark.parametrize('role, scope, expected', [
+    ('admin', 'film.get', ('admin:film', RateLimit(100, 60))),
+    ('2', 'film.get', ('*:film.get', RateLimit(5, 60))),
+    ('2', 'film.post', ('*:film', RateLimit(10, 60))),
+    ('2', 'director.get', None),
+])
+def test_find_limit(role, scope, expected):
+    limiter = RateLimiter(None, parse_rate_limits(
+            'film=10/60,film.get=5/60,admin:film=100/60'))
+
+    assert limiter.find_limit(role, scope) == expected
+
+
+@pytest.mark.parametrize('make_backend', [
+    lambda tmp_path: MemoryBackend(10),
+    lambda tmp_path: SQLiteBackend(str(tmp_path / 'rate_limit.sqlite')),
+])
+def test_bucket_is_refilled(clock, tmp_path, make_backend):
+    backend = make_backend(tmp_path)
+    limit = RateLimit(2, 10)
+
+    assert [backend.take('key', limit)[0] for _ in range(3)] == \
+           [True, True, False]
+    assert backend.take('other', limit)[0]
+
+    clock[0] += 5
+
+    assert [backend.take('key', limit)[0] for _ in range(2)] == [True, False]
+
+
+def test_sqlite_buckets_are_shared(clock, tmp_path):
+    path = str(tmp_path / 'rate_limit.sqlite')
+    limit = RateLimit(2, 10)
+
+    assert SQLiteBackend(path).take('key', limit) == (True, 1)
+    assert SQLiteBackend(path).take('key', limit) == (True, 0)
+    assert SQLiteBackend(path).take('key', limit) == (False, 0)
+
+
+@pytest.fixture(name='limited_client')
+def fixture_limited_client(client, clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, 'rate_limiter', RateLimiter(
+            MemoryBackend(10), parse_rate_limits(
+                    'film=2/60,admin:film=5/60,anonymous:*=1/60')))
+    return client
+
+
+def test_rate_limit_headers(limited_client):
+    response = limited_client.get('/film?title=film')
+
+    assert response.status_code == 200
+    assert response.headers['RateLimit-Limit'] == '2'
+    assert response.headers['RateLimit-Remaining'] == '1'
+    assert response.headers['RateLimit-Reset'] == '30'
+
+    limited_client.get('/film?title=film')
+    response = limited_client.get('/film?title=film')
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+
+
+def test_rate_limit_of_admin(limited_client, user, db):
+    user.is_admin = True
+    db.commit()
+
+    statuses = [limited_client.get('/film?title=film').status_code
+                for _ in range(6)]
+
+    assert statuses == [200] * 5 + [429]
+
+
+def test_rate_limit_of_anonymous(limited_client, db):
+    client = limited_client.application.test_client()
+
+    assert client.get('/director').status_code == 200
+    assert client.get('/director').status_code == 429
+    assert limited_client.get('/director').status_code == 200
@@ -0,0 +1,60 @@
+import datetime
+
+import pytest
+
+from film_api.cache import response_cache
+from film_api.cache.response_cache import (CachedResponse, MemoryBackend,
+                                           SQLiteBackend)
+from film_api.database import models
+
+
+@pytest.fixture(name='backend', params=['memory', 'sqlite'])
+def fixture_backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryBackend(maxsize=10, ttl=10)
+    return SQLiteBackend(str(tmp_path / 'cache.sqlite'), ttl=10)
+
+
+def test_backend_invalidates_namespace(backend):
+    value = CachedResponse(200, 'application/json', b'[]')
+
+    backend.set('films', 'key', value)
+    backend.set('directors', 'key', value)
+
+    assert backend.get('films', 'key') == value
+
+    backend.invalidate('films')
+
+    assert backend.get('films', 'key') is None
+    assert backend.get('directors', 'key') == value
+
+
+def test_sqlite_backend_is_shared(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    value = CachedResponse(200, 'application/json', b'[]')
+
+    SQLiteBackend(path, ttl=10).set('films', 'key', value)
+
+    assert SQLiteBackend(path, ttl=10).get('films', 'key') == value
+
+
+def test_film_search_is_cached_until_change(client, user, monkeypatch):
+    monkeypatch.setattr(response_cache, 'response_cache',
+                        MemoryBackend(maxsize=10, ttl=10))
+    film = {'film_title': 'cached', 'release_date': '2001-02-03',
+            'poster': 'poster', 'created_by': user.user_id,
+            'director_id': None, 'description': 'description',
+            'rating': 5.5}
+
+    assert client.get('/film?title=cached&page=1').json == []
+
+    models.db_session.add(models.Film('cached',
+                                      datetime.datetime(2001, 1, 1), 'poster',
+                                      user.user_id))
+    models.db_session.commit()
+
+    assert client.get('/film?page=1&title=cached').json == []
+
+    client.post('/film', json=film)
+
+    assert len(client.get('/film?title=cached&page=1').json) == 2
@@ -0,0 +1,155 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from film_api.database import models, routing
+from film_api.database.routing import (MemoryWriters, ReplicaBalancer,
+                                       RoutingSession, SQLiteWriters,
+                                       set_writer)
+
+
+def create_database(path, title):
+    engine = create_engine(f'sqlite:///{path}')
+    models.Film.__table__.create(bind=engine)
+
+    with engine.begin() as connection:
+        connection.execute(models.Film.__table__.insert(), {
+            'film_id': 1, 'film_title': title,
+            'release_date': datetime.datetime(2000, 1, 1),
+            'poster': 'poster', 'created_by': 1})
+
+    return engine
+
+
+@pytest.fixture(name='databases')
+def fixture_databases(tmp_path, monkeypatch):
+    primary = create_database(tmp_path / 'primary.sqlite', 'primary')
+    replicas = [create_database(tmp_path / f'replica{i}.sqlite',
+                                f'replica {i}') for i in (1, 2)]
+    writers = SQLiteWriters(str(tmp_path / 'writers.sqlite'), 5)
+    monkeypatch.setattr(routing, 'get_recent_writers', lambda: writers)
+
+    return primary, replicas
+
+
+def session_factory(databases, strategy=routing.ROUND_ROBIN):
+    primary, replicas = databases
+    return sessionmaker(class_=RoutingSession, bind=primary,
+                        balancer=ReplicaBalancer(replicas, strategy))
+
+
+@pytest.fixture(name='make_session')
+def fixture_make_session(databases):
+    return session_factory(databases)
+
+
+def read_title(session):
+    return session.query(models.Film.film_title).filter_by(film_id=1) \
+        .scalar()
+
+
+def read_in_new_session(make_session):
+    session = make_session()
+
+    try:
+        return read_title(session)
+    finally:
+        session.close()
+
+
+def test_reads_are_balanced_between_replicas(make_session):
+    assert [read_in_new_session(make_session) for _ in range(4)] == \
+           ['replica 1', 'replica 2', 'replica 1', 'replica 2']
+
+
+def test_session_reads_from_one_replica(make_session):
+    session = make_session()
+
+    assert {read_title(session) for _ in range(3)} == {'replica 1'}
+
+
+def test_reads_go_to_least_busy_replica(databases):
+    make_session = session_factory(databases, routing.LEAST_BUSY)
+
+    with databases[1][0].connect():
+        assert {read_in_new_session(make_session)
+                for _ in range(3)} == {'replica 2'}
+
+
+def test_writes_go_to_primary_and_pin_session(databases, make_session):
+    primary, _ = databases
+    session = make_session()
+
+    session.query(models.Film).filter_by(film_id=1) \
+        .update({models.Film.rating: 5}, synchronize_session=False)
+    session.add(models.Film('new', datetime.datetime(2001, 1, 1), 'poster',
+                            1))
+    session.commit()
+
+    assert read_title(session) == 'primary'
+    assert primary.execute('SELECT count(*) FROM films').scalar() == 2
+    assert primary.execute('SELECT rating FROM films '
+                           'WHERE film_id = 1').scalar() == 5
+
+
+def test_writer_reads_own_writes_in_next_session(make_session):
+    writer_session = make_session()
+    set_writer(writer_session, 'writer')
+    writer_session.add(models.Film('new', datetime.datetime(2001, 1, 1),
+                                   'poster', 1))
+    writer_session.commit()
+
+    next_session = make_session()
+    set_writer(next_session, 'writer')
+    other_session = make_session()
+    set_writer(other_session, 'other')
+
+    assert read_title(next_session) == 'primary'
+    assert read_title(other_session) == 'replica 1'
+
+
+def test_writer_is_shared_between_processes(databases, make_session,
+                                            tmp_path):
+    writer_session = make_session()
+    set_writer(writer_session, 'writer')
+    writer_session.add(models.Film('new', datetime.datetime(2001, 1, 1),
+                                   'poster', 1))
+    writer_session.commit()
+
+    # Another worker process opens the same file
+    other_worker = SQLiteWriters(str(tmp_path / 'writers.sqlite'), 5)
+
+    assert other_worker.wrote_recently('writer')
+    assert not other_worker.wrote_recently('other')
+
+
+@pytest.mark.parametrize('make_writers', [
+    lambda tmp_path: MemoryWriters(10, 5),
+    lambda tmp_path: SQLiteWriters(str(tmp_path / 'writers.sqlite'), 5),
+])
+def test_recent_writers_expire(tmp_path, monkeypatch, make_writers):
+    now = [1000.0]
+    monkeypatch.setattr(routing.time, 'time', lambda: now[0])
+    monkeypatch.setattr('film_api.cache.ttl_cache.time.monotonic',
+                        lambda: now[0])
+    writers = make_writers(tmp_path)
+    writers.mark(1)
+
+    assert writers.wrote_recently(1)
+
+    now[0] += 6
+
+    assert not writers.wrote_recently(1)
+
+
+def test_session_without_replicas_uses_primary(databases):
+    session = sessionmaker(class_=RoutingSession, bind=databases[0])()
+
+    assert read_title(session) == 'primary'
+
+
+def test_balancer_wrong_strategy(databases):
+    with pytest.raises(ValueError):
+        ReplicaBalancer(databases[1], 'random')
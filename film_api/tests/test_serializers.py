@@ -0,0 +1,71 @@
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+
+from film_api.database import models
+from film_api.database.serializers import ModelSerializer, get_serializer
+
+
+@pytest.fixture(name='film')
+def fixture_film():
+    film = models.Film('test', datetime.datetime(2020, 10, 20), 'poster', 1,
+                       director_id=2, description='description',
+                       rating=Decimal('5.25'))
+    film.film_id = 3
+    film.version = 1
+    return film
+
+
+def test_serializer_is_created_once():
+    assert get_serializer(models.Film) is get_serializer(models.Film)
+
+
+def test_serializer_to_dict_has_columns_only(film):
+    assert film.to_json() == {'film_id': 3, 'film_title': 'test',
+                              'release_date': datetime.datetime(2020, 10, 20),
+                              'director_id': 2,
+                              'description': 'description',
+                              'rating': Decimal('5.25'), 'poster': 'poster',
+                              'created_by': 1, 'version': 1}
+
+
+def test_serializer_dumps_many(film):
+    assert json.loads(get_serializer(models.Film).dumps_many([film])) == [
+        {'film_id': 3, 'film_title': 'test',
+         'release_date': '2020-10-20T00:00:00', 'director_id': 2,
+         'description': 'description', 'rating': 5.25, 'poster': 'poster',
+         'created_by': 1, 'version': 1}]
+
+
+@pytest.mark.parametrize('fields', [
+    ['film_id'],
+    ['film_id', 'rating'],
+])
+def test_serializer_with_fields(film, fields):
+    serializer = ModelSerializer(models.Film, fields)
+
+    assert list(json.loads(serializer.dumps(film))) == fields
+
+
+def test_serializer_of_fields_is_created_once(film):
+    serializer = get_serializer(models.Film, fields=('film_id', 'rating'))
+
+    assert serializer is get_serializer(models.Film, (), ['film_id', 'rating'])
+    assert serializer is not get_serializer(models.Film)
+    assert serializer.to_dict(film) == {'film_id': 3,
+                                        'rating': Decimal('5.25')}
+
+
+def test_serializer_embeds_expanded_relationships(film):
+    film.director = models.Director('Anna', 'Smith')
+    film.director.director_id = 2
+
+    serializer = get_serializer(models.Film, ['director'])
+
+    assert serializer is get_serializer(models.Film, ('director',))
+    assert serializer is not get_serializer(models.Film)
+    assert serializer.to_dict(film)['director'] == {
+        'director_id': 2, 'name': 'Anna', 'surname': 'Smith',
+        'birth_date': None, 'country_id': None}
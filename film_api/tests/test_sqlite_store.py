@@ -0,0 +1,32 @@
+from film_api.cache.sqlite_store import SQLiteStore
+
+
+def store(path):
+    return SQLiteStore(path,
+                       'CREATE TABLE IF NOT EXISTS entries ('
+                       'key TEXT PRIMARY KEY, expires_at REAL NOT NULL)',
+                       'DELETE FROM entries WHERE expires_at <= ?')
+
+
+def test_store_purges_expired_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteStore, 'purge_interval', 2)
+    entries = store(str(tmp_path / 'store.sqlite'))
+    connection = entries.connection()
+
+    for key, expires_at in (('expired', 1), ('alive', 3)):
+        connection.execute('INSERT INTO entries VALUES (?, ?)',
+                           (key, expires_at))
+        entries.written(connection, 2)
+
+    assert connection.execute('SELECT key FROM entries').fetchall() == \
+           [('alive',)]
+
+
+def test_store_is_shared(tmp_path):
+    path = str(tmp_path / 'store.sqlite')
+
+    store(path).connection().execute('INSERT INTO entries VALUES (?, ?)',
+                                     ('key', 1))
+
+    assert store(path).connection().execute(
+            'SELECT key FROM entries').fetchall() == [('key',)]
@@ -0,0 +1,52 @@
+import pytest
+
+from film_api.cache import ttl_cache
+from film_api.cache.ttl_cache import TTLCache
+
+
+@pytest.fixture(name='clock')
+def fixture_clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ttl_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    assert cache.get('a') == 1
+
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=30)
+
+    clock[0] += 10
+
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    assert len(cache) == 1
+
+
+def test_ttl_cache_get_or_load_skips_none():
+    cache = TTLCache(maxsize=2, ttl=10)
+    loaded = []
+
+    def loader(key):
+        loaded.append(key)
+        return None if key == 'missing' else key.upper()
+
+    assert cache.get_or_load('a', loader) == 'A'
+    assert cache.get_or_load('a', loader) == 'A'
+    assert cache.get_or_load('missing', loader) is None
+    assert cache.get_or_load('missing', loader) is None
+    assert loaded == ['a', 'missing', 'missing']